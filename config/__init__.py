@@ -0,0 +1 @@
+""" Bundled kit config definitions, loaded with importlib.resources. """
@@ -1,26 +1,9 @@
 import sys
+import argparse
 import logging
+from pathlib import Path
 from typing import NoReturn
 
-from PySide6.QtWidgets import QApplication
-from modules.controller.controller import MainController
-
-class Application(QApplication):
-    """Main application class extending QApplication with custom initialization."""
-    
-    def __init__(self, argv: list[str]) -> None:
-        """Initialize the application with custom settings.
-        
-        Args:
-            argv: Command line arguments
-        """
-        super().__init__(argv)
-
-        self.setApplicationName("IndexTool")
-        self.setApplicationVersion("1.0.0")
-        self.setOrganizationName("Region Västerbotten")
-        self.setOrganizationDomain("regionvasterbotten.se")
-
 
 def setup_logging() -> None:
     """Configure application-wide logging settings."""
@@ -34,13 +17,233 @@ def setup_logging() -> None:
     )
 
 
+def parse_column_map(items: list[str]) -> dict[str, str]:
+    """Parse repeated OLD=NEW column relabel arguments."""
+    column_map = {}
+    for item in items:
+        old, sep, new = item.partition("=")
+        if not sep or not old or not new:
+            raise argparse.ArgumentTypeError(f"invalid column mapping '{item}', expected OLD=NEW")
+        column_map[old] = new
+    return column_map
+
+
+def convert_main(argv: list[str]) -> int:
+    """Headless batch conversion of index files to JSON.
+
+    Args:
+        argv: Command line arguments following the ``convert`` command
+
+    Returns:
+        Process exit code, non-zero if any file failed to convert
+    """
+    from modules.model.batch_convert import collect_source_files, convert_files
+
+    parser = argparse.ArgumentParser(prog="index_tool.py convert",
+                                     description="Convert index files to JSON without starting the GUI.")
+    parser.add_argument("source", help="directory, file or glob pattern of index files (.tsv, .csv, .xlsx)")
+    parser.add_argument("-c", "--config", required=True, help="config name from config/config_objects.yaml")
+    parser.add_argument("-o", "--output-dir", type=Path, default=None,
+                        help="directory for the JSON files (default: next to each source file)")
+    parser.add_argument("-m", "--map", action="append", default=[], metavar="OLD=NEW",
+                        help="relabel a source column before validation, may be repeated")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=None, metavar="ROWS",
+                        help="stream CSV files in chunks of ROWS rows, keeping only the columns the config needs")
+    parser.add_argument("--sheet", default=None, help="sheet to read from .xlsx files (default: the first)")
+    args = parser.parse_args(argv)
+
+    logger = logging.getLogger("index_tool.convert")
+
+    try:
+        column_map = parse_column_map(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize must be a positive number of rows")
+
+    sources = collect_source_files(args.source)
+    if not sources:
+        logger.error(f"No index files found for {args.source}")
+        return 1
+
+    try:
+        report = convert_files(sources, args.config, args.output_dir, column_map, args.workers, logger,
+                               args.chunksize, args.sheet)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info(f"Converted {report.converted_count}/{len(report.results)} files "
+                f"in {report.seconds:.2f}s ({report.files_per_second:.1f} files/s)")
+
+    for failure in report.failures:
+        logger.error(f"FAILED {failure.source}: {failure.error}")
+
+    return 1 if report.failures else 0
+
+
+def samplesheet_main(argv: list[str]) -> int:
+    """Compile a BCL Convert sample sheet from a sample manifest and an index kit.
+
+    Args:
+        argv: Command line arguments following the ``samplesheet`` command
+
+    Returns:
+        Process exit code, non-zero if the sheet could not be compiled or has index collisions
+    """
+    from modules.model.config_object import load_config_objects
+    from modules.model.index_kit import validate_index_kit
+    from modules.model.override_cycles import parse_run_cycles
+    from modules.model.samplesheet import DEFAULT_BARCODE_MISMATCHES, compile_sample_sheet, load_kit, read_manifest
+
+    parser = argparse.ArgumentParser(prog="index_tool.py samplesheet",
+                                     description="Assign kit indexes to samples and write a BCL Convert sample sheet.")
+    parser.add_argument("kit", type=Path, help="index kit file (.tsv, .csv, .xlsx or exported .json)")
+    parser.add_argument("manifest", type=Path,
+                        help="CSV with a Sample_ID column, optionally Lane and kit fields such as WellDual")
+    parser.add_argument("-c", "--config", required=True, help="config name from config/config_objects.yaml")
+    parser.add_argument("-o", "--output", type=Path, default=Path("SampleSheet.csv"),
+                        help="sample sheet to write (default: SampleSheet.csv)")
+    parser.add_argument("-m", "--map", action="append", default=[], metavar="OLD=NEW",
+                        help="relabel a kit column before validation, may be repeated")
+    parser.add_argument("--sheet", default=None, help="sheet to read from an .xlsx kit (default: the first)")
+    parser.add_argument("--barcode-mismatches", type=int, default=DEFAULT_BARCODE_MISMATCHES, metavar="N",
+                        help=f"mismatches allowed per index read (default: {DEFAULT_BARCODE_MISMATCHES})")
+    parser.add_argument("--i5-reverse-complement", action="store_true",
+                        help="write Index2 as the reverse complement of the kit I5 sequence")
+    parser.add_argument("--run-cycles", default=None, metavar="R1,I1,I2,R2",
+                        help="cycles of the run, such as 151,10,10,151, adds OverrideCycles for every sample")
+    parser.add_argument("--force", action="store_true", help="write the sheet even if lanes have index collisions")
+    args = parser.parse_args(argv)
+
+    logger = logging.getLogger("index_tool.samplesheet")
+
+    try:
+        column_map = parse_column_map(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    try:
+        run_cycles = parse_run_cycles(args.run_cycles) if args.run_cycles else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        configs = load_config_objects()
+        if args.config not in configs:
+            raise ValueError(f"Unknown config name '{args.config}', expected one of: {', '.join(configs)}")
+
+        config = configs[args.config]
+        kit = load_kit(args.kit, column_map, args.sheet)
+        validate_index_kit(kit, config)
+
+        sheet = compile_sample_sheet(kit, config, read_manifest(args.manifest), args.barcode_mismatches,
+                                     args.i5_reverse_complement, run_cycles)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+
+    for check in sheet.lane_checks:
+        if check.ok:
+            logger.info(check.describe())
+        else:
+            logger.error(check.describe())
+
+    logger.info(sheet.describe())
+
+    if not sheet.ok and not args.force:
+        logger.error(f"Not writing {args.output}, lower --barcode-mismatches or pass --force")
+        return 1
+
+    sheet.write(args.output)
+    logger.info(f"Wrote {args.output}")
+
+    return 0 if sheet.ok else 1
+
+
+def cdi_main(argv: list[str]) -> int:
+    """Write every I7 x I5 pair of a combinatorial dual index kit.
+
+    Args:
+        argv: Command line arguments following the ``cdi`` command
+
+    Returns:
+        Process exit code, non-zero if the pairs could not be written
+    """
+    from modules.model.cdi_pairs import CDI_FORMATS, DEFAULT_MAX_DISTANCE, cdi_indexes, write_cdi_pairs
+    from modules.model.config_object import load_config_objects
+    from modules.model.index_kit import validate_index_kit
+    from modules.model.samplesheet import DEFAULT_BARCODE_MISMATCHES, load_kit
+
+    parser = argparse.ArgumentParser(prog="index_tool.py cdi",
+                                     description="Write every I7 x I5 pair of a combinatorial dual index kit.")
+    parser.add_argument("kit", type=Path, help="index kit file (.tsv, .csv, .xlsx or exported .json)")
+    parser.add_argument("-c", "--config", required=True, help="config name from config/config_objects.yaml")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="file to write the pairs to")
+    parser.add_argument("--format", choices=sorted(set(CDI_FORMATS.values())), default=None,
+                        help="output format (default: from the output suffix, .json, .csv or SampleSheet*.csv)")
+    parser.add_argument("-m", "--map", action="append", default=[], metavar="OLD=NEW",
+                        help="relabel a kit column before validation, may be repeated")
+    parser.add_argument("--sheet", default=None, help="sheet to read from an .xlsx kit (default: the first)")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE, metavar="N",
+                        help=f"count pairs within N mismatches of another pair (default: {DEFAULT_MAX_DISTANCE})")
+    parser.add_argument("--barcode-mismatches", type=int, default=DEFAULT_BARCODE_MISMATCHES, metavar="N",
+                        help=f"BarcodeMismatches of a sample sheet (default: {DEFAULT_BARCODE_MISMATCHES})")
+    args = parser.parse_args(argv)
+
+    logger = logging.getLogger("index_tool.cdi")
+
+    try:
+        column_map = parse_column_map(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.max_distance < 0:
+        parser.error("--max-distance can not be negative")
+
+    try:
+        configs = load_config_objects()
+        if args.config not in configs:
+            raise ValueError(f"Unknown config name '{args.config}', expected one of: {', '.join(configs)}")
+
+        config = configs[args.config]
+        kit = load_kit(args.kit, column_map, args.sheet)
+        validate_index_kit(kit, config)
+
+        indexes = cdi_indexes(kit.index_df, config, args.max_distance)
+        stats = write_cdi_pairs(indexes, kit, args.output, args.format, args.barcode_mismatches)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info(stats.describe())
+    logger.info(f"Wrote {args.output}")
+
+    return 0
+
+
 def main() -> NoReturn:
     """Application entry point."""
     setup_logging()
     logger = logging.getLogger(__name__)
+
+    if sys.argv[1:2] == ["convert"]:
+        sys.exit(convert_main(sys.argv[2:]))
+
+    if sys.argv[1:2] == ["samplesheet"]:
+        sys.exit(samplesheet_main(sys.argv[2:]))
+
+    if sys.argv[1:2] == ["cdi"]:
+        sys.exit(cdi_main(sys.argv[2:]))
+
     logger.info("Starting IndexTool")
-    
+
     try:
+        from modules.controller.controller import MainController
+        from modules.view.application import Application
+
         app = Application(sys.argv)
         controller = MainController()
         controller.main_window.show()
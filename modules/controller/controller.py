@@ -5,14 +5,15 @@ from PySide6.QtCore import QObject
 from modules.model.data_manager import DataManager
 from modules.view.central_widget.central_widget import CentralWidget
 from modules.view.draggable_labels.draggable_labels import DraggableLabelsContainer
-from modules.view.index_table.droppable_table import DroppableTableWidget
-from modules.view.logging.statusbar_handler import StatusBarLogHandler
+from modules.view.index_table.droppable_table import DroppableTableView
+from modules.model.statushandler.statusbar_handler import StatusBarLogHandler
 from modules.view.main_window import MainWindow
-from modules.view.logging.statusbar import StatusBar
+from modules.view.statusbar.statusbar import StatusBar
 from modules.view.metadata.index_metadata.index_metadata import IndexMetadata
 from modules.view.metadata.resource_settings.resource_settings_widget import ResourceSettingsWidget
 from modules.view.metadata.index_kit_settings.index_kit_settings_widget import IndexKitSettingsWidget
 from modules.view.metadata.user_settings.user_settings_widget import UserSettingsWidget
+from modules.view.validation.validation_widget import ValidationWidget
 
 
 class MainController(QObject):
@@ -32,7 +33,8 @@ class MainController(QObject):
         self._draggable_labels_container_widget = DraggableLabelsContainer(self._data_manager, self._logger)
         self._user_settings_widget = UserSettingsWidget(self._data_manager, self._logger)
         self._index_kit_settings_widget = IndexKitSettingsWidget(self._data_manager, self._logger)
-        self._droppable_table_widget = DroppableTableWidget(0, 0, self._data_manager)
+        self._droppable_table_widget = DroppableTableView(self._data_manager)
+        self._validation_widget = ValidationWidget(self._data_manager, self._logger)
 
         self._statusbar = StatusBar()
         self._statusbar_handler = StatusBarLogHandler(self._statusbar)
@@ -45,7 +47,8 @@ class MainController(QObject):
                                              self._user_settings_widget,
                                              self._index_kit_settings_widget,
                                              self._index_metadata,
-                                             self._logger)
+                                             self._logger,
+                                             self._validation_widget)
 
 
         self.main_window = MainWindow(self._central_widget, self._statusbar)
@@ -57,20 +60,41 @@ class MainController(QObject):
         self._user_settings_widget.set_ad_user()
 
     def _set_connections(self):
-        self._data_manager.config_name_changed.connect(self._draggable_labels_container_widget.show_labels)
-        self._data_manager.index_df_changed.connect(self._droppable_table_widget.set_index_table_widget_data)
-
-        self._data_manager.index_kit_name_changed.connect(self._index_kit_settings_widget.set_index_kit_name)
-        self._data_manager.display_name_changed.connect(self._index_kit_settings_widget.set_display_name)
-        self._data_manager.version_changed.connect(self._index_kit_settings_widget.set_version)
-        self._data_manager.description_changed.connect(self._index_kit_settings_widget.set_description)
-        self._data_manager.adapter_read_1_changed.connect(self._resources_settings_widget.set_adapter_read_1)
-        self._data_manager.adapter_read_2_changed.connect(self._resources_settings_widget.set_adapter_read_2)
-
-        self._data_manager.import_filepath_changed.connect(self._index_metadata.set_import_filepath)
-        self._data_manager.import_filetype_changed.connect(self._index_metadata.set_import_filetype)
-        self._data_manager.ilmn_seq_strategy_changed.connect(self._index_metadata.set_ilmn_seq_strategy)
-        self._data_manager.ilmn_fixed_layout_changed.connect(self._index_metadata.set_ilmn_fixed_layout)
-        self._data_manager.index_i5_count_changed.connect(self._index_metadata.set_index_i5_count)
-        self._data_manager.index_i7_count_changed.connect(self._index_metadata.set_index_i7_count)
-        self._data_manager.ilmn_umi_compatible_changed.connect(self._index_metadata.set_ilmn_umi_compatible)
+        # Widget refreshes per changed DataManager field, each called once per committed change set
+        self._change_slots = {
+            "config_name": (self._draggable_labels_container_widget.show_labels, self._validation_widget.refresh),
+            "index_df": (self._droppable_table_widget.set_index_table_widget_data, self._validation_widget.refresh),
+            "column_mapping": (self._droppable_table_widget.set_column_mapping, self._validation_widget.refresh),
+
+            "index_kit_name": (self._index_kit_settings_widget.set_index_kit_name,),
+            "display_name": (self._index_kit_settings_widget.set_display_name,),
+            "version": (self._index_kit_settings_widget.set_version,),
+            "description": (self._index_kit_settings_widget.set_description,),
+            "adapter_read_1": (self._resources_settings_widget.set_adapter_read_1,),
+            "adapter_read_2": (self._resources_settings_widget.set_adapter_read_2,),
+
+            "import_filepath": (self._index_metadata.set_import_filepath,),
+            "import_filetype": (self._index_metadata.set_import_filetype,),
+            "ilmn_seq_strategy": (self._index_metadata.set_ilmn_seq_strategy,),
+            "ilmn_fixed_layout": (self._index_metadata.set_ilmn_fixed_layout,),
+            "index_i5_count": (self._index_metadata.set_index_i5_count,),
+            "index_i7_count": (self._index_metadata.set_index_i7_count,),
+            "ilmn_umi_compatible": (self._index_metadata.set_ilmn_umi_compatible,),
+        }
+
+        self._data_manager.changes_committed.connect(self._apply_changes)
+
+        self._data_manager.task_started.connect(self._statusbar.start_task)
+        self._data_manager.task_progress.connect(self._statusbar.set_task_progress)
+        self._data_manager.task_finished.connect(self._statusbar.finish_task)
+        self._statusbar.cancel_requested.connect(self._data_manager.cancel_task)
+
+    def _apply_changes(self, changes: dict):
+        slots = []
+        for name in changes:
+            for slot in self._change_slots.get(name, ()):
+                if slot not in slots:
+                    slots.append(slot)
+
+        for slot in slots:
+            slot()
@@ -0,0 +1,153 @@
+import glob
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from modules.model.config_object import ConfigObject, load_config_objects
+from modules.model.index_kit import export_index_kit, load_index_kit, load_index_kit_chunked, map_index_columns
+
+SOURCE_FORMATS = {
+    ".tsv": "tsv_ilmn",
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+}
+
+class ConvertResult:
+    def __init__(self, source: Path, target: Path | None, error: str | None, seconds: float,
+                 warnings: list[str] | None = None, load_stats=None):
+        self.source = source
+        self.target = target
+        self.error = error
+        self.seconds = seconds
+        self.warnings = warnings or []
+        # ChunkedLoadStats when the source was read in chunks
+        self.load_stats = load_stats
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchReport:
+    def __init__(self, results: list[ConvertResult], seconds: float):
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def failures(self) -> list[ConvertResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def converted_count(self) -> int:
+        return len(self.results) - len(self.failures)
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.seconds if self.seconds > 0 else 0.0
+
+
+def collect_source_files(source: str) -> list[Path]:
+    """ Resolve a directory or glob pattern to the index files it contains. """
+    source_path = Path(source)
+
+    if source_path.is_dir():
+        candidates = source_path.iterdir()
+    elif source_path.is_file():
+        candidates = [source_path]
+    else:
+        candidates = (Path(p) for p in glob.glob(source, recursive=True))
+
+    return sorted(p for p in candidates if p.is_file() and p.suffix.lower() in SOURCE_FORMATS)
+
+
+def target_path(source: Path, output_dir: Path | None) -> Path:
+    target = source.with_suffix(".json")
+    if output_dir is not None:
+        target = output_dir / target.name
+    return target
+
+
+def convert_file(source: Path,
+                 config: ConfigObject,
+                 output_dir: Path | None = None,
+                 column_map: dict[str, str] | None = None,
+                 chunk_rows: int | None = None,
+                 sheet_name: str | None = None) -> ConvertResult:
+    """ Load, validate and export one index file. Runs in a worker process.
+
+    With chunk_rows, CSV files are streamed in chunks of that many rows and
+    only the columns config needs are kept. sheet_name selects the sheet of
+    xlsx files, the first by default.
+    """
+
+    start = time.perf_counter()
+    target = target_path(source, output_dir)
+    source_format = SOURCE_FORMATS[source.suffix.lower()]
+    warnings = []
+    load_stats = None
+
+    try:
+        if chunk_rows and source_format == "csv":
+            kit, report, load_stats = load_index_kit_chunked(source, config, column_map, chunk_rows)
+        else:
+            kit = load_index_kit(source, source_format, sheet_name=sheet_name if source_format == "xlsx" else None)
+            report = None
+
+            if column_map:
+                kit = map_index_columns(kit, column_map)
+
+        collision_reports = export_index_kit(kit, config, target, report=report)
+        warnings = list(kit.parse_messages)
+        warnings += [report.describe() for report in collision_reports if report.collision_count]
+        error = None
+
+    except Exception as e:
+        error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+
+    return ConvertResult(source, None if error else target, error, time.perf_counter() - start, warnings, load_stats)
+
+
+def convert_files(sources: list[Path],
+                  config_name: str,
+                  output_dir: Path | None = None,
+                  column_map: dict[str, str] | None = None,
+                  workers: int | None = None,
+                  logger: logging.Logger | None = None,
+                  chunk_rows: int | None = None,
+                  sheet_name: str | None = None) -> BatchReport:
+    """ Convert all sources to JSON across a process pool. """
+
+    configs = load_config_objects()
+    if config_name not in configs:
+        raise ValueError(f"Unknown config name '{config_name}', expected one of: {', '.join(configs)}")
+
+    config = configs[config_name]
+
+    if output_dir is not None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(convert_file, source, config, output_dir, column_map, chunk_rows, sheet_name)
+                   for source in sources]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            if logger is not None:
+                if result.ok:
+                    logger.info(f"converted {result.source} -> {result.target} ({result.seconds:.3f}s)")
+                    if result.load_stats is not None:
+                        logger.info(f"{result.source}: read {result.load_stats.describe()}")
+                    for warning in result.warnings:
+                        logger.warning(f"{result.source}: {warning}")
+                else:
+                    logger.error(f"failed {result.source}: {result.error}")
+
+    results.sort(key=lambda r: str(r.source))
+
+    return BatchReport(results, time.perf_counter() - start)
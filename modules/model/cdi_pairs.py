@@ -0,0 +1,266 @@
+import csv
+import json
+import re
+from pathlib import Path
+from typing import Iterator, TextIO
+
+import numpy as np
+import pandas as pd
+
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit
+from modules.model.index_set_processing import hamming_pairs
+from modules.model.samplesheet import DATA_INDEX_COLUMNS, DEFAULT_BARCODE_MISMATCHES, SAMPLE_ID, sheet_settings, \
+    write_sheet_sections
+from modules.model.sequence_store import PackedSequences
+
+CDI_READS = ("IndexI7", "IndexI5")
+
+# Pairs per block, a block holds whole I7 rows against every I5
+DEFAULT_BLOCK_PAIRS = 16_384
+
+# Pairs within this many mismatches of another pair are counted as collisions
+DEFAULT_MAX_DISTANCE = 2
+
+# Output formats by file suffix, .csv files named SampleSheet* are written as sample sheets
+CDI_FORMATS = {".json": "json", ".csv": "csv", "samplesheet": "samplesheet"}
+
+# Characters BCL Convert does not accept in a Sample_ID
+_INVALID_SAMPLE_ID_CHARACTERS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def _text(series: pd.Series) -> np.ndarray:
+    return series.fillna("").astype(str).str.strip().to_numpy(dtype=object)
+
+
+def _nearest_distances(sequences: np.ndarray, max_distance: int) -> np.ndarray:
+    """ Hamming distance of every sequence to its closest other one, max_distance + 1 if further. """
+    nearest = np.full(len(sequences), max_distance + 1, dtype=np.int64)
+
+    pairs, distances = hamming_pairs(PackedSequences.from_strings(sequences), max_distance)
+    np.minimum.at(nearest, pairs[:, 0], distances)
+    np.minimum.at(nearest, pairs[:, 1], distances)
+
+    return nearest
+
+
+class CdiIndexes:
+    """ The I7 and I5 lists of a combinatorial dual index kit, every I7 pairs with every I5.
+
+    fields maps each read to its kit fields and their values, nearest holds
+    the distance of each index to the closest other index of its read.
+    """
+
+    __slots__ = ("fields", "nearest", "max_distance")
+
+    def __init__(self, fields: dict[str, dict[str, np.ndarray]], nearest: dict[str, np.ndarray], max_distance: int):
+        self.fields = fields
+        self.nearest = nearest
+        self.max_distance = max_distance
+
+    @property
+    def columns(self) -> list[str]:
+        return [field for read_fields in self.fields.values() for field in read_fields]
+
+    def count(self, read: str) -> int:
+        return len(self.nearest[read])
+
+    @property
+    def pair_count(self) -> int:
+        return self.count("IndexI7") * self.count("IndexI5")
+
+
+def cdi_indexes(df: pd.DataFrame, config: ConfigObject, max_distance: int = DEFAULT_MAX_DISTANCE) -> CdiIndexes:
+    """ The I7 and I5 rows of df with a sequence, with the fields of their index sets.
+
+    Wells are part of the fields when the config has Well set.
+    """
+    set_of_read = {}
+    for set_name, set_fields in config.index_sets.items():
+        for read in CDI_READS:
+            if read in set_fields:
+                set_of_read.setdefault(read, []).append(set_name)
+
+    if any(len(set_of_read.get(read, ())) != 1 for read in CDI_READS) \
+            or set_of_read["IndexI7"] == set_of_read["IndexI5"]:
+        raise ValueError(f"Config {config.config_type_name} does not have separate IndexI7 and IndexI5 sets")
+
+    fields = {}
+    nearest = {}
+
+    for read in CDI_READS:
+        set_fields = config.index_sets[set_of_read[read][0]]
+        missing = [field for field in set_fields if field not in df.columns]
+        if missing:
+            raise ValueError(f"No {', '.join(missing)} column in the index table")
+
+        sequences = _text(df[read])
+        rows = np.flatnonzero(sequences != "")
+        if not len(rows):
+            raise ValueError(f"No {read} sequences in the index table")
+
+        fields[read] = {field: _text(df[field])[rows] for field in set_fields}
+        nearest[read] = _nearest_distances(fields[read][read], max_distance)
+
+    return CdiIndexes(fields, nearest, max_distance)
+
+
+class CdiCollisionStats:
+    """ Collision counts of the pairs streamed so far.
+
+    The closest other pair of a CDI pair shares its I7 or its I5, so its
+    distance is the smaller of the nearest I7 and nearest I5 distances.
+    Pairs are only counted, never compared with each other.
+    """
+
+    __slots__ = ("max_distance", "pair_count", "histogram")
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self.pair_count = 0
+        # Pairs whose closest other pair is 0, 1, .. max_distance mismatches away
+        self.histogram = np.zeros(max_distance + 1, dtype=np.int64)
+
+    def update(self, nearest: np.ndarray):
+        self.pair_count += len(nearest)
+        self.histogram += np.bincount(nearest, minlength=self.max_distance + 2)[:self.max_distance + 1]
+
+    @property
+    def collision_count(self) -> int:
+        """ Pairs with another pair within max_distance mismatches. """
+        return int(self.histogram.sum())
+
+    @property
+    def min_distance(self) -> int | None:
+        """ Smallest distance between two pairs, None if all are further apart than max_distance. """
+        found = np.flatnonzero(self.histogram)
+        return int(found[0]) if len(found) else None
+
+    def describe(self) -> str:
+        if not self.collision_count:
+            return f"{self.pair_count} pairs, none within {self.max_distance} mismatches of another pair"
+        return (f"{self.pair_count} pairs, {self.collision_count} within {self.max_distance} mismatches "
+                f"of another pair, min distance {self.min_distance}")
+
+    def to_dict(self) -> dict:
+        return {
+            "Pairs": self.pair_count,
+            "MaxDistanceChecked": self.max_distance,
+            "CollidingPairs": self.collision_count,
+            "MinDistance": self.min_distance,
+            "PairsByDistance": {str(distance): int(count) for distance, count in enumerate(self.histogram) if count},
+        }
+
+
+def iter_cdi_blocks(indexes: CdiIndexes, block_pairs: int = DEFAULT_BLOCK_PAIRS,
+                    stats: CdiCollisionStats | None = None) -> Iterator[dict[str, np.ndarray]]:
+    """ All I7 x I5 pairs in blocks of columns, I7 major, updating stats on the way.
+
+    Only one block is held at a time, the full product is never built.
+    """
+    i7_count, i5_count = indexes.count("IndexI7"), indexes.count("IndexI5")
+    i7_per_block = max(1, block_pairs // i5_count)
+
+    for start in range(0, i7_count, i7_per_block):
+        stop = min(start + i7_per_block, i7_count)
+        i7_rows = np.repeat(np.arange(start, stop), i5_count)
+        i5_rows = np.tile(np.arange(i5_count), stop - start)
+
+        block = {}
+        for read, rows in (("IndexI7", i7_rows), ("IndexI5", i5_rows)):
+            for field, values in indexes.fields[read].items():
+                block[field] = values[rows]
+
+        if stats is not None:
+            stats.update(np.minimum(indexes.nearest["IndexI7"][i7_rows], indexes.nearest["IndexI5"][i5_rows]))
+
+        yield block
+
+
+def iter_cdi_pairs(indexes: CdiIndexes, stats: CdiCollisionStats | None = None) -> Iterator[dict[str, str]]:
+    """ Every pair as a record of its I7 and I5 fields. """
+    columns = indexes.columns
+    for block in iter_cdi_blocks(indexes, stats=stats):
+        for values in zip(*block.values()):
+            yield dict(zip(columns, values))
+
+
+def write_cdi_json(indexes: CdiIndexes, fh: TextIO, stats: CdiCollisionStats | None = None) -> CdiCollisionStats:
+    """ {"Pairs": [...], "CollisionStats": {...}}, the pairs written block by block.
+
+    Every record is encoded with json.dumps, so names with quotes or
+    backslashes are escaped as in json.dump.
+    """
+    stats = stats or CdiCollisionStats(indexes.max_distance)
+    columns = indexes.columns
+
+    fh.write('{\n    "Pairs": [')
+    separator = "\n        "
+    for block in iter_cdi_blocks(indexes, stats=stats):
+        records = [json.dumps(dict(zip(columns, values))) for values in zip(*block.values())]
+
+        fh.write(separator + ",\n        ".join(records))
+        separator = ",\n        "
+
+    fh.write('\n    ],\n    "CollisionStats": ' + json.dumps(stats.to_dict()) + "\n}\n")
+    return stats
+
+
+def write_cdi_csv(indexes: CdiIndexes, fh: TextIO, stats: CdiCollisionStats | None = None) -> CdiCollisionStats:
+    """ One row per pair with the I7 and I5 fields as columns. """
+    stats = stats or CdiCollisionStats(indexes.max_distance)
+
+    writer = csv.writer(fh, lineterminator="\n")
+    writer.writerow(indexes.columns)
+    for block in iter_cdi_blocks(indexes, stats=stats):
+        writer.writerows(zip(*block.values()))
+
+    return stats
+
+
+def cdi_sample_ids(block: dict[str, np.ndarray]) -> np.ndarray:
+    """ I7Name-I5Name per pair, characters BCL Convert rejects replaced by _. """
+    names = pd.Series(block["IndexI7Name"], dtype="str") + "-" + pd.Series(block["IndexI5Name"], dtype="str")
+    return names.str.replace(_INVALID_SAMPLE_ID_CHARACTERS, "_", regex=True).to_numpy(dtype=object)
+
+
+def write_cdi_sample_sheet(indexes: CdiIndexes, kit: IndexKit, fh: TextIO,
+                           barcode_mismatches: int = DEFAULT_BARCODE_MISMATCHES,
+                           stats: CdiCollisionStats | None = None) -> CdiCollisionStats:
+    """ A BCL Convert sample sheet with one sample per pair, named after its I7 and I5. """
+    stats = stats or CdiCollisionStats(indexes.max_distance)
+
+    writer = csv.writer(fh, lineterminator="\n")
+    columns = [SAMPLE_ID] + [DATA_INDEX_COLUMNS[read] for read in CDI_READS]
+    write_sheet_sections(writer, {}, sheet_settings(kit, len(CDI_READS), barcode_mismatches), columns)
+
+    for block in iter_cdi_blocks(indexes, stats=stats):
+        writer.writerows(zip(cdi_sample_ids(block), block["IndexI7"], block["IndexI5"]))
+
+    return stats
+
+
+def cdi_format(filepath: Path) -> str:
+    """ Output format of filepath from its suffix. """
+    suffix = filepath.suffix.lower()
+    if suffix == ".csv" and filepath.name.lower().startswith("samplesheet"):
+        return CDI_FORMATS["samplesheet"]
+    if suffix not in CDI_FORMATS:
+        raise ValueError(f"Unknown output format of {filepath.name}, expected .json or .csv")
+    return CDI_FORMATS[suffix]
+
+
+def write_cdi_pairs(indexes: CdiIndexes, kit: IndexKit, filepath: Path, output_format: str | None = None,
+                    barcode_mismatches: int = DEFAULT_BARCODE_MISMATCHES) -> CdiCollisionStats:
+    """ Write every pair to filepath as JSON, CSV or a sample sheet, the format from the suffix if not given. """
+    output_format = output_format or cdi_format(filepath)
+
+    with open(filepath, "w", encoding="utf-8", newline="") as fh:
+        if output_format == "json":
+            return write_cdi_json(indexes, fh)
+        if output_format == "csv":
+            return write_cdi_csv(indexes, fh)
+        if output_format == "samplesheet":
+            return write_cdi_sample_sheet(indexes, kit, fh, barcode_mismatches)
+
+    raise ValueError(f"Unknown output format '{output_format}'")
@@ -0,0 +1,303 @@
+import numpy as np
+import pandas as pd
+
+from modules.model.sequence_store import BASES, PackedSequences
+
+TWO_CHANNEL = "two_channel"
+FOUR_CHANNEL = "four_channel"
+
+# Bases giving signal in each channel. On 2-channel instruments (NextSeq,
+# NovaSeq) A shows in both and G in neither, on 4-channel instruments (MiSeq,
+# HiSeq) the red laser reads A and C, the green one G and T.
+CHANNEL_BASES = {
+    TWO_CHANNEL: {"red": "AC", "green": "AT"},
+    FOUR_CHANNEL: {"red": "AC", "green": "GT"},
+}
+
+DARK_CYCLE = "dark_cycle"
+MISSING_CHANNEL = "missing_channel"
+LOW_DIVERSITY = "low_diversity"
+
+# A cycle where one base makes up more than this share of the pool has low diversity
+DEFAULT_MAX_BASE_FRACTION = 0.8
+
+# Layout of the last axis of the per-cycle matrices, the four bases then
+# the weight of the pool that has a base at that cycle at all
+_COVERED = len(BASES)
+_SLOTS = len(BASES) + 1
+
+
+class CycleIssue:
+    """ One flagged cycle (1-based) of one index read of a pool. """
+
+    __slots__ = ("rule", "read", "cycle", "detail")
+
+    def __init__(self, rule: str, read: str, cycle: int, detail: str):
+        self.rule = rule
+        self.read = read
+        self.cycle = cycle
+        self.detail = detail
+
+    def describe(self) -> str:
+        return f"{self.read} cycle {self.cycle}: {self.detail}"
+
+    def to_dict(self) -> dict:
+        return {"Rule": self.rule, "Read": self.read, "Cycle": self.cycle, "Detail": self.detail}
+
+    def __repr__(self):
+        return f"CycleIssue({self.rule!r}, {self.read!r}, cycle={self.cycle})"
+
+
+class ColorBalanceReport:
+    """ Base composition per cycle of each index read of one pool, with the flagged cycles.
+
+    compositions maps each read to a (cycles, 4) matrix of A, C, G, T
+    fractions. score is the weakest channel share over all cycles, 0 if a
+    cycle lacks a channel.
+    """
+
+    __slots__ = ("rows", "compositions", "issues", "score")
+
+    def __init__(self, rows: np.ndarray, compositions: dict[str, np.ndarray], issues: list[CycleIssue],
+                 score: float):
+        self.rows = rows
+        self.compositions = compositions
+        self.issues = issues
+        self.score = score
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def describe(self) -> str:
+        if self.ok:
+            return f"{len(self.rows)} indexes, balanced (weakest channel {self.score:.0%})"
+        return f"{len(self.rows)} indexes, " + "; ".join(issue.describe() for issue in self.issues)
+
+    def to_dict(self) -> dict:
+        return {
+            "Rows": [int(row) + 1 for row in self.rows],
+            "Score": self.score,
+            "Compositions": {read: {base: composition[:, i].round(4).tolist() for i, base in enumerate(BASES)}
+                             for read, composition in self.compositions.items()},
+            "Issues": [issue.to_dict() for issue in self.issues],
+        }
+
+
+def base_one_hot(sequences) -> np.ndarray:
+    """ (n, cycles, 5) float32 of the A, C, G, T indicators per cycle, then 1 where a base is present. """
+    packed = PackedSequences.from_strings(sequences)
+    codes = packed.codes()
+    covered = np.arange(codes.shape[1]) < packed.lengths[:, None]
+
+    one_hot = np.zeros((len(packed), codes.shape[1], _SLOTS), dtype=np.float32)
+    np.put_along_axis(one_hot, codes[:, :, None].astype(np.intp), 1.0, axis=2)
+    one_hot[:, :, :_COVERED] *= covered[:, :, None]
+    one_hot[:, :, _COVERED] = covered
+
+    return one_hot
+
+
+class ColorBalanceAnalyzer:
+    """ Scores pools of indexes drawn from a kit by their per-cycle colour balance.
+
+    reads maps each index read, such as IndexI7 and IndexI5, to the
+    sequences of all candidate indexes, row aligned across reads. A pool is
+    a set of candidate rows. Its per-cycle base counts are one matrix
+    product of pool memberships with the one-hot encoded sequences, so
+    thousands of pools are scored in one call.
+    """
+
+    def __init__(self, reads: dict[str, list[str]], chemistry: str = TWO_CHANNEL,
+                 max_base_fraction: float = DEFAULT_MAX_BASE_FRACTION, rows: np.ndarray | None = None):
+        if chemistry not in CHANNEL_BASES:
+            raise ValueError(f"Unknown chemistry '{chemistry}', expected one of: {', '.join(CHANNEL_BASES)}")
+
+        if not reads:
+            raise ValueError("No index reads to analyse")
+
+        lengths = {len(sequences) for sequences in reads.values()}
+        if len(lengths) != 1:
+            raise ValueError("All index reads need a sequence for every candidate")
+
+        self._chemistry = chemistry
+        self._max_base_fraction = max_base_fraction
+        self._size = lengths.pop()
+        self._rows = np.arange(self._size) if rows is None else np.asarray(rows)
+
+        self._read_names = list(reads)
+        self._cycles = []
+        one_hots = []
+
+        for sequences in reads.values():
+            one_hot = base_one_hot(sequences)
+            self._cycles.append(one_hot.shape[1])
+            one_hots.append(one_hot.reshape(self._size, -1))
+
+        # (candidates, sum of cycles * 5) so all reads are counted by one product
+        self._one_hot = np.concatenate(one_hots, axis=1)
+
+        self._channel_masks = np.array([[base in channel_bases for base in BASES]
+                                        for channel_bases in CHANNEL_BASES[chemistry].values()], dtype=np.float32)
+
+    @classmethod
+    def from_index_df(cls, df: pd.DataFrame, columns=("IndexI7", "IndexI5"), **kwargs) -> "ColorBalanceAnalyzer":
+        """ Candidates are the rows of df with every present index column filled. """
+        present = [column for column in columns if column in df.columns]
+        if not present:
+            raise ValueError(f"None of the index columns {', '.join(columns)} is in the table")
+        columns = present
+
+        values = df[columns].fillna("").astype(str).apply(lambda s: s.str.strip())
+        filled = values.ne("").all(axis=1).to_numpy()
+
+        reads = {column: values.loc[filled, column].tolist() for column in columns}
+        return cls(reads, rows=np.flatnonzero(filled), **kwargs)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def rows(self) -> np.ndarray:
+        """ Table row of each candidate. """
+        return self._rows
+
+    def candidates(self, table_rows) -> np.ndarray:
+        """ Candidate indexes of table rows, raising ValueError for rows without index sequences. """
+        table_rows = np.asarray(table_rows, dtype=np.intp)
+        positions = np.searchsorted(self._rows, table_rows)
+        found = (positions < len(self._rows)) & (self._rows[np.minimum(positions, len(self._rows) - 1)] == table_rows)
+        if not found.all():
+            missing = ", ".join(str(row + 1) for row in table_rows[~found][:5])
+            raise ValueError(f"No index sequences in rows {missing}")
+        return positions
+
+    @property
+    def read_names(self) -> list[str]:
+        return list(self._read_names)
+
+    @property
+    def chemistry(self) -> str:
+        return self._chemistry
+
+    def membership(self, pools, weights: np.ndarray | None = None) -> np.ndarray:
+        """ (pools, candidates) float32 weights from a boolean matrix, index lists or an index array.
+
+        weights scales each candidate, for instance by its share of the pooled library.
+        """
+        if isinstance(pools, np.ndarray) and pools.dtype == bool:
+            matrix = pools.reshape(-1, self._size).astype(np.float32)
+        elif isinstance(pools, np.ndarray) and pools.ndim == 2:
+            # Pools of equal size, one row of candidate indexes each
+            matrix = np.zeros((len(pools), self._size), dtype=np.float32)
+            matrix[np.arange(len(pools))[:, None], pools] = 1.0
+        else:
+            pools = [np.asarray(pool, dtype=np.intp) for pool in pools]
+            matrix = np.zeros((len(pools), self._size), dtype=np.float32)
+            if pools:
+                pool_ids = np.repeat(np.arange(len(pools)), [len(pool) for pool in pools])
+                matrix[pool_ids, np.concatenate(pools)] = 1.0
+
+        if weights is not None:
+            matrix *= np.asarray(weights, dtype=np.float32)
+
+        return matrix
+
+    @property
+    def candidate_counts(self) -> np.ndarray:
+        """ (candidates, count width) encoding of each candidate, summing rows gives pool counts. """
+        return self._one_hot
+
+    def counts(self, pools, weights: np.ndarray | None = None) -> np.ndarray:
+        """ (pools, count width) weighted base counts and covered weight of every cycle of every read. """
+        return self.membership(pools, weights) @ self._one_hot
+
+    def cycle_counts(self, pools, weights: np.ndarray | None = None) -> list[np.ndarray]:
+        """ Per read, a (pools, cycles, 5) matrix of weighted A, C, G, T counts and covered weight. """
+        return self._split_reads(self.counts(pools, weights))
+
+    def _split_reads(self, counts: np.ndarray) -> list[np.ndarray]:
+        per_read = []
+        start = 0
+        for cycles in self._cycles:
+            width = cycles * _SLOTS
+            per_read.append(counts[:, start:start + width].reshape(len(counts), cycles, _SLOTS))
+            start += width
+
+        return per_read
+
+    def _cycle_metrics(self, counts: np.ndarray):
+        """ Base fractions, channel shares and covered mask, per pool and cycle. """
+        covered = counts[:, :, _COVERED]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fractions = np.where(covered[:, :, None] > 0, counts[:, :, :_COVERED] / covered[:, :, None], 0.0)
+
+        channels = fractions @ self._channel_masks.T
+        return fractions, channels, covered > 0
+
+    def score_pools(self, pools, weights: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """ (scores, flagged cycle counts) per pool.
+
+        The score is the weakest channel share over all cycles of all reads,
+        0 when a cycle has no signal in a channel. A pool is balanced when
+        its flagged cycle count is 0.
+        """
+        return self.score_counts(self.counts(pools, weights))
+
+    def score_counts(self, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ score_pools for pools given by their summed candidate_counts rows. """
+        counts = np.atleast_2d(counts)
+
+        scores = np.full(len(counts), np.inf, dtype=np.float32)
+        flagged = np.zeros(len(counts), dtype=np.int64)
+
+        for read_counts in self._split_reads(counts):
+            fractions, channels, covered = self._cycle_metrics(read_counts)
+
+            weakest = np.where(covered, channels.min(axis=2), np.inf)
+            scores = np.minimum(scores, weakest.min(axis=1, initial=np.inf))
+
+            bad = ((channels == 0).any(axis=2) | (fractions.max(axis=2) > self._max_base_fraction)) & covered
+            flagged += bad.sum(axis=1)
+
+        scores[~np.isfinite(scores)] = 0.0
+        return scores, flagged
+
+    def analyse(self, pool, weights: np.ndarray | None = None) -> ColorBalanceReport:
+        """ Full per-cycle report of one pool, given as candidate indexes or a boolean mask. """
+        if isinstance(pool, np.ndarray) and pool.dtype == bool:
+            members = np.flatnonzero(pool)
+        else:
+            members = np.asarray(pool, dtype=np.intp)
+
+        per_read = self.cycle_counts([members], weights)
+        channel_names = list(CHANNEL_BASES[self._chemistry])
+
+        compositions = {}
+        issues = []
+        score = np.inf
+
+        for read, counts in zip(self._read_names, per_read):
+            fractions, channels, covered = self._cycle_metrics(counts)
+            fractions, channels, covered = fractions[0], channels[0], covered[0]
+            compositions[read] = fractions
+
+            for cycle in np.flatnonzero(covered):
+                dark = channels[cycle] == 0
+                top = int(fractions[cycle].argmax())
+
+                if dark.all():
+                    issues.append(CycleIssue(DARK_CYCLE, read, int(cycle) + 1, "no signal in any channel"))
+                elif dark.any():
+                    missing = ", ".join(name for name, off in zip(channel_names, dark) if off)
+                    issues.append(CycleIssue(MISSING_CHANNEL, read, int(cycle) + 1, f"no signal in {missing} channel"))
+
+                if fractions[cycle, top] > self._max_base_fraction:
+                    issues.append(CycleIssue(LOW_DIVERSITY, read, int(cycle) + 1,
+                                             f"low diversity, {fractions[cycle, top]:.0%} {BASES[top]}"))
+
+            if covered.any():
+                score = min(score, float(channels[covered].min()))
+
+        return ColorBalanceReport(self._rows[members], compositions, issues, 0.0 if score == np.inf else score)
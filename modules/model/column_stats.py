@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Hashable
+
+# Imported where a column is first hashed, kits are created before pandas is needed
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_CACHED_STATS = 4096
+
+# (fingerprint, stat name) -> value, shared by all kits so a column that is
+# unchanged between two loads or table versions is never rescanned
+_stats = OrderedDict()
+_stats_lock = threading.Lock()
+
+
+def _arrow_string_buffers(series: pd.Series) -> list | None:
+    """ Buffers of a pyarrow backed string column, re-laid out from offset 0 if it is a slice. """
+    if getattr(series.dtype, "storage", None) != "pyarrow":
+        return None
+
+    import numpy as np
+    import pyarrow as pa
+
+    array = pa.array(series)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.offset:
+        array = array.take(pa.array(np.arange(len(array))))
+
+    return [buffer for buffer in array.buffers() if buffer is not None]
+
+
+def column_fingerprint(series: pd.Series) -> str:
+    """ Content hash of a column, independent of its name and index.
+
+    Arrow backed string columns are hashed from their buffers, which is
+    much cheaper than hashing every value. Other columns are hashed per
+    value, so no separator character inside a value can make two columns
+    look alike.
+    """
+    import numpy as np
+    import pandas as pd
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(series.dtype).encode())
+
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    buffers = _arrow_string_buffers(series)
+    if buffers is not None:
+        for buffer in buffers:
+            digest.update(buffer)
+        return digest.hexdigest()
+
+    missing = series.isna().to_numpy()
+    digest.update(np.packbits(missing).tobytes())
+    values = series.where(~missing, "").astype(str)
+    digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> tuple:
+    """ (column name, fingerprint) per column, equal for equal tables. """
+    return tuple((column, column_fingerprint(df.iloc[:, i])) for i, column in enumerate(df.columns))
+
+
+def cached_stat(key: Hashable, stat: str, compute: Callable):
+    """ Value of stat for key, computed once and then served from the cache. """
+    cache_key = (key, stat)
+
+    with _stats_lock:
+        if cache_key in _stats:
+            _stats.move_to_end(cache_key)
+            return _stats[cache_key]
+
+    value = compute()
+
+    with _stats_lock:
+        _stats[cache_key] = value
+        while len(_stats) > MAX_CACHED_STATS:
+            _stats.popitem(last=False)
+
+    return value
+
+
+def clear_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def nonempty_values(series: pd.Series) -> pd.Series:
+    values = series.dropna().astype(str).str.strip()
+    return values[values.ne('')]
+
+
+def count_nonempty(series: pd.Series) -> int:
+    return len(nonempty_values(series))
+
+
+def value_lengths(series: pd.Series) -> tuple[int, ...]:
+    """ Sorted distinct lengths of the non-empty values. """
+    return tuple(sorted(int(length) for length in nonempty_values(series).str.len().unique()))
@@ -1,38 +1,197 @@
-from typing import Dict, List
+import hashlib
+import marshal
+import os
+from importlib import resources
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict
+
+from modules.model.load.parse_cache import default_cache_dir
+
+# Bundled definitions, read through importlib.resources so frozen builds find them
+CONFIG_PACKAGE = "config"
+CONFIG_RESOURCE = "config_objects.yaml"
+
+# Bump when the compiled form written to the config cache changes
+CONFIG_CACHE_VERSION = 1
+
+# Key -> (type, required) of a config definition
+CONFIG_SCHEMA = {
+    "ConfigTypeName": (str, True),
+    "Well": (bool, True),
+    "IndexStrategy": (str, True),
+    "IndexSets": (dict, True),
+}
 
 
 class ConfigObject:
-    def __init__(self, kit_def: dict[str, bool, str, dict]):
-        self._def = kit_def
+    """ Immutable kit config, with its index set fields precomputed as tuples. """
+
+    __slots__ = (
+        "config_type_name",
+        "well",
+        "index_strategy",
+        "index_sets",
+        "index_set_names",
+        "all_index_fields",
+        "index_field_set",
+    )
+
+    def __init__(self, kit_def: dict):
+        index_sets = {name: tuple(fields) for name, fields in kit_def["IndexSets"].items()}
+        all_index_fields = tuple(field for fields in index_sets.values() for field in fields)
+
+        values = {
+            "config_type_name": kit_def.get('ConfigTypeName', ""),
+            "well": kit_def.get('Well', None),
+            "index_strategy": kit_def.get('IndexStrategy', None),
+            "index_sets": MappingProxyType(index_sets),
+            "index_set_names": tuple(index_sets),
+            "all_index_fields": all_index_fields,
+            "index_field_set": frozenset(all_index_fields),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ConfigObject is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"ConfigObject is immutable, cannot delete {name}")
+
+    def __reduce__(self):
+        return ConfigObject, (self.definition(),)
+
+    def definition(self) -> dict:
+        """ The config as loaded from YAML, built from plain dicts, lists and scalars. """
+        return {
+            "ConfigTypeName": self.config_type_name,
+            "Well": self.well,
+            "IndexStrategy": self.index_strategy,
+            "IndexSets": {name: list(fields) for name, fields in self.index_sets.items()},
+        }
+
+    def index_set_fields_by_name(self, index_set_name: str) -> tuple[str, ...]:
+        return self.index_sets[index_set_name]
+
+    def __repr__(self):
+        return f"ConfigObject({self.config_type_name!r}, index_sets={dict(self.index_sets)!r})"
+
+
+def validate_config_definition(kit_def, position: int) -> dict:
+    """ Check one YAML config entry against CONFIG_SCHEMA, raising ValueError if it does not fit. """
+    if not isinstance(kit_def, dict):
+        raise ValueError(f"config {position}: expected a mapping, got {type(kit_def).__name__}")
+
+    name = kit_def.get("ConfigTypeName", f"config {position}")
+
+    unknown = [key for key in kit_def if key not in CONFIG_SCHEMA]
+    if unknown:
+        raise ValueError(f"{name}: unknown keys {', '.join(map(str, unknown))}")
+
+    for key, (value_type, required) in CONFIG_SCHEMA.items():
+        if key not in kit_def:
+            if required:
+                raise ValueError(f"{name}: missing {key}")
+            continue
+
+        if not isinstance(kit_def[key], value_type):
+            raise ValueError(f"{name}: {key} must be a {value_type.__name__}")
+
+    if not kit_def["ConfigTypeName"]:
+        raise ValueError(f"config {position}: empty ConfigTypeName")
+
+    if not kit_def["IndexSets"]:
+        raise ValueError(f"{name}: no IndexSets")
+
+    for set_name, fields in kit_def["IndexSets"].items():
+        if not isinstance(fields, list) or not fields or not all(isinstance(f, str) and f for f in fields):
+            raise ValueError(f"{name}: index set {set_name} must be a non-empty list of field names")
+
+        if len(set(fields)) != len(fields):
+            raise ValueError(f"{name}: index set {set_name} repeats a field")
+
+    return kit_def
+
+
+def compile_config_definitions(kit_config_data) -> list[dict]:
+    """ Validated config definitions, in file order, with unique names. """
+    if not isinstance(kit_config_data, list):
+        raise ValueError("config definitions must be a list")
+
+    definitions = [validate_config_definition(kit_def, i) for i, kit_def in enumerate(kit_config_data, start=1)]
+
+    names = [kit_def["ConfigTypeName"] for kit_def in definitions]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise ValueError(f"config names defined more than once: {', '.join(repeated)}")
+
+    return definitions
+
+
+def _read_config_source(path: Path | None) -> bytes:
+    if path is not None:
+        return Path(path).read_bytes()
+    return resources.files(CONFIG_PACKAGE).joinpath(CONFIG_RESOURCE).read_bytes()
+
+
+def _config_source_key(path: Path | None) -> str:
+    """ Short hash of the resolved YAML path, or "bundled" for the packaged config. """
+    if path is None:
+        return "bundled"
+    return hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()[:16]
+
+
+def _config_cache_path(path: Path | None, source: bytes) -> Path:
+    digest = hashlib.sha256(source).hexdigest()[:32]
+    return default_cache_dir() / f"config_objects-{CONFIG_CACHE_VERSION}-{_config_source_key(path)}-{digest}.marshal"
+
+
+def _load_cached_definitions(cache_path: Path) -> list[dict] | None:
+    try:
+        return marshal.loads(cache_path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_cached_definitions(cache_path: Path, source_key: str, definitions: list[dict]):
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(marshal.dumps(definitions))
+        os.replace(tmp_path, cache_path)
 
-    @property
-    def config_type_name(self) -> str:
-        return self._def.get('ConfigTypeName', "")
+        # Earlier versions of the same YAML file are never read again, other files keep their entries
+        for stale in cache_path.parent.glob(f"config_objects-*-{source_key}-*.marshal"):
+            if stale != cache_path:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
 
-    @property
-    def well(self) -> bool:
-        return self._def.get('Well', None)
 
-    @property
-    def index_strategy(self) -> str:
-        return self._def.get('IndexStrategy', None)
+def load_config_objects(path: Path | None = None, use_cache: bool = True) -> Dict[str, ConfigObject]:
+    """ Config objects by name, from path or the bundled config_objects.yaml.
 
-    @property
-    def all_index_fields(self) -> List[str]:
-        output = []
+    The YAML is parsed and validated once per path and content hash. The validated
+    definitions are cached with marshal next to the parse cache, so later
+    starts skip both, and yaml is not imported at all.
+    """
+    source = _read_config_source(path)
+    cache_path = _config_cache_path(path, source)
 
-        for index_set_name in self._def['IndexSets']:
-            output.extend(self._def['IndexSets'][index_set_name])
+    definitions = _load_cached_definitions(cache_path) if use_cache else None
+    if definitions is None:
+        import yaml
 
-        return output
+        definitions = compile_config_definitions(yaml.safe_load(source))
+        if use_cache:
+            _write_cached_definitions(cache_path, _config_source_key(path), definitions)
 
-    @property
-    def index_set_names(self) -> List[str]:
-        return list(self._def['IndexSets'].keys())
+    res = {}
 
-    def index_set_fields_by_name(self, index_set_name: str) -> List[str]:
-        return self._def['IndexSetFields'][index_set_name]
+    for config in definitions:
+        kit_def_obj = ConfigObject(config)
+        res[kit_def_obj.config_type_name] = kit_def_obj
 
-    @property
-    def index_sets(self):
-        return self._def["IndexSets"]
\ No newline at end of file
+    return res
@@ -1,24 +1,33 @@
+from __future__ import annotations
+
 import getpass
-import json
 import re
+import sys
+from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
-from pprint import pprint
+from typing import TYPE_CHECKING
+
+from modules.model.column_stats import frame_fingerprint
+from modules.model.config_object import ConfigObject, load_config_objects
+from PySide6.QtCore import QObject, QThreadPool, Signal
 
-import pandas as pd
+from modules.model.index_kit import IndexKit, INDEX_SEQ_COLUMNS, LOADED_FIELDS, export_index_kit, \
+    load_index_kit, index_kit_validation, log_parse_messages
+from modules.model.task_worker import TaskWorker
 
-from modules.model.config_object import ConfigObject
-from PySide6.QtCore import QObject, Signal
-import yaml
+if TYPE_CHECKING:
+    import pandas as pd
 
-from modules.model.index_set_processing import index_fields_validator, clean_df, index_seq_validator, \
-    nonempty_validator, nonduplicate_validator, index_len
-from modules.model.load.csv_index_data import CsvIndexData
-from modules.model.load.xlsx_index_data import XlsxIndexData
-from modules.model.load.tsv_illumina_index_data import IlluminaIndexData
+    from modules.model.validation import ValidationReport
 
 
 class DataManager(QObject):
+    """ Qt signal adapter over an IndexKit.
+
+    All kit state lives in the plain IndexKit object, this class only adds
+    change notifications for the widgets plus the GUI session settings.
+    """
 
     user_changed = Signal()
     ad_user_changed = Signal()
@@ -50,6 +59,15 @@ class DataManager(QObject):
 
     # Table
     index_df_changed = Signal()
+    column_mapping_changed = Signal()
+
+    # Every committed change set, as {name: (old, new)}
+    changes_committed = Signal(object)
+
+    # Background tasks
+    task_started = Signal(str)
+    task_progress = Signal(int, str)
+    task_finished = Signal()
 
     init_done = Signal()
 
@@ -60,157 +78,177 @@ class DataManager(QObject):
         self._index_source_format = None
 
         self._logger = logger
-        self._config_definition_path = Path("config/config_objects.yaml")
+        # None loads the bundled config/config_objects.yaml
+        self._config_definition_path: Path | None = None
         self._config_definition_data: dict | None = None
 
         self._dna_regex = re.compile(r'^[ATCG]+$', re.IGNORECASE)
-        self._index_seq_col_names = ['IndexI7', 'IndexI5']
 
-        self._uuid = None
+        self._kit = IndexKit()
 
         # User info
-        self._index_df = pd.DataFrame()
         self._user = None
         self._ad_user = None
 
-        # Kit settings
-        self._index_kit_name = None
-        self._display_name = None
-        self._version = None
-        self._description = None
-        self._checksum = None
-
-        # Resources
-        self._adapter_read_1 = None
-        self._adapter_read_2 = None
         self._config_name = None
-        self._override_cycles_read_1 = "Y{r}"
-        self._override_cycles_read_2 = "Y{r}"
-        self._override_cycles_index_1 = "I{i}"
-        self._override_cycles_index_2 = "I{i}"
 
-        self._override_cycles_pattern = None
+        self._thread_pool = QThreadPool.globalInstance()
+        self._task: TaskWorker | None = None
+        self._task_description = ""
+
+        # Changes are merged here until the outermost commit_update
+        self._update_depth = 0
+        self._pending_changes: dict[str, tuple] = {}
+        self._stale_count_labels: set[str] = set()
+
+        self._change_signals = {
+            "user": self.user_changed,
+            "ad_user": self.ad_user_changed,
+            "config_name": self.config_name_changed,
+            "index_df": self.index_df_changed,
+            "column_mapping": self.column_mapping_changed,
+            "index_kit_name": self.index_kit_name_changed,
+            "display_name": self.display_name_changed,
+            "version": self.version_changed,
+            "description": self.description_changed,
+            "checksum": self.checksum_changed,
+            "adapter_read_1": self.adapter_read_1_changed,
+            "adapter_read_2": self.adapter_read_2_changed,
+            "override_cycles_read_1": self.set_override_cycles_read_1_changed,
+            "override_cycles_read_2": self.override_cycles_read_2_changed,
+            "override_cycles_index_1": self.override_cycles_index_1_changed,
+            "override_cycles_index_2": self.override_cycles_index_2_changed,
+            "import_filepath": self.import_filepath_changed,
+            "import_filetype": self.import_filetype_changed,
+            "ilmn_seq_strategy": self.ilmn_seq_strategy_changed,
+            "ilmn_fixed_layout": self.ilmn_fixed_layout_changed,
+            "ilmn_umi_compatible": self.ilmn_umi_compatible_changed,
+            "index_i7_count": self.index_i7_count_changed,
+            "index_i5_count": self.index_i5_count_changed,
+        }
+
+        self._init_settings_configs()
 
-        self._selected_config = None
-        self._config_name_list = None
+    @property
+    def kit(self) -> IndexKit:
+        return self._kit
 
-        self._index_i7_len = 0
-        self._index_i5_len = 0
+    def begin_update(self):
+        """ Start merging changes, nested updates are committed by the outermost commit_update. """
+        self._update_depth += 1
 
-        # Loaded Indexes Metadata
-        self._import_filepath = None
-        self._import_filetype = None
-        self._ilmn_seq_strategy = None
-        self._ilmn_fixed_layout = None
-        self._index_i5_count = None
-        self._index_i7_count = None
-        self._ilmn_umi_compatible = None
+    def commit_update(self):
+        if self._update_depth == 0:
+            raise RuntimeError("commit_update called without begin_update")
 
-        self._init_settings_configs()
+        if self._update_depth == 1:
+            # Counts follow the table and the mapping, derive them once per change set
+            self._recount_stale_indexes()
+
+        self._update_depth -= 1
+
+        if self._update_depth == 0:
+            self._notify_changes()
+
+    @contextmanager
+    def batch_update(self):
+        self.begin_update()
+        try:
+            yield
+        finally:
+            self.commit_update()
+
+    def _record_change(self, name: str, old, new):
+        with self.batch_update():
+            if name in self._pending_changes:
+                old = self._pending_changes[name][0]
+            self._pending_changes[name] = (old, new)
+
+    def _notify_changes(self):
+        changes = {name: (old, new) for name, (old, new) in self._pending_changes.items()
+                   if not _unchanged(old, new)}
+        self._pending_changes = {}
+
+        for name in changes:
+            signal = self._change_signals.get(name)
+            if signal is not None:
+                signal.emit()
+
+        if changes:
+            self.changes_committed.emit(changes)
+
+    def _set_kit_field(self, name: str, value):
+        old = getattr(self._kit, name)
+        if old == value:
+            return
 
+        setattr(self._kit, name, value)
+        self._record_change(name, old, value)
 
-    def _clear_data(self):
-        self.set_uuid("")
-        self.set_description("")
-        self.set_ilmn_umi_compatible("")
-        self.set_ilmn_seq_strategy("")
-        self.set_ilmn_fixed_layout("")
-        self.set_index_kit_name("")
-        self.set_display_name("")
-        self.set_import_filetype("")
-        self.set_import_filepath("")
-        self.set_index_i5_count(0)
-        self.set_index_i7_count(0)
-        self.set_adapter_read_1("")
-        self.set_adapter_read_2("")
-        self.set_version("")
+    def set_kit(self, kit: IndexKit):
+        """ Take over the loaded fields of a kit as a single change set. """
+        with self.batch_update():
+            for name in LOADED_FIELDS:
+                if name == "source_df":
+                    self.set_index_df(kit.source_df)
+                else:
+                    self._set_kit_field(name, getattr(kit, name))
 
     @property
     def import_filepath(self):
-        return self._import_filepath
+        return self._kit.import_filepath
 
     @property
     def import_filetype(self):
-        return self._import_filetype
+        return self._kit.import_filetype
 
     @property
     def ilmn_seq_strategy(self):
-        return self._ilmn_seq_strategy
+        return self._kit.ilmn_seq_strategy
 
     @property
     def ilmn_fixed_layout(self):
-        return self._ilmn_fixed_layout
+        return self._kit.ilmn_fixed_layout
 
     @property
     def index_i7_count(self):
-        return self._index_i7_count
+        return self._kit.index_i7_count
 
     @property
     def index_i5_count(self):
-        return self._index_i5_count
+        return self._kit.index_i5_count
 
     @property
     def ilmn_umi_compatible(self):
-        return self._ilmn_umi_compatible
-
+        return self._kit.ilmn_umi_compatible
 
     def set_import_filetype(self, value):
-        if value == self._import_filetype:
-            return
-
-        self._import_filetype = value
-        self.import_filetype_changed.emit()
+        self._set_kit_field("import_filetype", value)
 
     def set_ilmn_seq_strategy(self, value):
-        if value == self._ilmn_seq_strategy:
-            return
-
-        self._ilmn_seq_strategy = value
-        self.ilmn_seq_strategy_changed.emit()
+        self._set_kit_field("ilmn_seq_strategy", value)
 
     def set_ilmn_fixed_layout(self, value):
-        if value == self._ilmn_fixed_layout:
-            return
-
-        self._ilmn_fixed_layout = value
-        self.ilmn_fixed_layout_changed.emit()
+        self._set_kit_field("ilmn_fixed_layout", value)
 
     def set_index_i7_count(self, value):
-        if value == self._index_i7_count:
-            return
-
-        self._index_i7_count = value
-        self.index_i7_count_changed.emit()
+        self._set_kit_field("index_i7_count", value)
 
     def set_index_i5_count(self, value):
-        if value == self._index_i5_count:
-            return
-
-        self._index_i5_count = value
-        self.index_i5_count_changed.emit()
+        self._set_kit_field("index_i5_count", value)
 
     def set_ilmn_umi_compatible(self, value):
-        if value == self._ilmn_umi_compatible:
-            return
-
-        self._ilmn_umi_compatible = value
-        self.ilmn_umi_compatible_changed.emit()
-
+        self._set_kit_field("ilmn_umi_compatible", value)
 
     @property
     def index_kit_name(self):
-        return self._index_kit_name
+        return self._kit.index_kit_name
 
     def set_checksum(self, checksum):
-
-        if self._checksum == checksum:
-            return
-
-        self._checksum = checksum
-        self.checksum_changed.emit()
+        self._set_kit_field("checksum", checksum)
 
     def checksum(self):
-        return self._checksum
+        return self._kit.checksum
 
     @property
     def index_source_format(self) -> str | None:
@@ -219,154 +257,106 @@ class DataManager(QObject):
     def set_input_format(self, source_format):
         self._index_source_format = source_format
 
+    def save_json_data(self, filepath) -> bool:
+        try:
+            collision_reports = export_index_kit(self._kit, self.selected_config_obj, filepath)
+        except ValueError as e:
+            self._logger.error(str(e))
+            return False
 
-    def _index_validation(self, df, index_set_fields):
-
-        df_cleaned = clean_df(df)
-
-        for set_name, field_list in index_set_fields.items():
-            if not index_fields_validator(df_cleaned, field_list):
-                self._logger.error(f"all fields not set for {set_name}")
-                return False
-
-        for set_name, field_list in index_set_fields.items():
-            for field in field_list:
-                if not field in self._index_seq_col_names:
-                    continue
-
-                if not index_seq_validator(df, field):
-                    self._logger.error(f"invalid index for {field}")
-                    return False
-
-        for set_name, field_list in index_set_fields.items():
-            df_cleaned_field = df[field_list]
-            df_cleaned_field_cleaned = clean_df(df_cleaned_field)
-
-            print(df_cleaned_field_cleaned.to_string())
-
-            if not nonempty_validator(df_cleaned_field_cleaned):
-                self._logger.error(f"empty index for {set_name}")
-                return False
-
-            for field in field_list:
-                if not nonduplicate_validator(df_cleaned_field_cleaned, field):
-                    self._logger.error(f"duplicate values in {field}")
-                    return False
+        self._log_collision_reports(collision_reports)
 
         return True
 
-    def save_json_data(self, filepath):
-
-        df = self.index_df
-        index_set_fields = self.selected_index_set_fields()
-
-        if not self._index_validation(df, index_set_fields):
-            return
-
-        index_sets = {}
-
-        for set_name, field_list in index_set_fields.items():
-            df_set_cleaned = clean_df(df[field_list])
-            dict_records = df_set_cleaned.to_dict(orient='records')
-            index_sets[set_name] = dict_records
-
-            if "index_i7" in df_set_cleaned.columns:
-                try:
-                    self._index_i7_len = index_len(df_set_cleaned, "IndexI7")
-                except ValueError as e:
-                    self._logger.error(e)
-                    return
-
-            if "index_i5" in df_set_cleaned.columns:
-                try:
-                    self._index_i5_len = index_len(df_set_cleaned, "IndexI5")
-                except ValueError as e:
-                    self._logger.error(e)
-                    return
-
-        data = {
-            "UID": self.uuid,
-            "IndexKitName": self.index_kit_name,
-            "DisplayName": self.display_name,
-            "Version": self.version,
-            "Description": self.description,
-            "Adapters": {
-                "AdapterRead1": self.adapter_read_1,
-                "AdapterRead2": self.adapter_read_2
-            },
-            "IndexStrategy": self.index_strategy,
-            "IndexI7Len": self._index_i7_len,
-            "IndexI5Len": self._index_i5_len,
-            "OverrideCyclesPattern": f"{self._override_cycles_read_1}-{self._override_cycles_index_1}-{self._override_cycles_index_2}-{self._override_cycles_read_2}",
-            "IndexSets": index_sets
-        }
-
-        filepath_obj = Path(filepath)
-        filepath_obj.write_text(json.dumps(data, indent=4))
+    def _log_collision_reports(self, collision_reports):
+        for report in collision_reports:
+            if report.collision_count:
+                self._logger.warning(report.describe())
+            else:
+                self._logger.info(report.describe())
 
     def set_index_data(self, path: Path):
-        self._clear_data()
-        if self._index_source_format == "csv":
-            csv_data_obj = CsvIndexData(path, self._logger)
-            self.set_index_df(csv_data_obj.indexes)
-            self.set_import_filepath(str(path))
-
-        elif self._index_source_format == "xlsx":
-            xlsx_data_obj = XlsxIndexData(path, self._logger)
-            self.set_index_df(xlsx_data_obj.indexes)
-            self.set_import_filepath(str(path))
-
-        elif self._index_source_format == "tsv_ilmn":
-            tsv_data_obj = IlluminaIndexData(path, self._logger)
-
-            self.set_index_df(tsv_data_obj.fixed_dual_indexes)
-            self.set_import_filepath(str(path))
-
-            if tsv_data_obj.checksum:
-                self.set_checksum(tsv_data_obj.checksum)
-
-            if tsv_data_obj.name:
-                self.set_index_kit_name(tsv_data_obj.name)
-
-            if tsv_data_obj.display_name:
-                self.set_display_name(tsv_data_obj.display_name)
-
-            if tsv_data_obj.version:
-                self.set_version(tsv_data_obj.version)
-
-            if tsv_data_obj.description:
-                self.set_description(tsv_data_obj.description)
-
-            if tsv_data_obj.adapter_read_1:
-                self.set_adapter_read_1(tsv_data_obj.adapter_read_1)
-
-            if tsv_data_obj.adapter_read_2:
-                self.set_adapter_read_2(tsv_data_obj.adapter_read_2)
-
-            if tsv_data_obj.import_filetype:
-                self.set_import_filetype(tsv_data_obj.import_filetype)
+        try:
+            kit = load_index_kit(path, self._index_source_format, self._logger)
+        except ValueError as e:
+            self._logger.error(str(e))
+            return
 
-            if tsv_data_obj.ilmn_seq_strategy:
-                self.set_ilmn_seq_strategy(tsv_data_obj.ilmn_seq_strategy)
+        self.set_kit(kit)
 
-            if tsv_data_obj.ilmn_fixed_layout:
-                self.set_ilmn_fixed_layout(tsv_data_obj.ilmn_fixed_layout)
+    @property
+    def task_running(self) -> bool:
+        return self._task is not None
+
+    def load_index_data(self, path: Path, sheet_name: str | None = None) -> bool:
+        """ Load an index file on the thread pool, the kit is taken over once it is parsed. """
+        return self._start_task(f"Loading {Path(path).name}", self._on_index_kit_loaded,
+                                load_index_kit, path, self._index_source_format, sheet_name=sheet_name)
+
+    def _on_index_kit_loaded(self, kit: IndexKit):
+        # The worker must not log through the GUI handlers, the parse messages travel with the kit
+        self.set_kit(kit)
+        log_parse_messages(kit, self._logger)
+
+    def export_json_data(self, filepath) -> bool:
+        """ Validate and export a snapshot of the kit on the thread pool. """
+        if self._config_name not in (self._config_definition_data or {}):
+            self._logger.error("Select a kit config before exporting")
+            return False
+
+        return self._start_task(f"Exporting {Path(filepath).name}", self._log_collision_reports,
+                                export_index_kit, self._kit.copy(), self.selected_config_obj, filepath)
+
+    def cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def _start_task(self, description: str, on_result, fn, *args, **kwargs) -> bool:
+        if self._task is not None:
+            self._logger.warning(f"{self._task_description} is still running")
+            return False
+
+        task = TaskWorker(fn, *args, **kwargs)
+        task.setAutoDelete(False)
+
+        task.signals.progress.connect(self.task_progress)
+        task.signals.result.connect(on_result)
+        task.signals.error.connect(self._on_task_error)
+        task.signals.cancelled.connect(self._on_task_cancelled)
+        task.signals.finished.connect(self._on_task_finished)
+
+        self._task = task
+        self._task_description = description
+        self.task_started.emit(description)
+
+        self._thread_pool.start(task)
+        return True
 
-            if tsv_data_obj.index_i7_count:
-                self.set_index_i7_count(tsv_data_obj.index_i7_count)
+    def _on_task_error(self, message: str):
+        self._logger.error(message)
 
-            if tsv_data_obj.index_i5_count:
-                self.set_index_i5_count(tsv_data_obj.index_i5_count)
+    def _on_task_cancelled(self):
+        self._logger.warning(f"{self._task_description} cancelled")
 
-            if tsv_data_obj.ilmn_umi_compatible:
-                self.set_ilmn_umi_compatible(tsv_data_obj.ilmn_umi_compatible)
+    def _on_task_finished(self):
+        self._task = None
+        self.task_finished.emit()
 
     def set_uuid(self, uuid):
-        self._uuid = uuid
+        self._kit.uuid = uuid
 
     @property
     def selected_config_obj(self):
-        return self.config_definition_obj(self._selected_config)
+        return self.config_definition_obj(self._config_name)
+
+    def validation_report(self) -> ValidationReport | None:
+        """ Violations of the mapped table against the selected config, None without a config.
+
+        Only index sets using a column that changed since the last call are revalidated.
+        """
+        if self._config_name not in (self._config_definition_data or {}):
+            return None
+        return index_kit_validation(self._kit, self.selected_config_obj)
 
     @property
     def index_strategy(self):
@@ -379,122 +369,133 @@ class DataManager(QObject):
 
     @property
     def uuid(self):
-        return self._uuid or "None"
+        return self._kit.uuid or "None"
+
+    @property
+    def table_version(self) -> int:
+        return self._kit.table_version
 
     def set_index_df(self, df: pd.DataFrame):
-        if self._index_df.equals(df):
+        if df is self._kit.source_df and not self._kit.column_mapping:
+            return
+
+        if frame_fingerprint(df) == self._kit.fingerprint():
+            return
+
+        old_df, old_mapping = self._kit.source_df, self._kit.column_mapping
+
+        with self.batch_update():
+            self._kit.index_df = df
+            self._record_change("index_df", old_df, df)
+
+            if old_mapping:
+                self._record_change("column_mapping", old_mapping, {})
+
+            self._stale_count_labels.update(INDEX_SEQ_COLUMNS)
+
+    def set_index_value(self, row: int, source_column: str, value: str):
+        """ Edit one cell of the loaded table, keeping the column mapping. """
+        old_df = self._kit.source_df
+
+        with self.batch_update():
+            self._kit.set_source_value(row, source_column, value)
+            self._record_change("index_df", old_df, self._kit.source_df)
+
+            label = self._kit.column_label(source_column)
+            if label in INDEX_SEQ_COLUMNS:
+                self._stale_count_labels.add(label)
+
+    def set_column_mapping(self, column_mapping: dict[str, str]):
+        """ Relabel source columns without touching the table data. """
+        if self._kit.column_mapping == column_mapping:
             return
 
-        self._index_df = df
-        self.index_df_changed.emit()
-        self._set_i7_index_count_after_label_drop()
-        self._set_i5_index_count_after_label_drop()
+        old_mapping = self._kit.column_mapping
+        index_sources = {label: self._kit.source_column(label) for label in INDEX_SEQ_COLUMNS}
+
+        with self.batch_update():
+            self._kit.column_mapping = dict(column_mapping)
+            self._record_change("column_mapping", old_mapping, self._kit.column_mapping)
+
+            # Only recount an index column if another source column now holds its label
+            for label, source_column in index_sources.items():
+                if self._kit.source_column(label) != source_column:
+                    self._stale_count_labels.add(label)
 
     def set_user(self, user: str):
         if self._user == user:
             return
 
-        self._user = user
-        self.user_changed.emit()
+        old, self._user = self._user, user
+        self._record_change("user", old, user)
 
     def set_import_filepath(self, path: str):
-        if self._import_filepath == path:
-            return
-
-        self._import_filepath = path
-        self.import_filepath_changed.emit()
+        self._set_kit_field("import_filepath", path)
 
     def set_ad_user(self, ad_user: str):
         if self._ad_user == ad_user:
             return
 
-        self._ad_user = ad_user
-        self.ad_user_changed.emit()
+        old, self._ad_user = self._ad_user, ad_user
+        self._record_change("ad_user", old, ad_user)
 
     def set_index_kit_name(self, kit_name):
-        if self._index_kit_name == kit_name:
-            return
-
-        self._index_kit_name = kit_name
-        self.index_kit_name_changed.emit()
+        self._set_kit_field("index_kit_name", kit_name)
 
     def set_display_name(self, display_name):
-        if self._display_name == display_name:
-            return
-
-        self._display_name = display_name
-        self.display_name_changed.emit()
+        self._set_kit_field("display_name", display_name)
 
     def set_version(self, version):
-        if self._version == version:
-            return
-
-        self._version = version
-        self.version_changed.emit()
+        self._set_kit_field("version", version)
 
     def set_description(self, description):
-        if self._description == description:
-            return
-
-        self._description = description
-        self.description_changed.emit()
+        self._set_kit_field("description", description)
 
     def set_adapter_read_1(self, adapter_read_1):
-        if self._adapter_read_1 == adapter_read_1:
-            return
-
-        self._adapter_read_1 = adapter_read_1
-        self.adapter_read_1_changed.emit()
+        self._set_kit_field("adapter_read_1", adapter_read_1)
 
     def set_adapter_read_2(self, adapter_read_2):
-        if self._adapter_read_2 == adapter_read_2:
-            return
-
-        self._adapter_read_2 = adapter_read_2
-        self.adapter_read_2_changed.emit()
+        self._set_kit_field("adapter_read_2", adapter_read_2)
 
     def set_config_name(self, config_name):
         if self._config_name == config_name:
             return
 
-        self._config_name = config_name
-        self.config_name_changed.emit()
+        old, self._config_name = self._config_name, config_name
+        self._record_change("config_name", old, config_name)
 
     @property
     def config_name_list(self):
         return list(self._config_definition_data.keys())
 
     def set_override_cycles_read_1(self, oc_read1):
-        if self._override_cycles_read_1 == oc_read1:
-            return
-
-        self._override_cycles_read_1 = oc_read1
-        self.set_override_cycles_read_1_changed.emit()
+        self._set_kit_field("override_cycles_read_1", oc_read1)
 
     def set_override_cycles_read_2(self, oc_read2):
-        if self._override_cycles_read_2 == oc_read2:
-            return
-
-        self._override_cycles_read_2 = oc_read2
-        self.override_cycles_read_2_changed.emit()
+        self._set_kit_field("override_cycles_read_2", oc_read2)
 
     def set_override_cycles_index_1(self, oc_index1):
-        if self._override_cycles_index_1 == oc_index1:
-            return
-
-        self._override_cycles_index_1 = oc_index1
-        self.override_cycles_index_1_changed.emit()
+        self._set_kit_field("override_cycles_index_1", oc_index1)
 
     def set_override_cycles_index_2(self, oc_index2):
-        if self._override_cycles_index_2 == oc_index2:
-            return
-
-        self._override_cycles_index_2 = oc_index2
-        self.override_cycles_index_2_changed.emit()
+        self._set_kit_field("override_cycles_index_2", oc_index2)
 
     @property
     def index_df(self):
-        return self._index_df
+        return self._kit.index_df
+
+    @property
+    def source_index_df(self):
+        return self._kit.source_df
+
+    @property
+    def has_index_data(self) -> bool:
+        """ Whether a non-empty table is loaded, without creating an empty one. """
+        return not self._kit.is_empty
+
+    @property
+    def column_mapping(self) -> dict[str, str]:
+        return dict(self._kit.column_mapping)
 
     @property
     def user(self):
@@ -506,27 +507,27 @@ class DataManager(QObject):
 
     @property
     def kit_name(self):
-        return self._index_kit_name
+        return self._kit.index_kit_name
 
     @property
     def display_name(self):
-        return self._display_name
+        return self._kit.display_name
 
     @property
     def version(self):
-        return self._version
+        return self._kit.version
 
     @property
     def description(self):
-        return self._description
+        return self._kit.description
 
     @property
     def adapter_read_1(self):
-        return self._adapter_read_1
+        return self._kit.adapter_read_1
 
     @property
     def adapter_read_2(self):
-        return self._adapter_read_2
+        return self._kit.adapter_read_2
 
     @property
     def config_name(self):
@@ -534,19 +535,19 @@ class DataManager(QObject):
 
     @property
     def override_cycles_read_1(self):
-        return self._override_cycles_read_1
+        return self._kit.override_cycles_read_1
 
     @property
     def override_cycles_read_2(self):
-        return self._override_cycles_read_2
+        return self._kit.override_cycles_read_2
 
     @property
     def override_cycles_index_1(self):
-        return self._override_cycles_index_1
+        return self._kit.override_cycles_index_1
 
     @property
     def override_cycles_index_2(self):
-        return self._override_cycles_index_2
+        return self._kit.override_cycles_index_2
 
     @property
     def config_definition_data(self) -> dict:
@@ -562,16 +563,10 @@ class DataManager(QObject):
     def _init_settings_configs(self):
 
         try:
-            with open(self._config_definition_path, 'r') as file:
-                kit_config_data = yaml.safe_load(file)
+            res = load_config_objects(self._config_definition_path)
         except Exception as e:
             self._logger.error(f"Error: {str(e)}")
-
-        res = {}
-
-        for config in kit_config_data:
-            kit_def_obj = ConfigObject(config)
-            res[kit_def_obj.config_type_name] = kit_def_obj
+            res = {}
 
         self._config_definition_data = res
 
@@ -580,22 +575,27 @@ class DataManager(QObject):
 
         print(f"Loaded {len(res)} kits")
 
-    def _set_i7_index_count_after_label_drop(self):
-        if "IndexI7" in self._index_df.columns:
-            index_i7_series = self._index_df["IndexI7"]
-
-            cleaned_s = index_i7_series[index_i7_series.str.strip().ne('')]
-            i7_count = len(cleaned_s)
-            self.set_index_i7_count(i7_count)
+    def _recount_stale_indexes(self):
+        while self._stale_count_labels:
+            self._set_index_count(self._stale_count_labels.pop())
 
-    def _set_i5_index_count_after_label_drop(self):
-        if "IndexI5" in self._index_df.columns:
-            index_i5_series = self._index_df["IndexI5"]
+    def _set_index_count(self, label: str):
+        count = self._kit.index_count(label) or 0
 
-            cleaned_s = index_i5_series[index_i5_series.str.strip().ne('')]
-            i5_count = len(cleaned_s)
-            self.set_index_i5_count(i5_count)
+        if label == "IndexI7":
+            self.set_index_i7_count(count)
+        elif label == "IndexI5":
+            self.set_index_i5_count(count)
 
 
+def _is_frame(value) -> bool:
+    # A DataFrame can only exist once pandas is imported
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(value, pandas.DataFrame)
 
 
+def _unchanged(old, new) -> bool:
+    # Tables are replaced, never edited in place, so identity is enough
+    if _is_frame(old) or _is_frame(new):
+        return old is new
+    return old == new
@@ -0,0 +1,607 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from modules.model.column_stats import cached_stat, column_fingerprint, count_nonempty, value_lengths
+from modules.model.config_object import ConfigObject
+from modules.model.load.parse_cache import default_parse_cache, file_content_key
+from modules.model.peak_memory import PeakMemory, format_bytes
+
+# pandas, the format loaders and the validation and collision code are
+# imported on first use, so the GUI starts without them
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from modules.model.index_set_processing import CollisionReport
+    from modules.model.pool_selection import PoolSelection
+    from modules.model.validation import ValidationReport
+
+INDEX_SEQ_COLUMNS = ('IndexI7', 'IndexI5')
+
+# Index pairs this close are reported as collisions on export
+COLLISION_MAX_DISTANCE = 2
+
+# Fields that describe the loaded source and are replaced on every load.
+# User edited settings such as the override cycles are kept between loads.
+LOADED_FIELDS = (
+    "uuid",
+    "index_kit_name",
+    "display_name",
+    "version",
+    "description",
+    "checksum",
+    "adapter_read_1",
+    "adapter_read_2",
+    "import_filepath",
+    "import_filetype",
+    "ilmn_seq_strategy",
+    "ilmn_fixed_layout",
+    "ilmn_umi_compatible",
+    "index_i7_count",
+    "index_i5_count",
+    "parse_messages",
+    "source_df",
+)
+
+
+class IndexKit:
+    """ Plain, picklable state of one index kit, free of any Qt dependency. """
+
+    __slots__ = (
+        "uuid",
+        # Kit settings
+        "index_kit_name",
+        "display_name",
+        "version",
+        "description",
+        "checksum",
+        # Resources
+        "adapter_read_1",
+        "adapter_read_2",
+        "override_cycles_read_1",
+        "override_cycles_read_2",
+        "override_cycles_index_1",
+        "override_cycles_index_2",
+        # Loaded index metadata
+        "import_filepath",
+        "import_filetype",
+        "ilmn_seq_strategy",
+        "ilmn_fixed_layout",
+        "ilmn_umi_compatible",
+        "index_i7_count",
+        "index_i5_count",
+        "parse_messages",
+        # Table
+        "_source_df",
+        "column_mapping",
+        "table_version",
+        "_fingerprints",
+    )
+
+    def __init__(self):
+        self.uuid = ""
+
+        self.index_kit_name = ""
+        self.display_name = ""
+        self.version = ""
+        self.description = ""
+        self.checksum = None
+
+        self.adapter_read_1 = ""
+        self.adapter_read_2 = ""
+        self.override_cycles_read_1 = "Y{r}"
+        self.override_cycles_read_2 = "Y{r}"
+        self.override_cycles_index_1 = "I{i}"
+        self.override_cycles_index_2 = "I{i}"
+
+        self.import_filepath = None
+        self.import_filetype = ""
+        self.ilmn_seq_strategy = ""
+        self.ilmn_fixed_layout = ""
+        self.ilmn_umi_compatible = ""
+        self.index_i7_count = 0
+        self.index_i5_count = 0
+        # Problems the loader fixed in the source file, shown on every load
+        self.parse_messages = []
+
+        # The loaded table keeps its source column names, relabelling only
+        # changes the source column -> field label mapping.
+        self.table_version = 1
+        self._fingerprints = {}
+        self._source_df = None
+        self.column_mapping = {}
+
+    @property
+    def source_df(self) -> pd.DataFrame:
+        # A kit that never held a table creates its empty one on first access,
+        # so pandas is not imported until it is needed
+        if self._source_df is None:
+            import pandas as pd
+            self._source_df = pd.DataFrame()
+        return self._source_df
+
+    @source_df.setter
+    def source_df(self, df: pd.DataFrame):
+        """ Replace the table, it is never modified in place. """
+        self._source_df = df
+        self.table_version += 1
+        self._fingerprints = {}
+
+    def set_source_value(self, row: int, source_column: str, value: str):
+        """ Replace the table with a copy holding value at row of source_column, the mapping is kept.
+
+        The other columns keep their fingerprints, so only the edited one is
+        rehashed and revalidated.
+        """
+        df = self.source_df
+        fingerprints = {column: fingerprint for column, fingerprint in self._fingerprints.items()
+                        if column != source_column}
+
+        self.source_df = with_cell_value(df, row, df.columns.get_loc(source_column), value)
+        self._fingerprints = fingerprints
+
+    def column_fingerprint(self, source_column: str) -> str:
+        """ Content fingerprint of a source column, hashed once per table version. """
+        fingerprint = self._fingerprints.get(source_column)
+        if fingerprint is None:
+            fingerprint = column_fingerprint(self._source_df[source_column])
+            self._fingerprints[source_column] = fingerprint
+        return fingerprint
+
+    @property
+    def is_empty(self) -> bool:
+        return self._source_df is None or self._source_df.empty
+
+    def fingerprint(self) -> tuple:
+        """ (label, fingerprint) per column of index_df, equal for equal tables. """
+        if self._source_df is None:
+            return ()
+        return tuple((self.column_label(column), self.column_fingerprint(column)) for column in self._source_df.columns)
+
+    def index_count(self, label: str) -> int | None:
+        """ Non-empty values under label, None if no column carries it. """
+        column = self.source_column(label)
+        if column is None:
+            return None
+        return cached_stat(self.column_fingerprint(column), "count",
+                           lambda: count_nonempty(self._source_df[column]))
+
+    def index_lengths(self, label: str) -> tuple[int, ...]:
+        column = self.source_column(label)
+        if column is None:
+            return ()
+        return cached_stat(self.column_fingerprint(column), "lengths",
+                           lambda: value_lengths(self._source_df[column]))
+
+    @property
+    def index_df(self) -> pd.DataFrame:
+        """ The loaded table with the column mapping applied. """
+        if not self.column_mapping:
+            return self.source_df
+        return self.source_df.rename(columns=self.column_mapping)
+
+    @index_df.setter
+    def index_df(self, df: pd.DataFrame):
+        self.source_df = df
+        self.column_mapping = {}
+
+    def column_label(self, source_column: str) -> str:
+        return self.column_mapping.get(source_column, source_column)
+
+    def source_column(self, label: str) -> str | None:
+        """ The source column currently shown under label, if any. """
+        if self._source_df is None:
+            return None
+
+        for source_column in self._source_df.columns:
+            if self.column_label(source_column) == label:
+                return source_column
+        return None
+
+    def copy(self) -> "IndexKit":
+        kit = IndexKit()
+        for name in self.__slots__:
+            setattr(kit, name, getattr(self, name))
+        kit.column_mapping = dict(self.column_mapping)
+        kit.parse_messages = list(self.parse_messages)
+        kit._fingerprints = dict(self._fingerprints)
+        return kit
+
+    def __repr__(self):
+        return f"IndexKit(name={self.index_kit_name!r}, source={self.import_filepath!r}, rows={len(self.index_df)})"
+
+
+def with_cell_value(df: pd.DataFrame, row: int, column: int, value: str) -> pd.DataFrame:
+    """ A copy of df with value at the row and column position, an empty value is missing.
+
+    Only the edited column is copied, columns that cannot hold text become object columns.
+    """
+    import pandas as pd
+
+    values = df.iloc[:, column]
+    if not pd.api.types.is_string_dtype(values.dtype):
+        values = values.astype(object)
+
+    values = values.copy()
+    values.iloc[row] = value if value != "" else None
+
+    edited = df.copy(deep=False)
+    edited.isetitem(column, values)
+    return edited
+
+
+def count_indexes(df: pd.DataFrame, column: str) -> int | None:
+    if column not in df.columns:
+        return None
+
+    return count_nonempty(df[column])
+
+
+def _report(progress, percent: int, message: str):
+    if progress is not None:
+        progress(percent, message)
+
+
+def _scaled_progress(progress, start: int, stop: int):
+    """ progress for a step taking start to stop percent of the whole task, None without progress. """
+    if progress is None:
+        return None
+    return lambda percent, message: progress(start + (stop - start) * percent // 100, message)
+
+
+def load_index_kit(path: Path, source_format: str, logger=None, use_cache: bool = True, progress=None,
+                   sheet_name: str | None = None) -> IndexKit:
+    """ Load an index file into a new IndexKit.
+
+    Parsed kits are cached by file content, so reopening an unchanged file
+    skips the parser. The parse messages are cached with the kit and logged
+    as warnings on every load, cached or not. progress(percent, message) is
+    called between steps and by the parsers while they read, raising from
+    it stops the load. sheet_name selects the worksheet of an xlsx file, the
+    first by default.
+    """
+    path = Path(path)
+
+    if not use_cache:
+        _report(progress, 0, f"Parsing {path.name}")
+        kit = _parse_index_kit(path, source_format, logger, sheet_name, progress)
+        log_parse_messages(kit, logger)
+        return kit
+
+    _report(progress, 0, f"Reading {path.name}")
+    if source_format == "xlsx" and sheet_name is None:
+        from modules.model.load.xlsx_index_data import list_sheet_names
+
+        # The default sheet and the same sheet named explicitly share one cache entry
+        sheet_name = list_sheet_names(path)[0]
+
+    cache = default_parse_cache()
+    key = file_content_key(path, source_format if sheet_name is None else f"{source_format}:{sheet_name}")
+
+    kit = cache.get(key)
+    if kit is None:
+        _report(progress, 20, f"Parsing {path.name}")
+        kit = _parse_index_kit(path, source_format, logger, sheet_name, _scaled_progress(progress, 20, 80))
+
+        _report(progress, 80, f"Caching {path.name}")
+        cache.put(key, kit)
+
+    kit.import_filepath = str(path)
+    log_parse_messages(kit, logger)
+    return kit
+
+
+def log_parse_messages(kit: IndexKit, logger):
+    """ Log the parse messages of a loaded kit as warnings, prefixed with its file name. """
+    if logger is not None:
+        name = Path(kit.import_filepath).name
+        for message in kit.parse_messages:
+            logger.warning(f"{name}: {message}")
+
+
+def _parse_index_kit(path: Path, source_format: str, logger=None, sheet_name: str | None = None,
+                     progress=None) -> IndexKit:
+    kit = IndexKit()
+    kit.import_filepath = str(path)
+
+    # Each loader is imported only once its format is first loaded
+    if source_format == "csv":
+        from modules.model.load.csv_index_data import CsvIndexData
+        csv_data = CsvIndexData(path, logger, progress)
+        kit.index_df = csv_data.indexes
+        kit.parse_messages = csv_data.messages
+
+    elif source_format == "xlsx":
+        from modules.model.load.xlsx_index_data import XlsxIndexData
+        xlsx_data = XlsxIndexData(path, logger, sheet_name, progress)
+        kit.index_df = xlsx_data.indexes
+        kit.parse_messages = xlsx_data.messages
+
+    elif source_format == "tsv_ilmn":
+        from modules.model.load.tsv_illumina_index_data import IlluminaIndexData
+        tsv_data_obj = IlluminaIndexData(path, logger, progress)
+
+        # The sections are tokenised into tables here
+        _report(progress, 90, f"Building the index tables of {path.name}")
+
+        if tsv_data_obj.ilmn_fixed_layout:
+            kit.index_df = tsv_data_obj.fixed_dual_indexes
+        else:
+            kit.index_df = tsv_data_obj.standard_indexes
+
+        kit.checksum = tsv_data_obj.checksum
+        kit.index_kit_name = tsv_data_obj.name or ""
+        kit.display_name = tsv_data_obj.display_name or ""
+        kit.version = tsv_data_obj.version or ""
+        kit.description = tsv_data_obj.description or ""
+        kit.adapter_read_1 = tsv_data_obj.adapter_read_1 or ""
+        kit.adapter_read_2 = tsv_data_obj.adapter_read_2 or ""
+        kit.import_filetype = tsv_data_obj.import_filetype or ""
+        kit.ilmn_seq_strategy = tsv_data_obj.ilmn_seq_strategy or ""
+        kit.ilmn_fixed_layout = tsv_data_obj.ilmn_fixed_layout or ""
+        kit.ilmn_umi_compatible = tsv_data_obj.ilmn_umi_compatible or ""
+        kit.parse_messages = tsv_data_obj.messages
+
+    elif source_format == "json":
+        _read_kit_json(kit, path)
+
+    else:
+        raise ValueError(f"Unknown index source format: {source_format}")
+
+    kit.index_i7_count = kit.index_count("IndexI7") or 0
+    kit.index_i5_count = kit.index_count("IndexI5") or 0
+
+    return kit
+
+
+def _read_kit_json(kit: IndexKit, path: Path):
+    """ Fill kit from a JSON file written by export_index_kit, the index sets side by side in one table. """
+    import pandas as pd
+
+    try:
+        data = json.loads(Path(path).read_text())
+        index_sets = data["IndexSets"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"{Path(path).name} is not an exported index kit: {e}")
+
+    frames = [pd.DataFrame(records).reset_index(drop=True) for records in index_sets.values() if records]
+    df = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+    kit.index_df = df.fillna("").astype("str")
+
+    adapters = data.get("Adapters") or {}
+    kit.uuid = data.get("UID") or ""
+    kit.index_kit_name = data.get("IndexKitName") or ""
+    kit.display_name = data.get("DisplayName") or ""
+    kit.version = data.get("Version") or ""
+    kit.description = data.get("Description") or ""
+    kit.adapter_read_1 = adapters.get("AdapterRead1") or ""
+    kit.adapter_read_2 = adapters.get("AdapterRead2") or ""
+    kit.import_filetype = "json"
+
+    patterns = (data.get("OverrideCyclesPattern") or "").split("-")
+    if len(patterns) == 4:
+        (kit.override_cycles_read_1, kit.override_cycles_index_1,
+         kit.override_cycles_index_2, kit.override_cycles_read_2) = patterns
+
+
+class ChunkedLoadStats:
+    """ What load_index_kit_chunked read and the peak memory it took. """
+
+    __slots__ = ("rows", "chunks", "columns", "seconds", "peak_memory")
+
+    def __init__(self, rows: int, chunks: int, columns: list[str], seconds: float, peak_memory: PeakMemory):
+        self.rows = rows
+        self.chunks = chunks
+        self.columns = columns
+        self.seconds = seconds
+        self.peak_memory = peak_memory
+
+    @property
+    def peak_bytes(self) -> int:
+        return self.peak_memory.peak_bytes
+
+    def describe(self) -> str:
+        return (f"{self.rows} rows of {len(self.columns)} columns in {self.chunks} chunks, "
+                f"{self.seconds:.2f}s, peak memory {format_bytes(self.peak_bytes)}")
+
+
+def load_index_kit_chunked(path: Path, config: ConfigObject, column_map: dict[str, str] | None = None,
+                           chunk_rows: int | None = None,
+                           progress=None) -> tuple[IndexKit, ValidationReport, ChunkedLoadStats]:
+    """ Stream a CSV or plain TSV index table in chunks, keeping only what config needs.
+
+    Only source columns that column_map, or their own name, labels as a
+    field of config are parsed. Row level rules are checked per chunk as it
+    streams, duplicates and missing fields once on the assembled columns.
+    The parse cache is not used, the kit only holds the needed columns.
+    chunk_rows defaults to DEFAULT_CHUNK_ROWS of the CSV loader.
+    """
+    import pandas as pd
+
+    from modules.model.load.csv_index_data import (DEFAULT_CHUNK_ROWS, estimate_row_count, iter_delimited_chunks,
+                                                    read_header, sniff_csv, unique_column_names)
+    from modules.model.validation import (DUPLICATE_VALUE, EMPTY_VALUE, INVALID_SEQUENCE, MISSING_FIELD, merge_reports,
+                                          validate_index_sets)
+
+    path = Path(path)
+    chunk_rows = chunk_rows or DEFAULT_CHUNK_ROWS
+    column_map = column_map or {}
+    fields = set(config.all_index_fields)
+
+    start = time.perf_counter()
+    chunks = []
+    reports = []
+    rows = 0
+
+    with PeakMemory() as peak_memory:
+        _report(progress, 0, f"Reading {path.name}")
+        encoding, delimiter = sniff_csv(path)
+        header = unique_column_names(read_header(path, encoding, delimiter))
+        columns = [column for column in header if column_map.get(column, column) in fields]
+
+        # Reading takes the bar up to the duplicate check at 80
+        estimated_rows = estimate_row_count(path)
+        read_progress = _scaled_progress(progress, 0, 80)
+
+        for chunk in iter_delimited_chunks(path, encoding, delimiter, columns, chunk_rows):
+            report = validate_index_sets(chunk.rename(columns=column_map), config.index_sets,
+                                         rules=(INVALID_SEQUENCE, EMPTY_VALUE))
+            for violation in report.violations:
+                violation.rows = violation.rows + rows
+
+            reports.append(report)
+            chunks.append(chunk)
+            rows += len(chunk)
+
+            peak_memory.sample()
+            _report(read_progress, min(99, 100 * rows // estimated_rows), f"Read {rows} rows of {path.name}")
+
+        kit = IndexKit()
+        kit.import_filepath = str(path)
+        kit.source_df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns, dtype=str)
+        kit.column_mapping = {column: label for column, label in column_map.items() if column in columns}
+        chunks.clear()
+
+        _report(progress, 80, "Checking duplicates")
+        reports.append(validate_index_sets(kit.index_df, config.index_sets, rules=(MISSING_FIELD, DUPLICATE_VALUE)))
+
+        kit.index_i7_count = kit.index_count("IndexI7") or 0
+        kit.index_i5_count = kit.index_count("IndexI5") or 0
+
+    stats = ChunkedLoadStats(rows, len(reports) - 1, columns, time.perf_counter() - start, peak_memory)
+    return kit, merge_reports(reports, config.index_sets), stats
+
+
+def map_index_columns(kit: IndexKit, column_map: dict[str, str]) -> IndexKit:
+    """ Return a copy of the kit with source columns relabelled as in column_map. """
+    mapped = kit.copy()
+    mapped.column_mapping.update(column_map)
+
+    i7_count = mapped.index_count("IndexI7")
+    if i7_count is not None:
+        mapped.index_i7_count = i7_count
+
+    i5_count = mapped.index_count("IndexI5")
+    if i5_count is not None:
+        mapped.index_i5_count = i5_count
+
+    return mapped
+
+
+def validate_index_df(df: pd.DataFrame, index_set_fields: dict[str, list[str]]):
+    """ Raise ValueError listing the rules the index table breaks. """
+    from modules.model.validation import validate_index_sets
+
+    report = validate_index_sets(df, index_set_fields)
+    if not report.ok:
+        raise ValueError(report.error_message())
+
+
+def index_kit_validation(kit: IndexKit, config: ConfigObject) -> ValidationReport:
+    """ All violations of the kit against config.
+
+    Masks and per set results are cached against column fingerprints, so
+    after an edit or relabel only the index sets using a changed column are
+    revalidated.
+    """
+    from modules.model.validation import validate_index_sets
+
+    fingerprints = {}
+    for fields in config.index_sets.values():
+        for field in fields:
+            column = kit.source_column(field)
+            if column is not None:
+                fingerprints[field] = kit.column_fingerprint(column)
+
+    return validate_index_sets(kit.index_df, config.index_sets, fingerprints)
+
+
+def validate_index_kit(kit: IndexKit, config: ConfigObject):
+    report = index_kit_validation(kit, config)
+    if not report.ok:
+        raise ValueError(report.error_message())
+
+
+def index_kit_collisions(kit: IndexKit, config: ConfigObject,
+                         max_distance: int = COLLISION_MAX_DISTANCE) -> list[CollisionReport]:
+    from modules.model.index_set_processing import index_set_collisions
+
+    return index_set_collisions(kit.index_df, config.index_sets, max_distance)
+
+
+def select_kit_index_pool(kit: IndexKit, config: ConfigObject, sample_count: int, **kwargs) -> PoolSelection:
+    from modules.model.pool_selection import select_index_pool
+
+    return select_index_pool(kit.index_df, config, sample_count, **kwargs)
+
+
+def index_kit_json_data(kit: IndexKit, config: ConfigObject) -> dict:
+    """ Build the JSON document for a validated kit. """
+    from modules.model.index_set_processing import clean_df, index_len
+    from modules.model.override_cycles import kit_override_cycles
+
+    # Raises ValueError for patterns BCL Convert could not use
+    override_cycles = kit_override_cycles(kit)
+
+    df = kit.index_df
+    index_sets = {}
+    index_i7_len = 0
+    index_i5_len = 0
+
+    for set_name, field_list in config.index_sets.items():
+        df_set_cleaned = clean_df(df[list(field_list)])
+        index_sets[set_name] = df_set_cleaned.to_dict(orient='records')
+
+        if "IndexI7" in df_set_cleaned.columns:
+            index_i7_len = index_len(df_set_cleaned, "IndexI7")
+
+        if "IndexI5" in df_set_cleaned.columns:
+            index_i5_len = index_len(df_set_cleaned, "IndexI5")
+
+    return {
+        "UID": kit.uuid or "None",
+        "IndexKitName": kit.index_kit_name,
+        "DisplayName": kit.display_name,
+        "Version": kit.version,
+        "Description": kit.description,
+        "Adapters": {
+            "AdapterRead1": kit.adapter_read_1,
+            "AdapterRead2": kit.adapter_read_2
+        },
+        "IndexStrategy": config.index_strategy,
+        "IndexI7Len": index_i7_len,
+        "IndexI5Len": index_i5_len,
+        "OverrideCyclesPattern": override_cycles.text,
+        "IndexSets": index_sets
+    }
+
+
+def export_index_kit(kit: IndexKit, config: ConfigObject, filepath: Path, progress=None,
+                     report: ValidationReport | None = None) -> list[CollisionReport]:
+    """ Validate the kit and write it as JSON, raising ValueError if it is invalid.
+
+    A report from an earlier validation of the kit, such as the one from
+    load_index_kit_chunked, is used instead of validating again.
+
+    Returns the collision reports of the kit, Levenshtein for index sets of
+    mixed lengths and Hamming otherwise, for the caller to log. They are not
+    part of the kit document.
+    """
+    _report(progress, 0, "Validating index kit")
+    if report is None:
+        report = index_kit_validation(kit, config)
+    if not report.ok:
+        raise ValueError(report.error_message())
+
+    _report(progress, 30, "Checking index collisions")
+    collision_reports = index_kit_collisions(kit, config)
+
+    _report(progress, 80, f"Writing {Path(filepath).name}")
+    data = index_kit_json_data(kit, config)
+
+    Path(filepath).write_text(json.dumps(data, indent=4))
+
+    return collision_reports
@@ -1,8 +1,12 @@
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
 
 import numpy as np
 import pandas as pd
 
+from modules.model.sequence_store import PackedSequences
+
 dna_regex = re.compile(r'^[ATCG]+$', re.IGNORECASE)
 
 def index_fields_validator(df: pd.DataFrame, fields: list) -> bool:
@@ -25,15 +29,408 @@ def nonempty_validator(df: pd.DataFrame) -> bool:
 def nonduplicate_validator(df: pd.DataFrame, column: str) -> bool:
     return df[column].is_unique
 
+def text_values(series: pd.Series) -> pd.Series:
+    """ The column as nullable string dtype, None and NaN become NA instead of 'None' and 'nan'. """
+    return series.astype("string")
+
+
+def blank_mask(text: pd.Series) -> np.ndarray:
+    """ True for missing and whitespace-only values of a text_values column. """
+    return (text.isna() | text.str.strip().eq('').fillna(False)).to_numpy(dtype=bool)
+
+
+def invalid_sequence_mask(text: pd.Series, blank: np.ndarray) -> np.ndarray:
+    """ True for non-blank values that are not an upper case DNA sequence. """
+    return ~blank & ~text.str.fullmatch(r'[ACGT]+').fillna(False).to_numpy(dtype=bool)
+
+
+def duplicate_mask(text: pd.Series, rows: np.ndarray) -> np.ndarray:
+    """ True for selected rows whose value occurs more than once among the selected rows. """
+    mask = np.zeros(len(text), dtype=bool)
+    mask[rows] = text.iloc[rows].duplicated(keep=False).to_numpy(dtype=bool)
+    return mask
+
+
 def index_len(df: pd.DataFrame, column):
-     if column in df.columns:
-        lengths_list = sorted(df[column]
-                              .apply(lambda x: len(x) if isinstance(x, str) else None)
-                              .dropna()
-                              .unique())
+    """ Longest index length in column, the cycles its indexes need. Shorter indexes are masked per sample. """
+    if column in df.columns:
+        lengths = df[column].dropna().astype(str).str.strip().str.len()
+        lengths = lengths[lengths > 0]
+
+        return int(lengths.max()) if len(lengths) else 0
+
+
+def packed_index_column(df: pd.DataFrame, column: str) -> PackedSequences:
+    """ Pack the non-empty sequences of an index column, in row order. """
+    values = df[column].dropna().astype(str).str.strip()
+    return PackedSequences.from_strings(values[values.ne('')])
+
+
+# Distance metrics a collision report can be computed with
+HAMMING = "hamming"
+LEVENSHTEIN = "levenshtein"
+
+_METRIC_UNITS = {HAMMING: "mismatches", LEVENSHTEIN: "edits"}
+
+
+class CollisionReport:
+    """ Index pairs within max_distance mismatches (or edits) of each other. """
+
+    __slots__ = ("set_name", "label", "max_distance", "pairs", "distances", "sequences", "metric")
+
+    def __init__(self, set_name: str, label: str, max_distance: int, pairs: np.ndarray, distances: np.ndarray,
+                 sequences: list[str], metric: str = HAMMING):
+        self.set_name = set_name
+        self.label = label
+        self.max_distance = max_distance
+        self.pairs = pairs
+        self.distances = distances
+        self.sequences = sequences
+        self.metric = metric
+
+    @property
+    def collision_count(self) -> int:
+        return len(self.distances)
+
+    @property
+    def min_distance(self) -> int | None:
+        """ Smallest distance found, None if every pair is further apart than max_distance. """
+        return int(self.distances.min()) if len(self.distances) else None
+
+    def describe(self) -> str:
+        unit = _METRIC_UNITS[self.metric]
+        if not self.collision_count:
+            return f"{self.set_name} {self.label}: no index pairs within {self.max_distance} {unit}"
+
+        first, second = self.pairs[int(self.distances.argmin())]
+        return (f"{self.set_name} {self.label}: {self.collision_count} index pairs within {self.max_distance} {unit}, "
+                f"min distance {self.min_distance} ({self.sequences[first]} / {self.sequences[second]})")
+
+    def to_dict(self) -> dict:
+        return {
+            "Metric": self.metric,
+            "MaxDistanceChecked": self.max_distance,
+            "MinDistance": self.min_distance,
+            "Pairs": [{"Index1": self.sequences[first], "Index2": self.sequences[second], "Distance": int(distance)}
+                      for (first, second), distance in zip(self.pairs.tolist(), self.distances)],
+        }
+
+
+def _pairs_within_runs(keys: np.ndarray) -> np.ndarray:
+    """ All (i, j), i < j, of positions whose keys are equal. """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    run_starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    run_ends = np.r_[run_starts[1:], len(keys)]
+    run_end_per_pos = np.repeat(run_ends, run_ends - run_starts)
+
+    # Each sorted position pairs with every later position of its run
+    counts = run_end_per_pos - np.arange(len(keys)) - 1
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty((0, 2), dtype=np.int64)
 
-        if len(lengths_list) == 1:
-            return int(lengths_list[0])
+    left_pos = np.repeat(np.arange(len(keys)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + 1
 
+    pairs = np.stack([order[left_pos], order[left_pos + offsets]], axis=1)
+    return np.sort(pairs, axis=1)
+
+
+def _segment_keys(codes: np.ndarray, start: int, stop: int) -> np.ndarray:
+    keys = np.zeros(len(codes), dtype=np.uint64)
+    for column in range(start, stop):
+        keys = keys * np.uint64(5) + codes[:, column].astype(np.uint64) + np.uint64(1)
+    return keys
+
+
+def hamming_pairs(packed: PackedSequences, max_distance: int,
+                  chunk_size: int = 1_000_000) -> tuple[np.ndarray, np.ndarray]:
+    """ All pairs of equal length sequences within max_distance mismatches.
+
+    Pigeonhole candidate generation: split each length into max_distance + 1
+    segments, two sequences with at most max_distance mismatches must agree
+    on at least one whole segment. Only pairs sharing a segment are compared,
+    and each pair only at the first segment it shares.
+    """
+    codes = packed.codes()
+    lengths = packed.lengths
+
+    found_pairs = [np.empty((0, 2), dtype=np.int64)]
+    found_distances = [np.empty(0, dtype=np.int64)]
+
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        if len(rows) < 2:
+            continue
+
+        boundaries = np.linspace(0, length, max_distance + 2).astype(int)
+
+        if np.any(np.diff(boundaries) == 0):
+            # Segments would be empty, every pair is a candidate
+            candidate_batches = [np.stack(np.triu_indices(len(rows), k=1), axis=1)]
         else:
-            raise ValueError(f"Multiple index lengths in {column}")
+            group_codes = codes[rows]
+            segment_keys = [_segment_keys(group_codes, start, stop)
+                            for start, stop in zip(boundaries[:-1], boundaries[1:])]
+
+            candidate_batches = []
+            for segment, keys in enumerate(segment_keys):
+                candidates = _pairs_within_runs(keys)
+
+                for earlier_keys in segment_keys[:segment]:
+                    candidates = candidates[earlier_keys[candidates[:, 0]] != earlier_keys[candidates[:, 1]]]
+
+                candidate_batches.append(candidates)
+
+        for candidates in candidate_batches:
+            for chunk_start in range(0, len(candidates), chunk_size):
+                chunk = rows[candidates[chunk_start:chunk_start + chunk_size]]
+                distances = packed.pair_mismatches(chunk[:, 0], chunk[:, 1])
+
+                within = distances <= max_distance
+                found_pairs.append(chunk[within])
+                found_distances.append(distances[within])
+
+    return np.concatenate(found_pairs), np.concatenate(found_distances)
+
+
+def _banded_edit_distances(first_codes: np.ndarray, first_lengths: np.ndarray, second_codes: np.ndarray,
+                           second_lengths: np.ndarray, band: int) -> np.ndarray:
+    """ Levenshtein distance of row k of first against row k of second, capped at band + 1.
+
+    Only DP cells within band of the diagonal are kept, as band + 1 is
+    reached outside it anyway. Cell d of a row i holds D[i][i - band + d],
+    every row is computed for all pairs at once. Lengths must differ by at
+    most band, codes are padded to a common width.
+    """
+    pair_count = len(first_lengths)
+    width = 2 * band + 1
+    cap = band + 1
+    offsets = np.arange(width)
+
+    first_lengths = first_lengths.astype(np.int64)
+    second_lengths = second_lengths.astype(np.int64)
+
+    # Pad with distinct out of alphabet codes so padding never matches
+    seq_width = max(first_codes.shape[1], second_codes.shape[1])
+    first_padded = np.full((pair_count, seq_width), 4, dtype=np.uint8)
+    first_padded[:, :first_codes.shape[1]] = first_codes
+    second_padded = np.full((pair_count, seq_width + 2 * band + 2), 5, dtype=np.uint8)
+    second_padded[:, band + 1:band + 1 + second_codes.shape[1]] = second_codes
+
+    # Row 0: D[0][j] = j
+    columns = offsets - band
+    previous = np.broadcast_to(np.where(columns >= 0, columns, cap), (pair_count, width)).copy()
+    previous[columns[None, :] > second_lengths[:, None]] = cap
+    np.minimum(previous, cap, out=previous)
+
+    distances = np.full(pair_count, cap, dtype=np.int64)
+    target = second_lengths - first_lengths + band
+    all_rows = np.arange(pair_count)
+
+    empty = first_lengths == 0
+    distances[empty] = np.minimum(second_lengths[empty], cap)
+
+    for row in range(1, int(first_lengths.max(initial=0)) + 1):
+        columns = row - band + offsets
+
+        # Substitution: first[row - 1] against second[column - 1]
+        second_bases = second_padded[:, columns + band]
+        current = previous + (first_padded[:, row - 1:row] != second_bases)
+
+        # Deletion from the cell above, which sits one band offset further right
+        np.minimum(current[:, :-1], previous[:, 1:] + 1, out=current[:, :-1])
+
+        current[:, columns < 0] = cap
+        if 0 <= band - row < width:
+            current[:, band - row] = row
+
+        # Insertion from the cell to the left, sequential within the row
+        for offset in range(1, width):
+            np.minimum(current[:, offset], current[:, offset - 1] + 1, out=current[:, offset])
+
+        current[columns[None, :] > second_lengths[:, None]] = cap
+        np.minimum(current, cap, out=current)
+
+        done = np.flatnonzero(first_lengths == row)
+        distances[done] = current[all_rows[done], target[done]]
+
+        previous = current
+
+    return distances
+
+
+def _deletion_keys(codes: np.ndarray, lengths: np.ndarray, max_deletions: int) -> tuple[np.ndarray, np.ndarray]:
+    """ Hashes of every variant of every sequence with up to max_deletions bases deleted, and their rows. """
+    keys = [np.empty(0, dtype=np.uint64)]
+    rows = [np.empty(0, dtype=np.int64)]
+
+    for length in np.unique(lengths):
+        group_rows = np.flatnonzero(lengths == length)
+        group_codes = codes[group_rows, :length]
+
+        for deletions in range(min(max_deletions, length) + 1):
+            for deleted in combinations(range(length), deletions):
+                kept = np.delete(group_codes, deleted, axis=1)
+                kept_lengths = np.full(len(group_rows), length - deletions)
+
+                keys.append(PackedSequences.from_codes(kept, kept_lengths).hashes())
+                rows.append(group_rows)
+
+    return np.concatenate(keys), np.concatenate(rows)
+
+
+def mismatch_neighbourhood_keys(packed: PackedSequences, radius: int) -> tuple[np.ndarray, np.ndarray]:
+    """ Hashes of every sequence within radius substitutions of each sequence, and their rows.
+
+    Two equal length sequences share a key exactly when they are at most
+    2 * radius mismatches apart, the neighbourhoods a demultiplexer with
+    that mismatch tolerance assigns to each of them then overlap.
+    """
+    codes = packed.codes()
+    lengths = packed.lengths
+
+    keys = [np.empty(0, dtype=np.uint64)]
+    rows = [np.empty(0, dtype=np.int64)]
+
+    for length in np.unique(lengths):
+        group_rows = np.flatnonzero(lengths == length)
+        group_codes = codes[group_rows, :length]
+        group_lengths = np.full(len(group_rows), length)
+
+        for substitutions in range(min(radius, length) + 1):
+            for positions in combinations(range(length), substitutions):
+                positions = list(positions)
+
+                for shifts in product((1, 2, 3), repeat=substitutions):
+                    variant = group_codes.copy()
+                    variant[:, positions] = (group_codes[:, positions] + np.array(shifts, dtype=np.uint8)) % 4
+
+                    keys.append(PackedSequences.from_codes(variant, group_lengths).hashes())
+                    rows.append(group_rows)
+
+    return np.concatenate(keys), np.concatenate(rows)
+
+
+def neighbourhood_pairs(keys: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """ Unique (i, j), i < j, of rows sharing at least one key. """
+    order = np.lexsort((rows, keys))
+    keys, rows = keys[order], rows[order]
+
+    first_seen = np.r_[True, (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])]
+    keys, rows = keys[first_seen], rows[first_seen]
+
+    pairs = np.sort(rows[_pairs_within_runs(keys)], axis=1)
+    if not len(pairs):
+        return pairs
+
+    row_count = int(rows.max()) + 1
+    return np.stack(np.divmod(np.unique(pairs[:, 0] * row_count + pairs[:, 1]), row_count), axis=1)
+
+
+def _edit_distance_chunk(codes: np.ndarray, lengths: np.ndarray, candidates: np.ndarray,
+                         max_distance: int) -> tuple[np.ndarray, np.ndarray]:
+    first, second = candidates[:, 0], candidates[:, 1]
+    distances = _banded_edit_distances(codes[first], lengths[first], codes[second], lengths[second], max_distance)
+
+    within = distances <= max_distance
+    return candidates[within], distances[within]
+
+
+def edit_distance_pairs(packed: PackedSequences, max_distance: int, workers: int | None = None,
+                        chunk_size: int = 200_000) -> tuple[np.ndarray, np.ndarray]:
+    """ All pairs of sequences, of any lengths, within max_distance edits.
+
+    Two sequences within max_distance edits become equal after deleting at
+    most max_distance bases from each, one per substitution and one per
+    indel. Only pairs sharing such a deletion variant are candidates, which
+    are then scored in chunks with the banded DP, optionally spread over a
+    process pool of workers.
+    """
+    codes = packed.codes()
+    lengths = packed.lengths.astype(np.int64)
+
+    # A sequence can reach the same variant by different deletions, each pair is kept once
+    candidates = neighbourhood_pairs(*_deletion_keys(codes, lengths, max_distance))
+
+    chunks = [candidates[start:start + chunk_size] for start in range(0, len(candidates), chunk_size)]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_edit_distance_chunk, *zip(*[(codes, lengths, chunk, max_distance)
+                                                                     for chunk in chunks])))
+    else:
+        results = [_edit_distance_chunk(codes, lengths, chunk, max_distance) for chunk in chunks]
+
+    pairs = [np.empty((0, 2), dtype=np.int64)] + [pairs for pairs, _ in results]
+    distances = [np.empty(0, dtype=np.int64)] + [distances for _, distances in results]
+
+    return np.concatenate(pairs), np.concatenate(distances)
+
+
+def _index_sequences(df: pd.DataFrame, columns: list[str]) -> tuple[list[str], list[str]]:
+    """ Sequences to compare and their display form, for rows with every column set. """
+    values = df[columns].fillna('').astype(str).apply(lambda s: s.str.strip())
+    values = values[values.ne('').all(axis=1)]
+
+    if len(columns) == 1:
+        sequences = values[columns[0]].tolist()
+        return sequences, sequences
+
+    return values.sum(axis=1).tolist(), ['+'.join(row) for row in values.itertuples(index=False)]
+
+
+def has_mixed_lengths(df: pd.DataFrame, column: str) -> bool:
+    lengths = df[column].dropna().astype(str).str.strip()
+    lengths = lengths[lengths.ne('')].str.len()
+    return lengths.nunique() > 1
+
+
+def index_collisions(df: pd.DataFrame, columns: list[str], set_name: str, max_distance: int = 2,
+                     metric: str = HAMMING, workers: int | None = None) -> CollisionReport:
+    """ Collisions over one or more index columns, concatenated per row.
+
+    Hamming only compares indexes of equal length, Levenshtein compares
+    every pair and also catches indexes that were trimmed or padded.
+    """
+    sequences, display = _index_sequences(df, columns)
+    packed = PackedSequences.from_strings(sequences)
+
+    if metric == HAMMING:
+        pairs, distances = hamming_pairs(packed, max_distance)
+    elif metric == LEVENSHTEIN:
+        pairs, distances = edit_distance_pairs(packed, max_distance, workers)
+    else:
+        raise ValueError(f"Unknown distance metric: {metric}")
+
+    order = np.lexsort((pairs[:, 1], pairs[:, 0], distances)) if len(distances) else np.empty(0, dtype=np.int64)
+
+    return CollisionReport(set_name, '+'.join(columns), max_distance, pairs[order], distances[order], display, metric)
+
+
+def index_set_collisions(df: pd.DataFrame, index_set_fields: dict[str, list[str]], max_distance: int = 2,
+                         metric: str | None = None, workers: int | None = None) -> list[CollisionReport]:
+    """ i7, i5 and combined dual index collisions for every index set.
+
+    Without an explicit metric, sets whose indexes differ in length are
+    checked with Levenshtein distance and all others with Hamming distance.
+    """
+    reports = []
+
+    for set_name, field_list in index_set_fields.items():
+        seq_columns = [field for field in ('IndexI7', 'IndexI5') if field in field_list and field in df.columns]
+
+        set_metric = metric
+        if set_metric is None:
+            mixed = any(has_mixed_lengths(df, column) for column in seq_columns)
+            set_metric = LEVENSHTEIN if mixed else HAMMING
+
+        for column in seq_columns:
+            reports.append(index_collisions(df, [column], set_name, max_distance, set_metric, workers))
+
+        if len(seq_columns) == 2:
+            reports.append(index_collisions(df, seq_columns, set_name, max_distance, set_metric, workers))
+
+    return reports
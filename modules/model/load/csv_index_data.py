@@ -1,29 +1,223 @@
+import codecs
 import csv
+import importlib.util
 from pathlib import Path
+from typing import Iterator
 
 import pandas as pd
 
+# Only this much of the file is read to detect its encoding and delimiter
+SNIFF_SAMPLE_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+
+# UTF-32 first, its little endian BOM starts with the UTF-16 one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def detect_encoding(sample: bytes) -> str:
+    """ Encoding from a byte order mark, else UTF-8 if the sample decodes as such, else Latin-1. """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    try:
+        # Not final, the sample may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return "latin-1"
+
+    return "utf-8"
+
+
+def sniff_csv(filepath: Path) -> tuple[str, str]:
+    """ (encoding, delimiter) of a delimited text file, from its first SNIFF_SAMPLE_BYTES. """
+    with open(filepath, "rb") as fh:
+        sample = fh.read(SNIFF_SAMPLE_BYTES)
+
+    encoding = detect_encoding(sample)
+    text = sample.decode(encoding, errors="ignore")
+
+    # Only sniff whole lines when the sample was cut off
+    if len(sample) == SNIFF_SAMPLE_BYTES and "\n" in text:
+        text = text[:text.rindex("\n")]
+
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    return encoding, delimiter
+
+
+def unique_column_names(columns) -> list[str]:
+    """ Name blank headers 'Unnamed: i' and number repeats 'name.1', as the pandas C parser does. """
+    names = []
+    seen = {}
+
+    for i, column in enumerate(columns):
+        name = str(column).strip() or f"Unnamed: {i}"
+
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+
+        names.append(name)
+
+    return names
+
+
+def header_fixes(raw_header, names: list[str]) -> list[str]:
+    """ What unique_column_names changed, as messages for the user. """
+    messages = []
+
+    for raw, name in zip(raw_header, names):
+        raw = "" if raw is None else str(raw).strip()
+        if not raw:
+            messages.append(f"Blank header named '{name}'")
+        elif raw != name:
+            messages.append(f"Repeated header '{raw}' renamed '{name}'")
+
+    return messages
+
+
+def read_header(filepath: Path, encoding: str, delimiter: str) -> list[str]:
+    with open(filepath, "r", encoding=encoding, newline="") as fh:
+        return next(csv.reader(fh, delimiter=delimiter), [])
+
+
+def _iter_with_pyarrow(filepath: Path, encoding: str, delimiter: str, header: list[str], columns: list[str],
+                       chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    # The file header is replaced by unique names, so columns can be selected by them
+    read_options = pv.ReadOptions(encoding=encoding, column_names=header, skip_rows=1)
+    convert_options = pv.ConvertOptions(column_types={name: pa.string() for name in columns},
+                                        include_columns=columns, strings_can_be_null=True)
+
+    reader = pv.open_csv(filepath, read_options=read_options, parse_options=pv.ParseOptions(delimiter=delimiter),
+                         convert_options=convert_options)
+
+    # Record batches follow the parser block size, regroup them into chunk_rows rows
+    batches = []
+    rows = 0
+    chunks = 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+
+        while rows >= chunk_rows:
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+            yield table.slice(0, chunk_rows).to_pandas()
+            chunks += 1
+
+            rest = table.slice(chunk_rows)
+            batches = rest.to_batches()
+            rows = rest.num_rows
+
+    # An empty table still yields one chunk, so its columns are known
+    if rows or not chunks:
+        yield pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+
+
+def iter_delimited_chunks(filepath: Path, encoding: str, delimiter: str, columns: list[str] | None = None,
+                          chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """ Read a delimited file as string chunks of at most chunk_rows rows.
+
+    Only the named columns are parsed and kept, all of them if columns is
+    None. Column names are those given by unique_column_names.
+    """
+    header = unique_column_names(read_header(filepath, encoding, delimiter))
+    columns = header if columns is None else [column for column in header if column in columns]
+
+    if CSV_ENGINE == "pyarrow":
+        yielded = False
+        try:
+            for chunk in _iter_with_pyarrow(filepath, encoding, delimiter, header, columns, chunk_rows):
+                yielded = True
+                yield chunk
+            return
+        except ValueError as e:
+            # Ragged rows and other input the pyarrow parser rejects can
+            # only be handed to pandas before the first chunk went out
+            if yielded:
+                raise ValueError(f"Could not parse {Path(filepath).name}: {e}") from e
+
+    reader = pd.read_csv(filepath, sep=delimiter, encoding=encoding, dtype=str, header=0, names=header,
+                         usecols=columns, chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def estimate_row_count(filepath: Path) -> int:
+    """ Rows of a delimited file, extrapolated from the line lengths in its first SNIFF_SAMPLE_BYTES. """
+    with open(filepath, "rb") as fh:
+        sample = fh.read(SNIFF_SAMPLE_BYTES)
+
+    lines = max(sample.count(b"\n"), 1)
+    return max(1, Path(filepath).stat().st_size * lines // max(len(sample), 1))
+
 
 class CsvIndexData:
-    def __init__(self, filepath, logger):
+    """ Every cell of a delimited file as a string.
+
+    The file is read in chunks, progress(percent, message) is called after
+    each of them and may raise to stop reading.
+    """
+
+    def __init__(self, filepath, logger, progress=None):
         self._logger = logger
         self._indexes: pd.DataFrame | None = None
+        self._messages: list[str] = []
+
+        self._encoding, self._delimiter = sniff_csv(filepath)
+        self._load_csv(Path(filepath), progress)
+
+    def _load_csv(self, filepath: Path, progress=None):
+        estimated_rows = estimate_row_count(filepath)
+        chunks = []
+        rows = 0
 
-        self._load_csv(filepath)
+        for chunk in iter_delimited_chunks(filepath, self._encoding, self._delimiter, chunk_rows=DEFAULT_CHUNK_ROWS):
+            chunks.append(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                progress(min(99, 100 * rows // estimated_rows), f"Read {rows} rows of {filepath.name}")
 
-    @staticmethod
-    def _detect_delimiter(filepath: Path) -> str:
-        with open(filepath, 'r') as csvfile:
-            content = csvfile.read()
-            dialect = csv.Sniffer().sniff(content)
+        if len(chunks) == 1:
+            df = chunks[0]
+        else:
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        self._indexes = df.reset_index(drop=True)
+        self._messages = header_fixes(read_header(filepath, self._encoding, self._delimiter),
+                                      list(self._indexes.columns))
 
-            return dialect.delimiter
+    @property
+    def encoding(self) -> str:
+        return self._encoding
 
-    def _load_csv(self, filepath: Path):
-        delimiter = self._detect_delimiter(filepath)
-        self._indexes = pd.read_csv(filepath, sep=delimiter)
+    @property
+    def delimiter(self) -> str:
+        return self._delimiter
 
     @property
     def indexes(self) -> pd.DataFrame | None:
         return self._indexes
 
+    @property
+    def messages(self) -> list[str]:
+        """ Problems in the file that were fixed while reading it. """
+        return list(self._messages)
@@ -0,0 +1,192 @@
+import hashlib
+import importlib.util
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+# Bump when a loader changes what it produces for the same file
+CACHE_FORMAT_VERSION = 5
+
+CACHE_DIR_ENV = "INDEX_TOOL_CACHE_DIR"
+
+DEFAULT_MEMORY_ENTRIES = 16
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+# Parquet schema metadata key holding the kit fields, parse messages included, next to the table
+_METADATA_KEY = b"index_tool"
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "index_tool"
+
+
+def file_content_key(path: Path, source_format: str) -> str:
+    """ sha256 over the file content, the source format and the cache format version. """
+    digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION}:{source_format}:".encode())
+
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """ Two level cache of parsed index kits, keyed by file content hash.
+
+    The first level keeps the most recently used kits in memory, the second
+    stores them as Parquet files in cache_dir so they are shared between GUI
+    sessions and batch worker processes. The disk level is left out when
+    pyarrow is not installed, and the oldest files are evicted once the
+    directory grows past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir: Path | None = None, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES, logger=None):
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self._memory_entries = memory_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._logger = logger
+
+        self._memory = OrderedDict()
+        self._disk_enabled = max_disk_bytes > 0 and importlib.util.find_spec("pyarrow") is not None
+
+    @property
+    def cache_dir(self) -> Path:
+        return self._cache_dir
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self._disk_enabled
+
+    def _warn(self, message: str):
+        if self._logger is not None:
+            self._logger.warning(message)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.parquet"
+
+    def get(self, key: str):
+        """ The cached IndexKit for key, or None. """
+        kit = self._memory.get(key)
+        if kit is not None:
+            self._memory.move_to_end(key)
+            return kit.copy()
+
+        if not self._disk_enabled:
+            return None
+
+        kit = self._read_disk(key)
+        if kit is not None:
+            self._remember(key, kit)
+            return kit.copy()
+
+        return None
+
+    def put(self, key: str, kit):
+        self._remember(key, kit.copy())
+
+        if self._disk_enabled:
+            self._write_disk(key, kit)
+
+    def clear(self):
+        self._memory.clear()
+
+        if self._cache_dir.is_dir():
+            for path in self._cache_dir.glob("*.parquet"):
+                path.unlink(missing_ok=True)
+
+    def _remember(self, key: str, kit):
+        self._memory[key] = kit
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from modules.model.index_kit import IndexKit
+
+        path = self._disk_path(key)
+        if not path.is_file():
+            return None
+
+        try:
+            table = pq.read_table(path)
+            fields = json.loads(table.schema.metadata[_METADATA_KEY])
+        except (pa.ArrowException, OSError, KeyError, ValueError) as e:
+            self._warn(f"Ignoring unreadable parse cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        kit = IndexKit()
+        for name, value in fields.items():
+            setattr(kit, name, value)
+        kit.index_df = table.to_pandas()
+
+        # Mark as recently used for eviction
+        os.utime(path)
+
+        return kit
+
+    def _write_disk(self, key: str, kit):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from modules.model.index_kit import LOADED_FIELDS
+
+        fields = {name: getattr(kit, name) for name in LOADED_FIELDS if name not in ("source_df", "import_filepath")}
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+
+        try:
+            table = pa.Table.from_pandas(kit.index_df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[_METADATA_KEY] = json.dumps(fields).encode()
+
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+
+            # Atomic, so concurrent batch workers never read a partial file
+            os.replace(tmp_path, path)
+        except (pa.ArrowException, OSError, TypeError, ValueError) as e:
+            self._warn(f"Could not write parse cache entry for {kit.import_filepath}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self._cache_dir.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self._max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_default_cache: ParseCache | None = None
+
+
+def default_parse_cache() -> ParseCache:
+    """ The process wide cache used by load_index_kit. """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
@@ -1,27 +1,34 @@
 import re
+from functools import cached_property
 from pathlib import Path
-from pprint import pprint
 
 import pandas as pd
-from io import StringIO
+
+# Lines read between two progress reports
+PROGRESS_LINES = 50_000
 
 
 class IlluminaIndexData:
-    def __init__(self, filepath, logger):
+    """ Illumina index kit definition file (TSV).
+
+    The file is streamed once and split into raw section lines. Sections are
+    tokenised into columnar tables only when they are first accessed, and
+    every derived table is built at most once. progress(percent, message) is
+    called while the file is read and may raise to stop reading.
+    """
+
+    def __init__(self, filepath, logger, progress=None):
         self._logger = logger
 
         self._index_name_pair_pattern = re.compile(r'^[^\s\-]+-[^\s\-]+$')
 
-        # indata from parser
+        # raw section lines from the parser
 
-        self._indata: dict | None = None
+        self._indata: dict[str, list[str]] | None = None
 
         # sections
 
         self._index_kit: dict | None = None
-        self._supported_library_prep_kits: list | None = None
-        self._resources = pd.DataFrame()
-        self._indexes = pd.DataFrame()
 
         # index_kit data
         self._checksum: str | None = None
@@ -32,52 +39,21 @@ class IlluminaIndexData:
         self._description: str | None = None
         self._index_strategy: str | None = None
 
-        # adapters
-
-        self._adapter_read_1: str | None = None
-        self._adapter_read_2: str | None = None
-
-        # index dataframes
-        self._i7_indexes = pd.DataFrame()
-        self._i5_indexes = pd.DataFrame()
-        self._fixed_layout_data = pd.DataFrame()
-        self._fixed_dual_indexes = pd.DataFrame()
-        self._fixed_single_indexes = pd.DataFrame()
-        self._standard_indexes = pd.DataFrame()
-
-        # Meta
-
-        self._i7_indexes_count = None
-        self._i5_indexes_count = None
-
         self._import_filetype = None
         self._ilmn_index_strategy = None
-        self._ilmn_fixed_layout = None
-        self._index_i7_count = None
-        self._index_i5_count = None
-        self._ilmn_umi_compatible = None
 
-        self._set_data(filepath)
+        # problems found while building the tables
+        self._messages: list[str] = []
 
-    def _set_data(self, filepath: Path):
-        self._read_file_to_indata(filepath)
-        self._set_import_filetype(filepath.suffix)
+        self._set_data(Path(filepath), progress)
 
-        self._set_sections()
+    def _set_data(self, filepath: Path, progress=None):
+        self._read_file_to_indata(filepath, progress)
+        self._set_import_filetype(filepath.suffix)
 
+        self._set_index_kit()
         self._set_index_kit_data()
         self._set_ilmn_index_strategy()
-        self._set_adapters()
-        self._set_fixed_layout()
-
-        self._set_indexes()
-        self._set_i7_indexes()
-        self._set_i5_indexes()
-
-        self._set_ilmn_umi_compatible()
-
-        self._set_fixed_dual_indexes()
-        self._set_standard_indexes()
 
     def _set_import_filetype(self, value):
         self._import_filetype = value
@@ -86,20 +62,6 @@ class IlluminaIndexData:
         if "IndexStrategy" in self._index_kit:
             self._ilmn_index_strategy = self._index_kit["IndexStrategy"]
 
-    def _set_ilmn_fixed_layout(self, value):
-        self._ilmn_fixed_layout = value
-
-    def _set_index_i7_count(self, value):
-        self._index_i7_count = value
-
-    def _set_index_i5_count(self, value):
-        self._index_i5_count = value
-
-    def _set_ilmn_umi_compatible(self):
-        if "UMICompatible" in self._resources["Name"].values:
-            umi_compat = self._resources.loc[self._resources["Name"] == "UMICompatible", "Value"].values[0]
-            self._ilmn_umi_compatible = umi_compat
-
     @property
     def import_filetype(self):
         return self._import_filetype
@@ -109,69 +71,125 @@ class IlluminaIndexData:
         return self._ilmn_index_strategy
 
     @property
-    def ilmn_fixed_layout(self):
-        return self._ilmn_fixed_layout
+    def ilmn_fixed_layout(self) -> bool:
+        value = self._resource_values.get("FixedLayout")
+        return value is not None and value.strip().lower() == "true"
 
     @property
     def index_i7_count(self):
-        return self._index_i7_count
+        return self.i7_indexes.shape[0]
 
     @property
     def index_i5_count(self):
-        return self._index_i5_count
+        return self.i5_indexes.shape[0]
 
     @property
-    def ilmn_umi_compatible(self):
-        return self._ilmn_umi_compatible
-
-    def _set_indexes(self):
-
-        indices_list = self._indata['Indices']
-        indices_str = "\n".join(indices_list)
-
-        self._indexes = pd.read_csv(StringIO(indices_str), sep='\t')
-
-    def _set_i7_indexes(self):
-        self._i7_indexes = self._indexes[self._indexes["IndexReadNumber"] == 1].copy()
-        self._i7_indexes.rename(columns={'Name': 'IndexI7Name', 'Sequence': 'IndexI7'}, inplace=True)
-        self._i7_indexes.drop(columns=['IndexReadNumber'], inplace=True)
-
-        self._set_index_i7_count(self._i7_indexes.shape[0])
-
-    def _set_i5_indexes(self):
-        self._i5_indexes = self._indexes[self._indexes["IndexReadNumber"] == 2].copy()
-        self._i5_indexes.rename(columns={'Name': 'IndexI5Name', 'Sequence': 'IndexI5'}, inplace=True)
-        self._i5_indexes.drop(columns=['IndexReadNumber'], inplace=True)
-
-        self._set_index_i5_count(self._i5_indexes.shape[0])
-
-    def _set_fixed_dual_indexes(self):
-
-        self._fixed_dual_indexes = (self._fixed_layout_data.drop(columns=['Type', 'Format', 'Value'])
-                                    .merge(self._i7_indexes, on='IndexI7Name')
-                                    .merge(self._i5_indexes, on='IndexI5Name')).copy()
-
-    def _set_standard_indexes(self):
-        self._standard_indexes = pd.concat([self._i7_indexes, self._i5_indexes], axis=1)
-
-    def _set_fixed_layout(self):
-
-        if "FixedLayout" in self._resources["Name"].values:
-            fixed_layout = bool(self._resources.loc[self._resources["Name"] == "FixedLayout", "Value"].values[0])
-
-            if not fixed_layout:
-                return
+    def messages(self) -> list[str]:
+        """ Problems found in the tables read so far. """
+        return list(self._messages)
 
-            self._fixed_layout_data =  self._resources[
-                self._resources['Type'].str.contains('FixedIndexPosition', na=False)
-            ].rename(columns={'Name': 'Well'})
-
-            self._fixed_layout_data[['IndexI7Name', 'IndexI5Name']] = self._fixed_layout_data['Value'].str.split('-', expand=True)
+    @property
+    def ilmn_umi_compatible(self):
+        return self._resource_values.get("UMICompatible")
+
+    @staticmethod
+    def _tokenise_section(lines: list[str]) -> dict[str, list]:
+        """ Split tab separated section lines straight into columns, header first.
+
+        Empty fields and fields missing from short rows are both None, the
+        section table turns them into NaN as read_csv did.
+        """
+        if not lines:
+            return {}
+
+        header = lines[0].split('\t')
+        columns = [[] for _ in header]
+        width = len(header)
+
+        for line in lines[1:]:
+            fields = line.split('\t')
+            fields += [''] * (width - len(fields))
+            for i in range(width):
+                columns[i].append(fields[i] or None)
+
+        return dict(zip(header, columns))
+
+    def _section_table(self, section_name: str) -> pd.DataFrame:
+        return pd.DataFrame(self._tokenise_section(self._indata.get(section_name, [])), dtype="str")
+
+    @cached_property
+    def _resources(self) -> pd.DataFrame:
+        resources = self._section_table('Resources')
+        if resources.empty:
+            resources = pd.DataFrame(columns=['Name', 'Type', 'Format', 'Value'])
+        return resources
+
+    @cached_property
+    def _resource_values(self) -> dict[str, str]:
+        values = {}
+        for name, value in zip(self._resources["Name"], self._resources["Value"]):
+            if pd.notna(value):
+                values.setdefault(name, value)
+        return values
+
+    @cached_property
+    def _indexes(self) -> pd.DataFrame:
+        indexes = self._section_table('Indices')
+        if indexes.empty:
+            indexes = pd.DataFrame(columns=['Name', 'Sequence', 'IndexReadNumber'])
+        return indexes
+
+    def _read_indexes(self, read_number: str, name_column: str, seq_column: str) -> pd.DataFrame:
+        indexes = self._indexes[self._indexes["IndexReadNumber"] == read_number]
+        indexes = indexes.rename(columns={'Name': name_column, 'Sequence': seq_column})
+        return indexes.drop(columns=['IndexReadNumber']).reset_index(drop=True)
+
+    @cached_property
+    def i7_indexes(self) -> pd.DataFrame:
+        return self._read_indexes("1", 'IndexI7Name', 'IndexI7')
+
+    @cached_property
+    def i5_indexes(self) -> pd.DataFrame:
+        return self._read_indexes("2", 'IndexI5Name', 'IndexI5')
+
+    @cached_property
+    def fixed_layout_data(self) -> pd.DataFrame:
+        if not self.ilmn_fixed_layout:
+            return pd.DataFrame()
+
+        fixed_layout_data = self._resources[
+            self._resources['Type'].str.contains('FixedIndexPosition', na=False)
+        ].rename(columns={'Name': 'Well'}).reset_index(drop=True)
+
+        index_name_pairs = fixed_layout_data['Value'].str.split('-', n=1, expand=True)
+        fixed_layout_data['IndexI7Name'] = index_name_pairs[0]
+        fixed_layout_data['IndexI5Name'] = index_name_pairs[1]
+
+        return fixed_layout_data
+
+    @cached_property
+    def fixed_dual_indexes(self) -> pd.DataFrame:
+        if self.fixed_layout_data.empty:
+            return pd.DataFrame()
+
+        fixed_dual_indexes = (self.fixed_layout_data.drop(columns=['Type', 'Format', 'Value'])
+                              .merge(self.i7_indexes, on='IndexI7Name')
+                              .merge(self.i5_indexes, on='IndexI5Name'))
+
+        dropped = self.fixed_layout_data['Well'][~self.fixed_layout_data['Well'].isin(fixed_dual_indexes['Well'])]
+        if len(dropped):
+            self._messages.append(f"Dropped {len(dropped)} fixed layout wells without a matching index: "
+                                  f"{', '.join(dropped.astype(str).tolist()[:5])}")
+
+        return fixed_dual_indexes
 
-            self._set_ilmn_fixed_layout(fixed_layout)
+    @property
+    def fixed_single_indexes(self) -> pd.DataFrame:
+        return pd.DataFrame()
 
-        else:
-            self._set_ilmn_fixed_layout(False)
+    @cached_property
+    def standard_indexes(self) -> pd.DataFrame:
+        return pd.concat([self.i7_indexes, self.i5_indexes], axis=1)
 
     def _set_index_kit_data(self):
         self._checksum = self._index_kit.get('Checksum', None)
@@ -182,43 +200,33 @@ class IlluminaIndexData:
         self._description = self._index_kit.get('Description', None)
         self._index_strategy = self._index_kit.get('IndexStrategy', None)
 
-    def _set_resources(self):
-
-        resources_list = self._indata['Resources']
-        resources_str = "\n".join(resources_list)
-
-        self._resources = pd.read_csv(StringIO(resources_str), sep='\t')
-
-    def _set_adapters(self):
-        if "Adapter" in self._resources["Name"].values:
-            self._adapter_read_1 = self._resources.loc[self._resources["Name"] == "Adapter", "Value"].values[0]
-
-        if "AdapterRead1" in self._resources["Name"].values:
-            self._adapter_read_1 = self._resources.loc[self._resources["Name"] == "AdapterRead1", "Value"].values[0]
-
-        if "AdapterRead2" in self._resources["Name"].values:
-            self._adapter_read_2 = self._resources.loc[self._resources["Name"] == "AdapterRead2", "Value"].values[0]
+    @property
+    def adapter_read_1(self) -> str | None:
+        return self._resource_values.get("AdapterRead1", self._resource_values.get("Adapter"))
 
-    def _set_sections(self):
-        self._set_index_kit()
-        self._supported_library_prep_kits = self._indata.get('SupportedLibraryPrepKits', [])
-        self._set_resources()
-        self._set_indexes()
+    @property
+    def adapter_read_2(self) -> str | None:
+        return self._resource_values.get("AdapterRead2")
 
-    def _read_file_to_indata(self, filepath: Path):
+    def _read_file_to_indata(self, filepath: Path, progress=None):
         sections = {}
-        current_section = None
-        content = filepath.read_text(encoding="utf-8")
-
-        for line in content.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('[') and line.endswith(']'):
-                current_section = line[1:-1]
-                sections[current_section] = []
-            else:
-                sections[current_section].append(line)
+        current_lines = None
+        file_size = max(filepath.stat().st_size, 1)
+        read_chars = 0
+
+        with open(filepath, 'r', encoding="utf-8") as file:
+            for number, line in enumerate(file, start=1):
+                read_chars += len(line)
+                if progress is not None and number % PROGRESS_LINES == 0:
+                    progress(min(99, 100 * read_chars // file_size), f"Read {number} lines of {filepath.name}")
+
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    current_lines = sections.setdefault(line[1:-1], [])
+                elif current_lines is not None:
+                    current_lines.append(line)
 
         self._indata = sections
 
@@ -228,12 +236,12 @@ class IlluminaIndexData:
         self._index_kit = {}
 
         for row in kit_section:
-            key, value = row.strip().split('\t')
+            key, _, value = row.partition('\t')
             self._index_kit[key] = value
 
     @property
     def supported_library_prep_kits(self) -> list | None:
-        return self._supported_library_prep_kits
+        return self._indata.get('SupportedLibraryPrepKits', [])
 
     @property
     def checksum(self) -> str | None:
@@ -263,37 +271,5 @@ class IlluminaIndexData:
     def index_strategy(self) -> str | None:
         return self._index_strategy
 
-    @property
-    def adapter_read_1(self) -> str | None:
-        return self._adapter_read_1
-
-    @property
-    def adapter_read_2(self) -> str | None:
-        return self._adapter_read_2
-
-    @property
-    def i7_indexes(self) -> pd.DataFrame | None:
-        return self._i7_indexes
-
-    @property
-    def i5_indexes(self) -> pd.DataFrame | None:
-        return self._i5_indexes
-
-    @property
-    def fixed_layout_data(self) -> pd.DataFrame | None:
-        return self._fixed_layout_data
-
-    @property
-    def fixed_dual_indexes(self) -> pd.DataFrame | None:
-        return self._fixed_dual_indexes
-
-    @property
-    def fixed_single_indexes(self) -> pd.DataFrame | None:
-        return self._fixed_single_indexes
-
-    @property
-    def standard_indexes(self) -> pd.DataFrame | None:
-        return self._standard_indexes
-
     def __repr__(self):
-        return f"IlluminaIndexData({self.__dict__})"
\ No newline at end of file
+        return f"IlluminaIndexData(name={self._name!r}, sections={list(self._indata)})"
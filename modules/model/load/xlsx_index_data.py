@@ -1,26 +1,171 @@
-import csv
+import datetime
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
 import pandas as pd
 
+from modules.model.load.csv_index_data import header_fixes, unique_column_names
+
+# calamine parses in Rust and is preferred, openpyxl in read-only mode streams rows otherwise
+XLSX_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") is not None else "openpyxl"
+
+# Rows converted between two progress reports
+PROGRESS_ROWS = 10_000
+
+
+def cell_text(value) -> str | None:
+    """ A cell value as the text shown in Excel, None for an empty cell.
+
+    Excel stores all numbers as floats, whole numbers are written without
+    the trailing '.0'.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def list_sheet_names(filepath: Path) -> list[str]:
+    """ Names of the worksheets in workbook order, without parsing their cells. """
+    if XLSX_ENGINE == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        with CalamineWorkbook.from_path(str(filepath)) as workbook:
+            return list(workbook.sheet_names)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _sheet_rows(filepath: Path, sheet_name: str | None) -> Iterator[list]:
+    """ Cell values row by row, of the first sheet if sheet_name is None.
+
+    openpyxl reads the rows lazily, calamine parses the whole sheet at once.
+    """
+    if XLSX_ENGINE == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        with CalamineWorkbook.from_path(str(filepath)) as workbook:
+            if sheet_name is None:
+                sheet = workbook.get_sheet_by_index(0)
+            else:
+                sheet = workbook.get_sheet_by_name(sheet_name)
+            yield from sheet.to_python(skip_empty_area=False)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+        # The stored dimensions of formatted sheets are often far too large
+        worksheet.reset_dimensions()
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def read_sheet(filepath: Path, sheet_name: str | None = None, messages: list[str] | None = None,
+               progress=None) -> pd.DataFrame:
+    """ One worksheet as a table of strings, the first row being the header.
+
+    Rows without any value, such as formatted but empty rows at the end of a
+    sheet, are left out. Empty rows between filled ones and renamed headers
+    are appended to messages. progress(percent, message) is called every
+    PROGRESS_ROWS rows and may raise to stop reading.
+    """
+    if sheet_name is not None and sheet_name not in list_sheet_names(filepath):
+        raise ValueError(f"{Path(filepath).name} has no sheet named '{sheet_name}'")
+
+    rows = []
+    for row in _sheet_rows(filepath, sheet_name):
+        rows.append([cell_text(value) for value in row])
+        if progress is not None and len(rows) % PROGRESS_ROWS == 0:
+            # The row count is not known up front, the percentage only creeps up
+            progress(min(90, len(rows) // PROGRESS_ROWS), f"Read {len(rows)} rows of {Path(filepath).name}")
+
+    filled = [any(value is not None for value in row) for row in rows]
+    rows = [row for row, is_filled in zip(rows, filled) if is_filled]
+
+    if not rows:
+        return pd.DataFrame()
+
+    width = max(len(row) for row in rows)
+    raw_header = rows[0] + [None] * (width - len(rows[0]))
+    header = unique_column_names((value or "" for value in raw_header))
+
+    if messages is not None:
+        last_filled = len(filled) - 1 - filled[::-1].index(True)
+        skipped = [number for number, is_filled in enumerate(filled[:last_filled], start=1) if not is_filled]
+        if skipped:
+            messages.append(f"Skipped {len(skipped)} empty rows, the first at sheet row {skipped[0]}")
+        messages.extend(header_fixes(raw_header, header))
+    columns = {name: [] for name in header}
+
+    for row in rows[1:]:
+        row = row + [None] * (width - len(row))
+        for name, value in zip(header, row):
+            columns[name].append(value)
+
+    return pd.DataFrame({name: pd.Series(values, dtype="str") for name, values in columns.items()})
+
+
+def read_sheets(filepath: Path, sheet_names: list[str] | None = None, workers: int | None = None) -> dict[str, pd.DataFrame]:
+    """ Several worksheets by name, all of them if sheet_names is None.
+
+    Sheets are parsed across a process pool unless workers is 1 or there
+    is only one sheet to read.
+    """
+    if sheet_names is None:
+        sheet_names = list_sheet_names(filepath)
+
+    if workers == 1 or len(sheet_names) < 2:
+        return {name: read_sheet(filepath, name) for name in sheet_names}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(read_sheet, filepath, name) for name in sheet_names}
+        return {name: future.result() for name, future in futures.items()}
+
+
 class XlsxIndexData:
-    def __init__(self, filepath, logger):
+    def __init__(self, filepath, logger, sheet_name: str | None = None, progress=None):
         self._logger = logger
         self._indexes: pd.DataFrame | None = None
+        self._sheet_name = sheet_name
+        self._messages: list[str] = []
 
-        self._load_xlsx(filepath)
+        self._load_xlsx(Path(filepath), progress)
 
-    @staticmethod
-    def _detect_delimiter(filepath: Path) -> str:
-        with open(filepath, 'r') as csvfile:
-            content = csvfile.read()
-            dialect = csv.Sniffer().sniff(content)
+    def _load_xlsx(self, filepath: Path, progress=None):
+        if self._sheet_name is None:
+            self._sheet_name = list_sheet_names(filepath)[0]
 
-            return dialect.delimiter
+        self._indexes = read_sheet(filepath, self._sheet_name, self._messages, progress)
 
-    def _load_xlsx(self, filepath: Path):
-        self._indexes = pd.read_excel(filepath)
+    @property
+    def sheet_name(self) -> str:
+        return self._sheet_name
 
     @property
     def indexes(self) -> pd.DataFrame | None:
         return self._indexes
+
+    @property
+    def messages(self) -> list[str]:
+        """ Problems in the sheet that were fixed while reading it. """
+        return list(self._messages)
@@ -0,0 +1,195 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from modules.model.index_kit import IndexKit
+
+# Reads of a run in RunInfo order, the index reads take their length from the kit
+READ_NAMES = ("Read1", "Index1", "Index2", "Read2")
+INDEX_READ_OF = {"Index1": "IndexI7", "Index2": "IndexI5"}
+
+DEFAULT_READ_PATTERN = "Y{r}"
+DEFAULT_INDEX_PATTERN = "I{i}"
+
+# Operations allowed in read and index patterns, and the placeholder each may use once:
+# {r} takes the cycles of the read left over, {i} the length of the sample index
+READ_OPERATIONS = "YUN"
+INDEX_OPERATIONS = "IUN"
+READ_PLACEHOLDER = "{r}"
+INDEX_PLACEHOLDER = "{i}"
+
+_SEGMENT = re.compile(r"([A-Z])(\d+|\{[a-z]\})")
+
+
+class ReadPattern:
+    """ The compiled pattern of one read, such as U8Y{r} or I{i}U9.
+
+    segments holds (operation, cycles) with cycles None for the placeholder.
+    """
+
+    __slots__ = ("text", "is_index", "segments", "fixed_cycles")
+
+    def __init__(self, text: str, is_index: bool):
+        self.text = text
+        self.is_index = is_index
+        self.segments = _parse_segments(text, is_index)
+        self.fixed_cycles = sum(cycles for _, cycles in self.segments if cycles is not None)
+
+    def render(self, read_cycles: int, index_length: int | None = None) -> str:
+        """ Concrete override cycles of the read, masking the cycles the pattern leaves over.
+
+        For index patterns index_length fills {i}, None masks the whole read
+        for samples without an index on it.
+        """
+        if self.is_index and index_length is None:
+            return f"N{read_cycles}"
+
+        if self.is_index:
+            value = index_length
+        else:
+            value = read_cycles - self.fixed_cycles
+
+        segments = [(operation, value if cycles is None else cycles) for operation, cycles in self.segments]
+
+        used = sum(cycles for _, cycles in segments)
+        if used > read_cycles or (value is not None and value < 0):
+            raise ValueError(f"Override cycles {self.text} need {used} cycles, the read has {read_cycles}")
+
+        segments.append(("N", read_cycles - used))
+        return _join_segments(segments)
+
+    def __repr__(self):
+        return f"ReadPattern({self.text!r})"
+
+
+def _parse_segments(text: str, is_index: bool) -> tuple[tuple[str, int | None], ...]:
+    operations = INDEX_OPERATIONS if is_index else READ_OPERATIONS
+    placeholder = INDEX_PLACEHOLDER if is_index else READ_PLACEHOLDER
+    kind = "index" if is_index else "read"
+
+    segments = []
+    position = 0
+    for match in _SEGMENT.finditer(text):
+        if match.start() != position:
+            break
+        position = match.end()
+
+        operation, cycles = match.groups()
+        if operation not in operations:
+            raise ValueError(f"Invalid {kind} override cycles {text}: {operation} is not one of {', '.join(operations)}")
+
+        if cycles.startswith("{"):
+            if cycles != placeholder:
+                raise ValueError(f"Invalid {kind} override cycles {text}: use {placeholder}, not {cycles}")
+            segments.append((operation, None))
+        else:
+            segments.append((operation, int(cycles)))
+
+    if not text or position != len(text):
+        raise ValueError(f"Invalid {kind} override cycles '{text}'")
+
+    if sum(cycles is None for _, cycles in segments) > 1:
+        raise ValueError(f"Invalid {kind} override cycles {text}: {placeholder} can only be used once")
+
+    return tuple(segments)
+
+
+def _join_segments(segments) -> str:
+    """ Segments as text, without empty segments and with neighbours of one operation merged. """
+    merged = []
+    for operation, cycles in segments:
+        if not cycles:
+            continue
+        if merged and merged[-1][0] == operation:
+            merged[-1][1] += cycles
+        else:
+            merged.append([operation, cycles])
+
+    return "".join(f"{operation}{cycles}" for operation, cycles in merged)
+
+
+class OverrideCyclesPattern:
+    """ The compiled override cycles patterns of a kit, one per read in READ_NAMES order. """
+
+    __slots__ = ("reads",)
+
+    def __init__(self, read_1: str, index_1: str, index_2: str, read_2: str):
+        self.reads = (
+            ReadPattern(read_1 or DEFAULT_READ_PATTERN, False),
+            ReadPattern(index_1 or DEFAULT_INDEX_PATTERN, True),
+            ReadPattern(index_2 or DEFAULT_INDEX_PATTERN, True),
+            ReadPattern(read_2 or DEFAULT_READ_PATTERN, False),
+        )
+
+    @property
+    def text(self) -> str:
+        """ The patterns as written to the kit JSON, such as Y{r}-I{i}-I{i}-Y{r}. """
+        return "-".join(read.text for read in self.reads)
+
+    def sample_override_cycles(self, run_cycles: tuple[int, int, int, int],
+                               index_lengths: dict[str, np.ndarray]) -> np.ndarray:
+        """ OverrideCycles of every sample, such as Y151;I8N2;I8N2;Y151.
+
+        run_cycles holds the cycles of Read1, Index1, Index2 and Read2 of the
+        run, 0 for reads it does not have. index_lengths holds the IndexI7
+        and IndexI5 length of every sample, 0 where a sample has no index.
+        Each distinct combination of lengths is rendered once.
+        """
+        if len(run_cycles) != len(READ_NAMES) or any(cycles < 0 for cycles in run_cycles):
+            raise ValueError(f"Run cycles need a cycle count for each of {', '.join(READ_NAMES)}")
+
+        sample_count = len(next(iter(index_lengths.values()), ()))
+        lengths = np.stack([np.asarray(index_lengths.get(read, np.zeros(sample_count)), dtype=np.int64)
+                            for read in INDEX_READ_OF.values()], axis=1)
+
+        for column, (name, read) in enumerate(INDEX_READ_OF.items()):
+            if not run_cycles[READ_NAMES.index(name)] and lengths[:, column].any():
+                raise ValueError(f"Samples have {read} indexes but the run has no {name} cycles")
+
+        combinations, inverse = np.unique(lengths, axis=0, return_inverse=True)
+        rendered = np.array([self._render(run_cycles, combination) for combination in combinations.tolist()] or [""],
+                            dtype=object)
+
+        return rendered[inverse.reshape(-1)]
+
+    def _render(self, run_cycles, index_lengths: list[int]) -> str:
+        index_lengths = iter(index_lengths)
+        reads = []
+
+        for pattern, cycles in zip(self.reads, run_cycles):
+            if pattern.is_index:
+                length = next(index_lengths) or None
+                if cycles:
+                    reads.append(pattern.render(cycles, length))
+            elif cycles:
+                reads.append(pattern.render(cycles))
+
+        return ";".join(reads)
+
+    def __repr__(self):
+        return f"OverrideCyclesPattern({self.text!r})"
+
+
+@lru_cache(maxsize=64)
+def compile_override_cycles(read_1: str, index_1: str, index_2: str, read_2: str) -> OverrideCyclesPattern:
+    """ The validated pattern, parsed once per distinct set of read patterns. """
+    return OverrideCyclesPattern(read_1, index_1, index_2, read_2)
+
+
+def kit_override_cycles(kit: IndexKit) -> OverrideCyclesPattern:
+    return compile_override_cycles(kit.override_cycles_read_1, kit.override_cycles_index_1,
+                                   kit.override_cycles_index_2, kit.override_cycles_read_2)
+
+
+def parse_run_cycles(text: str) -> tuple[int, int, int, int]:
+    """ Run cycles from text such as 151,10,10,151, missing reads given as 0. """
+    try:
+        cycles = tuple(int(value) for value in text.split(","))
+    except ValueError:
+        cycles = ()
+
+    if len(cycles) != len(READ_NAMES) or any(value < 0 for value in cycles):
+        raise ValueError(f"Invalid run cycles '{text}', expected {','.join(READ_NAMES)} such as 151,10,10,151")
+
+    return cycles
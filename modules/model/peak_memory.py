@@ -0,0 +1,62 @@
+import importlib.util
+import tracemalloc
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+class PeakMemory:
+    """ Peak memory used by the work inside a with block, in bytes.
+
+    Python and numpy allocations are traced with tracemalloc. pyarrow
+    allocates outside of it, so its pool is sampled whenever sample() is
+    called, typically once per chunk.
+    """
+
+    def __init__(self):
+        self.python_bytes = 0
+        self.arrow_bytes = 0
+
+        self._started_tracing = False
+        self._python_baseline = 0
+        self._arrow_baseline = 0
+
+    @property
+    def peak_bytes(self) -> int:
+        return self.python_bytes + self.arrow_bytes
+
+    def __enter__(self) -> "PeakMemory":
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+        self._python_baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        self._arrow_baseline = self._arrow_allocated()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sample()
+        self.python_bytes = max(0, tracemalloc.get_traced_memory()[1] - self._python_baseline)
+
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def sample(self):
+        self.arrow_bytes = max(self.arrow_bytes, self._arrow_allocated() - self._arrow_baseline)
+
+    @staticmethod
+    def _arrow_allocated() -> int:
+        if not _HAS_PYARROW:
+            return 0
+
+        import pyarrow as pa
+        return pa.total_allocated_bytes()
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
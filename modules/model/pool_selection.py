@@ -0,0 +1,340 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.model.color_balance import ColorBalanceAnalyzer, ColorBalanceReport, DEFAULT_MAX_BASE_FRACTION, \
+    TWO_CHANNEL
+from modules.model.config_object import ConfigObject
+from modules.model.sequence_store import PackedSequences
+
+INDEX_READS = ("IndexI7", "IndexI5")
+
+DEFAULT_TIME_BUDGET = 2.0
+
+# Candidates scored per greedy step and per local search move on large kits,
+# a random sample is drawn when there are more
+MAX_MOVES_PER_STEP = 1024
+
+# Minimum distance of a pool with one index, above any real distance
+_NO_DISTANCE = np.iinfo(np.int32).max
+
+
+def pairwise_distances(sequences: list[str]) -> np.ndarray:
+    """ (n, n) Hamming distances. Shorter sequences are padded with A. """
+    packed = PackedSequences.from_strings(sequences)
+    first, second = np.triu_indices(len(packed), k=1)
+
+    distances = np.zeros((len(packed), len(packed)), dtype=np.int32)
+    distances[first, second] = packed.pair_mismatches(first, second)
+
+    return distances + distances.T
+
+
+class PoolCandidates:
+    """ The index pairs of a kit a pool can be drawn from.
+
+    Per read, sequences holds the usable sequences of its index set with
+    their table rows and wells. read_rows gives for every candidate the
+    position of its sequence in each read. Unique dual index sets pair
+    each row with itself, combinatorial sets pair every I7 with every I5.
+    """
+
+    __slots__ = ("sequences", "table_rows", "wells", "read_rows")
+
+    def __init__(self, sequences: dict[str, list[str]], table_rows: dict[str, np.ndarray],
+                 wells: dict[str, list[str] | None], read_rows: dict[str, np.ndarray]):
+        self.sequences = sequences
+        self.table_rows = table_rows
+        self.wells = wells
+        self.read_rows = read_rows
+
+    @property
+    def reads(self) -> list[str]:
+        return list(self.sequences)
+
+    @property
+    def size(self) -> int:
+        return len(next(iter(self.read_rows.values())))
+
+    def candidate_sequences(self, read: str) -> list[str]:
+        sequences = self.sequences[read]
+        return [sequences[i] for i in self.read_rows[read]]
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip()
+
+
+def pool_candidates(df: pd.DataFrame, config: ConfigObject, wells=None) -> PoolCandidates:
+    """ Candidates from the index sets of config, limited to the given wells if any. """
+    set_of_read = {}
+    for set_name, fields in config.index_sets.items():
+        for read in INDEX_READS:
+            if read in fields:
+                set_of_read[read] = set_name
+
+    if "IndexI7" not in set_of_read:
+        raise ValueError(f"Config {config.config_type_name} has no IndexI7 field")
+
+    if wells is not None and not config.well:
+        raise ValueError(f"Config {config.config_type_name} has no wells to select from")
+
+    allowed_wells = None if wells is None else {str(well).strip() for well in wells}
+    keep = {}
+    well_columns = {}
+
+    for read, set_name in set_of_read.items():
+        if read not in df.columns:
+            raise ValueError(f"No {read} column in the index table")
+
+        keep[read] = _text(df[read]).ne("").to_numpy()
+
+        if config.well:
+            well_column = next((field for field in config.index_sets[set_name] if field.startswith("Well")), None)
+            if well_column is None or well_column not in df.columns:
+                raise ValueError(f"No well column for {set_name} in the index table")
+
+            well_columns[read] = well_column
+            if allowed_wells is not None:
+                keep[read] = keep[read] & _text(df[well_column]).isin(allowed_wells).to_numpy()
+
+    paired = len(set_of_read) == 2 and set_of_read["IndexI7"] == set_of_read["IndexI5"]
+    if paired:
+        both = keep["IndexI7"] & keep["IndexI5"]
+        keep = {read: both for read in keep}
+
+    sequences = {}
+    table_rows = {}
+    read_wells = {}
+    for read, mask in keep.items():
+        rows = np.flatnonzero(mask)
+        table_rows[read] = rows
+        sequences[read] = _text(df[read]).iloc[rows].tolist()
+        read_wells[read] = _text(df[well_columns[read]]).iloc[rows].tolist() if read in well_columns else None
+
+    counts = {read: len(rows) for read, rows in table_rows.items()}
+    if not all(counts.values()):
+        raise ValueError("No index sequences to select from")
+
+    if paired or len(counts) == 1:
+        read_rows = {read: np.arange(count) for read, count in counts.items()}
+    else:
+        # Combinatorial dual indexes, every I7 with every I5
+        read_rows = {
+            "IndexI7": np.repeat(np.arange(counts["IndexI7"]), counts["IndexI5"]),
+            "IndexI5": np.tile(np.arange(counts["IndexI5"]), counts["IndexI7"]),
+        }
+
+    return PoolCandidates(sequences, table_rows, read_wells, read_rows)
+
+
+class PoolSelection:
+    """ The best pool found, with its minimum pairwise Hamming distance and colour balance. """
+
+    __slots__ = ("rows", "wells", "sequences", "min_distance", "balance", "evaluated", "seconds")
+
+    def __init__(self, rows: dict[str, list[int]], wells: dict[str, list[str] | None],
+                 sequences: dict[str, list[str]], min_distance: int | None, balance: ColorBalanceReport,
+                 evaluated: int, seconds: float):
+        self.rows = rows
+        self.wells = wells
+        self.sequences = sequences
+        self.min_distance = min_distance
+        self.balance = balance
+        self.evaluated = evaluated
+        self.seconds = seconds
+
+    @property
+    def size(self) -> int:
+        return len(next(iter(self.sequences.values())))
+
+    def describe(self) -> str:
+        distance = "-" if self.min_distance is None else self.min_distance
+        balance = "balanced" if self.balance.ok else f"{len(self.balance.issues)} colour balance issues"
+        return (f"{self.size} indexes, min Hamming distance {distance}, {balance}, "
+                f"weakest channel {self.balance.score:.0%} ({self.evaluated} pools scored in {self.seconds:.1f}s)")
+
+    def to_dict(self) -> dict:
+        samples = []
+        for i in range(self.size):
+            sample = {}
+            for read, sequences in self.sequences.items():
+                sample[read] = sequences[i]
+                sample[f"{read}Row"] = self.rows[read][i] + 1
+                if self.wells[read] is not None:
+                    sample[f"{read}Well"] = self.wells[read][i]
+            samples.append(sample)
+
+        return {
+            "Samples": samples,
+            "MinHammingDistance": self.min_distance,
+            "ColorBalance": self.balance.to_dict(),
+        }
+
+
+class _PoolSearch:
+    """ Greedy seeding and local search over one pool selection problem, run in each worker. """
+
+    def __init__(self, candidates: PoolCandidates, sample_count: int, chemistry: str, max_base_fraction: float):
+        self._candidates = candidates
+        self._sample_count = sample_count
+        self._size = candidates.size
+
+        self._read_rows = [candidates.read_rows[read] for read in candidates.reads]
+        self._distances = [pairwise_distances(candidates.sequences[read]) for read in candidates.reads]
+
+        self._analyzer = ColorBalanceAnalyzer({read: candidates.candidate_sequences(read) for read in candidates.reads},
+                                              chemistry, max_base_fraction)
+        self._counts = self._analyzer.candidate_counts
+
+    def _distance(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """ (len(first), len(second)) Hamming distances between candidates, summed over reads. """
+        total = np.zeros((len(first), len(second)), dtype=np.int32)
+        for rows, distances in zip(self._read_rows, self._distances):
+            total += distances[rows[first][:, None], rows[second][None, :]]
+        return total
+
+    def _internal_distance(self, pool: np.ndarray) -> int:
+        if len(pool) < 2:
+            return _NO_DISTANCE
+        distances = self._distance(pool, pool)
+        np.fill_diagonal(distances, _NO_DISTANCE)
+        return int(distances.min())
+
+    def objective(self, pool: np.ndarray) -> tuple:
+        """ (-flagged cycles, min distance, weakest channel share), larger is better. """
+        scores, flagged = self._analyzer.score_counts(self._counts[pool].sum(axis=0))
+        return -int(flagged[0]), self._internal_distance(pool), float(scores[0])
+
+    def _sample(self, rng: np.random.Generator) -> np.ndarray:
+        if self._size <= MAX_MOVES_PER_STEP:
+            return rng.permutation(self._size)
+        return rng.choice(self._size, MAX_MOVES_PER_STEP, replace=False)
+
+    def _best_addition(self, members: np.ndarray, candidates: np.ndarray, internal: int) -> tuple[int, tuple]:
+        """ The candidate that gives the best pool when added to members. """
+        scores, flagged = self._analyzer.score_counts(self._counts[members].sum(axis=0) + self._counts[candidates])
+
+        if len(members):
+            min_distance = np.minimum(self._distance(candidates, members).min(axis=1), internal)
+        else:
+            min_distance = np.full(len(candidates), internal)
+        min_distance[np.isin(candidates, members)] = -1
+
+        best = np.lexsort((scores, min_distance, -flagged))[-1]
+        return int(candidates[best]), (-int(flagged[best]), int(min_distance[best]), float(scores[best]))
+
+    def greedy(self, rng: np.random.Generator, deadline: float) -> np.ndarray:
+        """ Add the best sampled candidate one at a time, filling the pool at random once deadline has passed. """
+        pool = np.array([rng.integers(self._size)], dtype=np.intp)
+
+        while len(pool) < self._sample_count:
+            if time.time() >= deadline:
+                outside = np.setdiff1d(np.arange(self._size), pool)
+                return np.append(pool, rng.choice(outside, self._sample_count - len(pool), replace=False))
+
+            candidate, _ = self._best_addition(pool, self._sample(rng), self._internal_distance(pool))
+            pool = np.append(pool, candidate)
+
+        return pool
+
+    def search(self, seed: int, deadline: float) -> tuple[np.ndarray, tuple, int]:
+        """ Improve a greedy pool by single swaps until deadline, kicking it out of local optima. """
+        rng = np.random.default_rng(seed)
+
+        pool = self.greedy(rng, deadline)
+        current = self.objective(pool)
+        best_pool, best = pool.copy(), current
+        evaluated = 0
+        stale = 0
+
+        if self._size == self._sample_count:
+            return best_pool, best, evaluated
+
+        while time.time() < deadline:
+            position = rng.integers(len(pool))
+            rest = np.delete(pool, position)
+
+            candidates = self._sample(rng)
+            candidate, objective = self._best_addition(rest, candidates, self._internal_distance(rest))
+            evaluated += len(candidates)
+
+            if objective > current:
+                pool[position] = candidate
+                current = objective
+                stale = 0
+
+                if current > best:
+                    best_pool, best = pool.copy(), current
+                continue
+
+            stale += 1
+            if stale > 2 * len(pool):
+                # Local optimum, replace a quarter of the pool at random, at most as many as are left outside
+                outside = np.setdiff1d(np.arange(self._size), pool)
+                kicked = rng.choice(len(pool), min(max(1, len(pool) // 4), len(outside)), replace=False)
+                pool[kicked] = rng.choice(outside, len(kicked), replace=False)
+                current = self.objective(pool)
+                stale = 0
+
+        return best_pool, best, evaluated
+
+    def report(self, pool: np.ndarray) -> ColorBalanceReport:
+        return self._analyzer.analyse(pool)
+
+
+def _search_worker(candidates: PoolCandidates, sample_count: int, chemistry: str, max_base_fraction: float,
+                   seed: int, deadline: float):
+    search = _PoolSearch(candidates, sample_count, chemistry, max_base_fraction)
+    pool, objective, evaluated = search.search(seed, deadline)
+    return pool, objective, evaluated, search.report(pool)
+
+
+def select_index_pool(df: pd.DataFrame, config: ConfigObject, sample_count: int,
+                      time_budget: float = DEFAULT_TIME_BUDGET, workers: int | None = None,
+                      chemistry: str = TWO_CHANNEL, wells=None, seed: int = 0,
+                      max_base_fraction: float = DEFAULT_MAX_BASE_FRACTION) -> PoolSelection:
+    """ Pick sample_count index pairs from the index sets of config.
+
+    Pools without colour balance issues come first, then the larger
+    minimum pairwise Hamming distance, then the stronger weakest channel.
+    Each worker process seeds a pool greedily and improves it by local
+    search until time_budget seconds have passed, and the best pool of all
+    workers is returned. With wells, only indexes in those wells are used.
+    """
+    start = time.perf_counter()
+    candidates = pool_candidates(df, config, wells)
+
+    if not 1 <= sample_count <= candidates.size:
+        raise ValueError(f"Cannot select {sample_count} indexes from {candidates.size} candidates")
+
+    deadline = time.time() + time_budget
+    workers = workers or os.cpu_count() or 1
+    args = (candidates, sample_count, chemistry, max_base_fraction)
+
+    if workers == 1:
+        results = [_search_worker(*args, seed, deadline)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_search_worker, *args, seed + i, deadline) for i in range(workers)]
+            results = [future.result() for future in futures]
+
+    pool, objective, _, balance = max(results, key=lambda result: result[1])
+
+    rows = {}
+    wells_by_read = {}
+    sequences = {}
+    for read in candidates.reads:
+        positions = candidates.read_rows[read][pool]
+        rows[read] = candidates.table_rows[read][positions].tolist()
+        sequences[read] = [candidates.sequences[read][i] for i in positions]
+        read_wells = candidates.wells[read]
+        wells_by_read[read] = None if read_wells is None else [read_wells[i] for i in positions]
+
+    min_distance = None if objective[1] == _NO_DISTANCE else objective[1]
+
+    return PoolSelection(rows, wells_by_read, sequences, min_distance, balance,
+                         sum(result[2] for result in results), time.perf_counter() - start)
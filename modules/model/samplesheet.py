@@ -0,0 +1,485 @@
+import csv
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.model.batch_convert import SOURCE_FORMATS
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit, load_index_kit, map_index_columns
+from modules.model.index_set_processing import mismatch_neighbourhood_keys, neighbourhood_pairs
+from modules.model.override_cycles import READ_NAMES, kit_override_cycles
+from modules.model.pool_selection import INDEX_READS, pool_candidates
+from modules.model.sequence_store import PackedSequences
+
+# Kits are read from index files and from the JSON written by export_index_kit
+KIT_FORMATS = {**SOURCE_FORMATS, ".json": "json"}
+
+SAMPLE_ID = "Sample_ID"
+LANE = "Lane"
+
+# Manifest columns copied to [BCLConvert_Data] as they are
+PASS_THROUGH_COLUMNS = ("Sample_Project",)
+
+# Data columns of each index read in [BCLConvert_Data]
+DATA_INDEX_COLUMNS = {"IndexI7": "Index", "IndexI5": "Index2"}
+OVERRIDE_CYCLES = "OverrideCycles"
+
+DEFAULT_BARCODE_MISMATCHES = 1
+MAX_BARCODE_MISMATCHES = 2
+
+# BCL Convert accepts letters, digits, dashes and underscores, up to 100 characters
+SAMPLE_ID_PATTERN = r"[A-Za-z0-9_-]{1,100}"
+
+LANE_SEPARATORS = r"[+;\s]+"
+
+
+def read_manifest(filepath: Path) -> pd.DataFrame:
+    """ A CSV sample manifest as a table of strings, blanks as empty strings. """
+    manifest = pd.read_csv(filepath, dtype="str", keep_default_na=False)
+    manifest.columns = [str(column).strip() for column in manifest.columns]
+    return manifest
+
+
+def load_kit(filepath: Path, column_map: dict[str, str] | None = None, sheet_name: str | None = None) -> IndexKit:
+    """ An index kit from an index file or an exported kit JSON. """
+    filepath = Path(filepath)
+    source_format = KIT_FORMATS.get(filepath.suffix.lower())
+    if source_format is None:
+        raise ValueError(f"Unknown index kit file type: {filepath.name}")
+
+    kit = load_index_kit(filepath, source_format, sheet_name=sheet_name if source_format == "xlsx" else None)
+    if column_map:
+        kit = map_index_columns(kit, column_map)
+    return kit
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip()
+
+
+def kit_index_table(df: pd.DataFrame, config: ConfigObject) -> pd.DataFrame:
+    """ One row per index pair a sample can be given, with the kit fields naming it.
+
+    Unique dual sets give one row per kit row, combinatorial sets one row
+    per I7 and I5 combination.
+    """
+    candidates = pool_candidates(df, config)
+    table = {}
+
+    for fields in config.index_sets.values():
+        read = next(read for read in candidates.reads if read in fields)
+        rows = candidates.table_rows[read][candidates.read_rows[read]]
+
+        for field in fields:
+            if field in df.columns and field not in table:
+                table[field] = _text(df[field]).to_numpy()[rows]
+
+    return pd.DataFrame(table)
+
+
+def _mismatches(count: int) -> str:
+    return f"{count} mismatch" if count == 1 else f"{count} mismatches"
+
+
+class LaneCheck:
+    """ Index collisions between the samples of one lane at the mismatch tolerance of the sheet.
+
+    Two samples collide when a read within barcode_mismatches of both
+    their indexes exists, on every index read. max_mismatches is the
+    largest tolerance up to barcode_mismatches without collisions, -1 if
+    two samples have identical indexes.
+    """
+
+    __slots__ = ("lane", "sample_ids", "pairs", "distances", "barcode_mismatches", "max_mismatches",
+                 "index_lengths")
+
+    def __init__(self, lane: int | None, sample_ids: list[str], pairs: np.ndarray, distances: np.ndarray,
+                 barcode_mismatches: int, max_mismatches: int, index_lengths: dict[str, tuple[int, ...]]):
+        self.lane = lane
+        self.sample_ids = sample_ids
+        self.pairs = pairs
+        self.distances = distances
+        self.barcode_mismatches = barcode_mismatches
+        self.max_mismatches = max_mismatches
+        self.index_lengths = index_lengths
+
+    @property
+    def ok(self) -> bool:
+        return not len(self.pairs)
+
+    @property
+    def mixed_lengths(self) -> list[str]:
+        """ Index reads with indexes of different lengths, compared over the shortest. """
+        return [read for read, lengths in self.index_lengths.items() if len(lengths) > 1]
+
+    def describe(self) -> str:
+        name = "All lanes" if self.lane is None else f"Lane {self.lane}"
+        text = f"{name}: {len(self.sample_ids)} samples"
+
+        if self.ok:
+            text += f", no index collisions at {_mismatches(self.barcode_mismatches)}"
+        else:
+            first, second = self.pairs[int(self.distances.sum(axis=1).argmin())]
+            text += (f", {len(self.pairs)} index collisions at {_mismatches(self.barcode_mismatches)} "
+                     f"({self.sample_ids[first]} / {self.sample_ids[second]})")
+            if self.max_mismatches < 0:
+                text += ", identical indexes cannot be demultiplexed"
+            else:
+                text += f", allow at most {_mismatches(self.max_mismatches)}"
+
+        if self.mixed_lengths:
+            text += f", mixed lengths in {', '.join(self.mixed_lengths)}"
+
+        return text
+
+    def to_dict(self) -> dict:
+        return {
+            "Lane": self.lane,
+            "Samples": len(self.sample_ids),
+            "BarcodeMismatches": self.barcode_mismatches,
+            "MaxBarcodeMismatches": self.max_mismatches,
+            "IndexLengths": {read: list(lengths) for read, lengths in self.index_lengths.items()},
+            "Collisions": [{"Sample1": self.sample_ids[first], "Sample2": self.sample_ids[second],
+                            "Mismatches": [int(d) for d in distances]}
+                           for (first, second), distances in zip(self.pairs.tolist(), self.distances)],
+        }
+
+
+def _sequence_groups(packed: PackedSequences) -> tuple[np.ndarray, np.ndarray]:
+    """ Row of one sample per distinct sequence, and the distinct sequence of every sample. """
+    _, first_rows, inverse = np.unique(packed.hashes(), return_index=True, return_inverse=True)
+    return first_rows, inverse.reshape(-1)
+
+
+def _group_pairs(inverse: np.ndarray, group_pairs: np.ndarray) -> np.ndarray:
+    """ (i, j), i < j, of all samples with equal sequences or sequences forming one of group_pairs. """
+    order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse)
+    starts = np.cumsum(counts) - counts
+
+    groups = np.arange(len(counts))
+    group_pairs = np.concatenate([np.stack([groups, groups], axis=1), group_pairs])
+    first_groups, second_groups = group_pairs[:, 0], group_pairs[:, 1]
+
+    # Every sample of the first group with every sample of the second
+    sizes = counts[first_groups] * counts[second_groups]
+    pair_ids = np.repeat(np.arange(len(group_pairs)), sizes)
+    offsets = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    second_counts = counts[second_groups][pair_ids]
+    first_offsets, second_offsets = offsets // second_counts, offsets % second_counts
+
+    # Within one group each pair once, and no sample with itself
+    keep = (first_groups != second_groups)[pair_ids] | (first_offsets < second_offsets)
+
+    first = order[starts[first_groups][pair_ids] + first_offsets][keep]
+    second = order[starts[second_groups][pair_ids] + second_offsets][keep]
+    return np.sort(np.stack([first, second], axis=1), axis=1)
+
+
+def _candidate_pairs(packed: list[PackedSequences], barcode_mismatches: int) -> np.ndarray:
+    """ Sample pairs whose indexes are within 2 * barcode_mismatches on at least one read.
+
+    The neighbourhood index is built over the distinct sequences of each
+    read, pools often repeat an index across many samples. The read giving
+    the fewest sample pairs is used, the others are compared afterwards.
+    """
+    best = None
+
+    for read_packed in packed:
+        first_rows, inverse = _sequence_groups(read_packed)
+        group_pairs = neighbourhood_pairs(*mismatch_neighbourhood_keys(read_packed[first_rows], barcode_mismatches))
+
+        counts = np.bincount(inverse)
+        pair_count = int((counts * (counts - 1) // 2).sum()
+                         + (counts[group_pairs[:, 0]] * counts[group_pairs[:, 1]]).sum())
+        if best is None or pair_count < best[0]:
+            best = (pair_count, inverse, group_pairs)
+
+    _, inverse, group_pairs = best
+    return _group_pairs(inverse, group_pairs)
+
+
+def check_lane(lane: int | None, sample_ids: list[str], sequences: dict[str, list[str]],
+               barcode_mismatches: int) -> LaneCheck:
+    """ Collisions between the samples of a lane, sequences holding the indexes of each read.
+
+    Candidate pairs come from a hashed neighbourhood index of the first
+    read, every index with all its variants within barcode_mismatches
+    substitutions. Only pairs whose neighbourhoods overlap are compared on
+    the other reads. Indexes of different lengths are compared over the
+    shortest of the lane.
+    """
+    packed = {}
+    index_lengths = {}
+
+    for read, read_sequences in sequences.items():
+        read_packed = PackedSequences.from_strings(read_sequences)
+        lengths = tuple(np.unique(read_packed.lengths).tolist())
+        index_lengths[read] = lengths
+
+        if len(lengths) > 1:
+            shortest = lengths[0]
+            read_packed = PackedSequences.from_codes(read_packed.codes()[:, :shortest],
+                                                     np.full(len(read_packed), shortest))
+        packed[read] = read_packed
+
+    pairs = _candidate_pairs(list(packed.values()), barcode_mismatches)
+
+    distances = np.stack([read_packed.pair_mismatches(pairs[:, 0], pairs[:, 1]) for read_packed in packed.values()],
+                         axis=1).reshape(len(pairs), len(packed))
+    colliding = (distances <= 2 * barcode_mismatches).all(axis=1)
+    pairs, distances = pairs[colliding], distances[colliding]
+
+    # A pair stops colliding once any read is further apart than twice the tolerance
+    max_mismatches = barcode_mismatches
+    if len(pairs):
+        max_mismatches = int(((distances + 1) // 2).max(axis=1).min()) - 1
+
+    return LaneCheck(lane, sample_ids, pairs, distances, barcode_mismatches, max_mismatches, index_lengths)
+
+
+def sheet_settings(kit: IndexKit, index_read_count: int, barcode_mismatches: int) -> dict[str, str]:
+    """ [BCLConvert_Settings] of a kit, its adapters and the mismatches allowed per index read. """
+    settings = {}
+    if kit.adapter_read_1:
+        settings["AdapterRead1"] = kit.adapter_read_1
+    if kit.adapter_read_2:
+        settings["AdapterRead2"] = kit.adapter_read_2
+    for number in range(1, index_read_count + 1):
+        settings[f"BarcodeMismatchesIndex{number}"] = str(barcode_mismatches)
+
+    return settings
+
+
+def write_sheet_sections(writer, reads: dict[str, int], settings: dict[str, str], data_columns):
+    """ Everything up to the data rows of a sample sheet v2, ending with the [BCLConvert_Data] header. """
+    writer.writerows([["[Header]"], ["FileFormatVersion", "2"], []])
+
+    if reads:
+        writer.writerow(["[Reads]"])
+        writer.writerows(reads.items())
+        writer.writerow([])
+
+    writer.writerow(["[BCLConvert_Settings]"])
+    writer.writerows(settings.items())
+    writer.writerow([])
+
+    writer.writerow(["[BCLConvert_Data]"])
+    writer.writerow(data_columns)
+
+
+class SampleSheet:
+    """ A compiled BCL Convert sample sheet, with the collision check of every lane. """
+
+    __slots__ = ("data", "reads", "settings", "lane_checks", "seconds")
+
+    def __init__(self, data: pd.DataFrame, reads: dict[str, int], settings: dict[str, str],
+                 lane_checks: list[LaneCheck], seconds: float):
+        self.data = data
+        # Cycles per read of the run, empty when the run is not known
+        self.reads = reads
+        self.settings = settings
+        self.lane_checks = lane_checks
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return all(check.ok for check in self.lane_checks)
+
+    @property
+    def collision_count(self) -> int:
+        return sum(len(check.pairs) for check in self.lane_checks)
+
+    def describe(self) -> str:
+        lanes = len(self.lane_checks)
+        status = "no index collisions" if self.ok else f"{self.collision_count} index collisions"
+        return (f"{len(self.data)} samples in {lanes} lane{'s' if lanes != 1 else ''}, {status} "
+                f"(compiled in {self.seconds:.3f}s)")
+
+    def to_csv(self) -> str:
+        """ The sheet in sample sheet v2 format. """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+
+        write_sheet_sections(writer, self.reads, self.settings, self.data.columns)
+        writer.writerows(self.data.itertuples(index=False))
+
+        return buffer.getvalue()
+
+    def write(self, filepath: Path):
+        Path(filepath).write_text(self.to_csv())
+
+
+def _manifest_lanes(manifest: pd.DataFrame) -> pd.DataFrame:
+    """ (row, lane) for every lane of every manifest row, lane 0 when the manifest has no lanes. """
+    if LANE not in manifest.columns:
+        return pd.DataFrame({"row": np.arange(len(manifest)), "lane": 0})
+
+    lanes = _text(manifest[LANE]).str.split(LANE_SEPARATORS, regex=True)
+    entries = pd.DataFrame({"row": np.arange(len(manifest)), "lane": lanes}).explode("lane")
+    entries = entries[entries["lane"].ne("")].reset_index(drop=True)
+
+    numbers = pd.to_numeric(entries["lane"], errors="coerce")
+    bad = numbers.isna() | (numbers < 1) | (numbers % 1 != 0)
+    if bad.any():
+        row = int(entries["row"][bad].iloc[0])
+        raise ValueError(f"Sample {manifest[SAMPLE_ID].iloc[row]}: invalid lane '{entries['lane'][bad].iloc[0]}'")
+
+    missing = np.setdiff1d(np.arange(len(manifest)), entries["row"].to_numpy(dtype=np.int64))
+    if len(missing):
+        raise ValueError(f"Sample {manifest[SAMPLE_ID].iloc[missing[0]]}: no lane")
+
+    entries = entries.assign(lane=numbers.astype(np.int64))
+    return entries.astype({"row": np.int64}).drop_duplicates().reset_index(drop=True)
+
+
+def _explicit_assignments(manifest: pd.DataFrame, table: pd.DataFrame) -> np.ndarray:
+    """ Candidate per manifest row named by kit fields such as WellDual or IndexI7Name, -1 if none are given. """
+    assignments = np.full(len(manifest), -1, dtype=np.int64)
+
+    keys = [column for column in table.columns if column in manifest.columns and column not in INDEX_READS]
+    if not keys:
+        return assignments
+
+    given = manifest[keys].apply(_text)
+    filled = given.ne("")
+    complete = filled.all(axis=1).to_numpy()
+    partial = filled.any(axis=1).to_numpy() & ~complete
+
+    if partial.any():
+        sample = manifest[SAMPLE_ID].iloc[np.flatnonzero(partial)[0]]
+        raise ValueError(f"Sample {sample}: give all of {', '.join(keys)} or none of them")
+
+    lookup = table[keys].assign(candidate=np.arange(len(table))).drop_duplicates(keys)
+    matched = given[complete].merge(lookup, how="left", on=keys)["candidate"]
+
+    if matched.isna().any():
+        position = int(np.flatnonzero(matched.isna().to_numpy())[0])
+        row = np.flatnonzero(complete)[position]
+        values = ", ".join(f"{key}={given[key].iloc[row]}" for key in keys)
+        raise ValueError(f"Sample {manifest[SAMPLE_ID].iloc[row]}: no index with {values} in the kit")
+
+    assignments[complete] = matched.to_numpy(dtype=np.int64)
+    return assignments
+
+
+def _assign_free_indexes(assignments: np.ndarray, entries: pd.DataFrame, candidate_count: int) -> np.ndarray:
+    """ Give rows without an index the first kit indexes not yet used in any of their lanes. """
+    assignments = assignments.copy()
+    used = {}
+
+    assigned = entries[assignments[entries["row"]] >= 0]
+    for lane, rows in assigned.groupby("lane")["row"]:
+        used[lane] = np.zeros(candidate_count, dtype=bool)
+        used[lane][assignments[rows.to_numpy()]] = True
+
+    free_rows = entries[assignments[entries["row"]] < 0]
+    lane_sets = free_rows.groupby("row", sort=False)["lane"].agg(tuple)
+
+    for lanes, rows in lane_sets.groupby(lane_sets, sort=False):
+        taken = np.zeros(candidate_count, dtype=bool)
+        for lane in lanes:
+            taken |= used.setdefault(lane, np.zeros(candidate_count, dtype=bool))
+
+        free = np.flatnonzero(~taken)
+        if len(free) < len(rows):
+            names = "all lanes" if lanes == (0,) else f"lane {'+'.join(map(str, lanes))}"
+            raise ValueError(f"Not enough indexes in the kit for {names}: {len(rows)} samples, {len(free)} free")
+
+        chosen = free[:len(rows)]
+        assignments[rows.index.to_numpy()] = chosen
+        for lane in lanes:
+            used[lane][chosen] = True
+
+    return assignments
+
+
+def compile_sample_sheet(kit: IndexKit, config: ConfigObject, manifest: pd.DataFrame,
+                         barcode_mismatches: int = DEFAULT_BARCODE_MISMATCHES,
+                         i5_reverse_complement: bool = False,
+                         run_cycles: tuple[int, int, int, int] | None = None) -> SampleSheet:
+    """ Assign kit indexes to the samples of manifest and check every lane for collisions.
+
+    The manifest needs a Sample_ID column. An optional Lane column puts a
+    sample in one or more lanes, such as 1 or 1+2. Samples are given the
+    index named by the kit fields in the manifest, such as WellDual or
+    IndexI7Name and IndexI5Name, and otherwise the first kit index not yet
+    used in their lanes. With i5_reverse_complement, Index2 is written as
+    the reverse complement of the kit I5 sequence.
+
+    With run_cycles, the cycles of Read1, Index1, Index2 and Read2, the
+    sheet gets a [Reads] section and the OverrideCycles of every sample
+    from the kit patterns, masking the cycles shorter indexes do not use.
+    """
+    start = time.perf_counter()
+
+    # Checked before any sample is assigned
+    override_cycles = kit_override_cycles(kit) if run_cycles is not None else None
+
+    if not 0 <= barcode_mismatches <= MAX_BARCODE_MISMATCHES:
+        raise ValueError(f"Barcode mismatches must be between 0 and {MAX_BARCODE_MISMATCHES}")
+
+    if SAMPLE_ID not in manifest.columns:
+        raise ValueError(f"The manifest has no {SAMPLE_ID} column")
+
+    sample_ids = _text(manifest[SAMPLE_ID])
+    invalid = ~sample_ids.str.fullmatch(SAMPLE_ID_PATTERN)
+    if invalid.any():
+        raise ValueError(f"Invalid {SAMPLE_ID} '{sample_ids[invalid].iloc[0]}', "
+                         f"use letters, digits, dashes and underscores")
+
+    manifest = manifest.assign(**{SAMPLE_ID: sample_ids}).reset_index(drop=True)
+    entries = _manifest_lanes(manifest)
+
+    duplicated = entries.assign(sample=sample_ids.to_numpy()[entries["row"]]).duplicated(["lane", "sample"])
+    if duplicated.any():
+        entry = entries[duplicated].iloc[0]
+        raise ValueError(f"Sample {sample_ids.iloc[entry['row']]} is listed twice in lane {entry['lane']}")
+
+    table = kit_index_table(kit.index_df, config)
+    assignments = _assign_free_indexes(_explicit_assignments(manifest, table), entries, len(table))
+
+    reads = [read for read in INDEX_READS if read in table.columns]
+    sequences = {read: table[read].to_numpy()[assignments] for read in reads}
+    if i5_reverse_complement and "IndexI5" in sequences:
+        sequences["IndexI5"] = np.array(PackedSequences.from_strings(sequences["IndexI5"])
+                                        .reverse_complement().to_strings(), dtype=object)
+
+    has_lanes = LANE in manifest.columns
+    entry_rows = entries["row"].to_numpy()
+
+    data = {}
+    if has_lanes:
+        data[LANE] = entries["lane"].to_numpy()
+    data[SAMPLE_ID] = sample_ids.to_numpy()[entry_rows]
+    for read in reads:
+        data[DATA_INDEX_COLUMNS[read]] = sequences[read][entry_rows]
+    if override_cycles is not None:
+        index_lengths = {read: pd.Series(sequences[read][entry_rows], dtype="str").str.len().to_numpy()
+                         for read in reads}
+        data[OVERRIDE_CYCLES] = override_cycles.sample_override_cycles(run_cycles, index_lengths)
+    for column in PASS_THROUGH_COLUMNS:
+        if column in manifest.columns:
+            data[column] = _text(manifest[column]).to_numpy()[entry_rows]
+
+    data = pd.DataFrame(data)
+    if has_lanes:
+        data = data.sort_values(LANE, kind="stable").reset_index(drop=True)
+
+    lane_checks = []
+    for lane, lane_rows in entries.groupby("lane")["row"]:
+        lane_rows = lane_rows.to_numpy()
+        lane_checks.append(check_lane(int(lane) if has_lanes else None, sample_ids.to_numpy()[lane_rows].tolist(),
+                                      {read: sequences[read][lane_rows].tolist() for read in reads},
+                                      barcode_mismatches))
+
+    settings = sheet_settings(kit, len(reads), barcode_mismatches)
+    run_reads = {}
+    if run_cycles is not None:
+        run_reads = {f"{name}Cycles": cycles for name, cycles in zip(READ_NAMES, run_cycles) if cycles}
+
+    return SampleSheet(data, run_reads, settings, lane_checks, time.perf_counter() - start)
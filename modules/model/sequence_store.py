@@ -0,0 +1,158 @@
+from typing import Iterable
+
+import numpy as np
+
+BASES = "ACGT"
+BASES_PER_WORD = 32
+
+# ASCII -> 2-bit code, 255 marks anything that is not a base
+_ENCODE = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    _ENCODE[ord(_base)] = _code
+    _ENCODE[ord(_base.lower())] = _code
+
+_DECODE = np.frombuffer(BASES.encode(), dtype=np.uint8)
+
+# First base in the most significant bits, so word order is sequence order
+_SHIFTS = (2 * np.arange(BASES_PER_WORD - 1, -1, -1)).astype(np.uint64)
+
+# Low bit of every 2-bit base slot
+_BASE_LOW_BITS = np.uint64(0x5555555555555555)
+
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1)
+
+
+def _splitmix64(z: np.ndarray) -> np.ndarray:
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class PackedSequences:
+    """ Index sequences packed two bits per base into uint64 words.
+
+    Row i holds sequence i, padded with A (code 0) beyond lengths[i]. A 10 bp
+    index takes one word instead of a Python str object, and all operations
+    work on whole arrays. Strings are only rebuilt by to_strings().
+    """
+
+    __slots__ = ("_words", "_lengths")
+
+    def __init__(self, words: np.ndarray, lengths: np.ndarray):
+        self._words = np.ascontiguousarray(words, dtype=np.uint64).reshape(len(lengths), -1)
+        self._lengths = np.asarray(lengths, dtype=np.int32)
+
+    @classmethod
+    def from_strings(cls, sequences: Iterable[str]) -> "PackedSequences":
+        sequences = [str(seq).strip() for seq in sequences]
+        if not sequences:
+            return cls(np.zeros((0, 1), dtype=np.uint64), np.zeros(0, dtype=np.int32))
+
+        raw = np.array([seq.encode("ascii", "replace") for seq in sequences])
+        lengths = np.fromiter((len(seq) for seq in sequences), dtype=np.int32, count=len(sequences))
+
+        width = max(int(lengths.max()), 1)
+        raw = raw.astype(f"S{width}").view(np.uint8).reshape(len(sequences), width)
+
+        codes = _ENCODE[raw]
+        in_sequence = np.arange(width) < lengths[:, None]
+
+        invalid = (codes == 255) & in_sequence
+        if invalid.any():
+            row = int(np.flatnonzero(invalid.any(axis=1))[0])
+            raise ValueError(f"Invalid base in index sequence {sequences[row]!r}")
+
+        codes[~in_sequence] = 0
+
+        return cls.from_codes(codes, lengths)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, lengths: np.ndarray) -> "PackedSequences":
+        """ Pack an (n, width) matrix of 2-bit codes, padding must be 0. """
+        n, width = codes.shape
+        word_count = max(-(-width // BASES_PER_WORD), 1)
+
+        padded = np.zeros((n, word_count * BASES_PER_WORD), dtype=np.uint64)
+        padded[:, :width] = codes
+
+        words = (padded.reshape(n, word_count, BASES_PER_WORD) << _SHIFTS).sum(axis=2, dtype=np.uint64)
+
+        return cls(words, lengths)
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __getitem__(self, item) -> "PackedSequences":
+        return PackedSequences(self._words[item], self._lengths[item])
+
+    @property
+    def words(self) -> np.ndarray:
+        return self._words
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self._lengths
+
+    @property
+    def max_length(self) -> int:
+        return int(self._lengths.max()) if len(self._lengths) else 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._words.nbytes + self._lengths.nbytes
+
+    def codes(self) -> np.ndarray:
+        """ Unpack to an (n, max_length) uint8 matrix of codes 0-3. """
+        n = len(self)
+        unpacked = (self._words[:, :, None] >> _SHIFTS) & np.uint64(3)
+        return unpacked.reshape(n, -1)[:, :self.max_length].astype(np.uint8)
+
+    def pair_mismatches(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """ Mismatching bases between rows first[k] and second[k], over the packed words.
+
+        Padding compares equal, so this is the Hamming distance for equal lengths.
+        """
+        diff = self._words[first] ^ self._words[second]
+        diff = (diff | (diff >> np.uint64(1))) & _BASE_LOW_BITS
+        return _popcount(diff).sum(axis=1, dtype=np.int64)
+
+    def reverse_complement(self) -> "PackedSequences":
+        codes = self.codes()
+        width = codes.shape[1]
+
+        # Position j of the result is base lengths-1-j of the source
+        source_pos = self._lengths[:, None] - 1 - np.arange(width)
+        in_sequence = source_pos >= 0
+
+        reverse = np.take_along_axis(codes, np.clip(source_pos, 0, None), axis=1)
+        complement = np.where(in_sequence, 3 - reverse, 0).astype(np.uint8)
+
+        return PackedSequences.from_codes(complement, self._lengths)
+
+    def hashes(self) -> np.ndarray:
+        """ A uint64 hash per sequence, equal sequences give equal hashes. """
+        h = _splitmix64(self._lengths.astype(np.uint64))
+        for column in range(self._words.shape[1]):
+            h = _splitmix64(h ^ self._words[:, column])
+        return h
+
+    def to_strings(self) -> list[str]:
+        codes = self.codes()
+        width = codes.shape[1]
+        if width == 0:
+            return [""] * len(self)
+
+        ascii_codes = _DECODE[codes]
+        ascii_codes[np.arange(width) >= self._lengths[:, None]] = 0
+
+        return np.ascontiguousarray(ascii_codes).view(f"S{width}").ravel().astype(str).tolist()
+
+    def __repr__(self):
+        return f"PackedSequences(n={len(self)}, max_length={self.max_length}, nbytes={self.nbytes})"
@@ -0,0 +1,67 @@
+import threading
+from typing import Callable
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+
+class TaskCancelled(Exception):
+    """ Raised inside a task at its next progress report after cancel() was called. """
+
+
+class TaskSignals(QObject):
+    progress = Signal(int, str)
+    result = Signal(object)
+    error = Signal(str)
+    cancelled = Signal()
+    finished = Signal()
+
+
+class TaskWorker(QRunnable):
+    """ Runs fn on a QThreadPool thread and reports back through Qt signals.
+
+    fn is called with a progress(percent, message) keyword argument. Every
+    call is forwarded as a progress signal and is also the cancellation
+    point: once cancel() has been called it raises TaskCancelled, so fn
+    stops at its next step. fn must not touch widgets, its result is
+    delivered to slots running on the GUI thread.
+    """
+
+    def __init__(self, fn: Callable, *args, **kwargs):
+        super().__init__()
+
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+
+        self._cancel_event = threading.Event()
+        self.signals = TaskSignals()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _progress(self, percent: int, message: str):
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+        self.signals.progress.emit(percent, message)
+
+    def run(self):
+        try:
+            result = self._fn(*self._args, progress=self._progress, **self._kwargs)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except ValueError as e:
+            self.signals.error.emit(str(e))
+        except Exception as e:
+            self.signals.error.emit(f"{type(e).__name__}: {e}")
+        else:
+            if self._cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
@@ -0,0 +1,246 @@
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.model.column_stats import cached_stat
+from modules.model.index_set_processing import text_values, blank_mask, invalid_sequence_mask, duplicate_mask
+
+INDEX_SEQ_FIELDS = ('IndexI7', 'IndexI5')
+
+MISSING_FIELD = "missing_field"
+INVALID_SEQUENCE = "invalid_sequence"
+EMPTY_VALUE = "empty_value"
+DUPLICATE_VALUE = "duplicate_value"
+
+RULES = (MISSING_FIELD, INVALID_SEQUENCE, EMPTY_VALUE, DUPLICATE_VALUE)
+
+# Row numbers listed per violation before the rest is summarised
+MAX_LISTED_ROWS = 5
+
+
+class Violation:
+    """ One rule broken by one column of an index set, at the given table rows (0-based).
+
+    A missing_field violation names all missing fields of the set as its column.
+    """
+
+    __slots__ = ("rule", "set_name", "column", "rows")
+
+    def __init__(self, rule: str, set_name: str, column: str, rows: np.ndarray):
+        self.rule = rule
+        self.set_name = set_name
+        self.column = column
+        self.rows = rows
+
+    @property
+    def message(self) -> str:
+        if self.rule == MISSING_FIELD:
+            return f"all fields not set for {self.set_name}, missing {self.column}"
+        if self.rule == INVALID_SEQUENCE:
+            return f"{self.set_name}: invalid index for {self.column}"
+        if self.rule == EMPTY_VALUE:
+            return f"{self.set_name}: empty index in {self.column}"
+        return f"{self.set_name}: duplicate values in {self.column}"
+
+    def describe(self) -> str:
+        if not len(self.rows):
+            return self.message
+
+        row_numbers = ", ".join(str(row + 1) for row in self.rows[:MAX_LISTED_ROWS])
+        more = len(self.rows) - MAX_LISTED_ROWS
+        if more > 0:
+            row_numbers += f" and {more} more"
+
+        return f"{self.message} (rows {row_numbers})"
+
+    def to_dict(self) -> dict:
+        return {
+            "Rule": self.rule,
+            "IndexSet": self.set_name,
+            "Column": self.column,
+            "Rows": [int(row) + 1 for row in self.rows],
+        }
+
+    def __repr__(self):
+        return f"Violation({self.rule!r}, {self.set_name!r}, {self.column!r}, rows={len(self.rows)})"
+
+
+class ValidationReport:
+    """ Every violation found in one validation run, with the seconds spent per rule. """
+
+    __slots__ = ("violations", "timings")
+
+    def __init__(self, violations: list[Violation], timings: dict[str, float]):
+        self.violations = violations
+        self.timings = timings
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def by_rule(self, rule: str) -> list[Violation]:
+        return [violation for violation in self.violations if violation.rule == rule]
+
+    def error_message(self, limit: int = 5) -> str:
+        """ The first violations on one line, for a ValueError or the status bar. """
+        messages = [violation.describe() for violation in self.violations[:limit]]
+        more = len(self.violations) - limit
+        if more > 0:
+            messages.append(f"{more} more problems")
+        return "; ".join(messages)
+
+    def to_dict(self) -> dict:
+        return {
+            "Violations": [violation.to_dict() for violation in self.violations],
+            "Timings": dict(self.timings),
+        }
+
+
+class _ColumnView:
+    """ Text values and masks of each column, computed once per validation run.
+
+    With a fingerprint per column the masks are also cached across runs, so
+    an unchanged column is never rescanned.
+    """
+
+    def __init__(self, df: pd.DataFrame, fingerprints: dict[str, str] | None = None):
+        self._df = df
+        self._fingerprints = fingerprints or {}
+        self._text = {}
+        self._masks = {}
+
+    def text(self, column: str) -> pd.Series:
+        if column not in self._text:
+            self._text[column] = text_values(self._df[column])
+        return self._text[column]
+
+    def _mask(self, column: str, name: str, compute) -> np.ndarray:
+        key = (column, name)
+        if key not in self._masks:
+            fingerprint = self._fingerprints.get(column)
+            if fingerprint is None:
+                self._masks[key] = compute()
+            else:
+                self._masks[key] = cached_stat(fingerprint, name, compute)
+        return self._masks[key]
+
+    def blank(self, column: str) -> np.ndarray:
+        return self._mask(column, "blank_mask", lambda: blank_mask(self.text(column)))
+
+    def invalid(self, column: str) -> np.ndarray:
+        return self._mask(column, "invalid_sequence_mask",
+                          lambda: invalid_sequence_mask(self.text(column), self.blank(column)))
+
+    def duplicates(self, column: str, rows: np.ndarray) -> np.ndarray:
+        """ Duplicates among rows, cached against the column fingerprint and the rows. """
+        fingerprint = self._fingerprints.get(column)
+        if fingerprint is None:
+            return duplicate_mask(self.text(column), rows)
+
+        key = (fingerprint, hashlib.blake2b(rows.tobytes(), digest_size=16).hexdigest())
+        return cached_stat(key, "duplicate_mask", lambda: duplicate_mask(self.text(column), rows))
+
+
+def _validate_set(columns: _ColumnView, set_name: str, field_list: list[str], present: list[str],
+                  timings: dict[str, float], rules: tuple[str, ...] = RULES) -> list[Violation]:
+    violations = []
+
+    start = time.perf_counter()
+    missing = [field for field in field_list if field not in present]
+    if missing and MISSING_FIELD in rules:
+        violations.append(Violation(MISSING_FIELD, set_name, ", ".join(missing), np.empty(0, dtype=np.int64)))
+    timings[MISSING_FIELD] += time.perf_counter() - start
+
+    if not present:
+        return violations
+
+    start = time.perf_counter()
+    for field in present:
+        if field in INDEX_SEQ_FIELDS and INVALID_SEQUENCE in rules:
+            invalid = columns.invalid(field)
+            if invalid.any():
+                violations.append(Violation(INVALID_SEQUENCE, set_name, field, np.flatnonzero(invalid)))
+    timings[INVALID_SEQUENCE] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    blanks = np.stack([columns.blank(field) for field in present], axis=1)
+    set_rows = np.flatnonzero(~blanks.all(axis=1))
+    for position, field in enumerate(present):
+        empty = set_rows[blanks[set_rows, position]]
+        if len(empty) and EMPTY_VALUE in rules:
+            violations.append(Violation(EMPTY_VALUE, set_name, field, empty))
+    timings[EMPTY_VALUE] += time.perf_counter() - start
+
+    if DUPLICATE_VALUE not in rules:
+        return violations
+
+    start = time.perf_counter()
+    for position, field in enumerate(present):
+        filled_rows = set_rows[~blanks[set_rows, position]]
+        duplicates = columns.duplicates(field, filled_rows)
+        if duplicates.any():
+            violations.append(Violation(DUPLICATE_VALUE, set_name, field, np.flatnonzero(duplicates)))
+    timings[DUPLICATE_VALUE] += time.perf_counter() - start
+
+    return violations
+
+
+def validate_index_sets(df: pd.DataFrame, index_set_fields: dict[str, list[str]],
+                        fingerprints: dict[str, str] | None = None,
+                        rules: tuple[str, ...] = RULES) -> ValidationReport:
+    """ Check every rule for every index set and collect all violations.
+
+    Rows where all fields of a set are blank are not part of that set. Of
+    the remaining rows, a blank field is an empty_value violation and a
+    value repeated in a field a duplicate_value violation. Index fields
+    must hold upper case DNA.
+
+    fingerprints maps columns to content fingerprints. With it, column masks
+    and the violations of each index set are cached, and only sets with a
+    changed column are revalidated. Timings then only cover that work.
+
+    rules selects the rules to check, all of them by default.
+    """
+    columns = _ColumnView(df, fingerprints)
+    violations = []
+    timings = dict.fromkeys(RULES, 0.0)
+
+    for set_name, field_list in index_set_fields.items():
+        present = [field for field in field_list if field in df.columns]
+
+        if fingerprints is None:
+            violations.extend(_validate_set(columns, set_name, field_list, present, timings, rules))
+            continue
+
+        key = (set_name, tuple(field_list), tuple((field, fingerprints[field]) for field in present), rules)
+        violations.extend(cached_stat(key, "set_violations",
+                                      lambda: _validate_set(columns, set_name, field_list, present, timings, rules)))
+
+    return ValidationReport(violations, timings)
+
+
+def merge_reports(reports: list[ValidationReport], index_set_fields: dict[str, list[str]]) -> ValidationReport:
+    """ One report from reports over chunks or rule subsets of the same table.
+
+    Rows must already be numbered within the whole table. Violations of the
+    same rule, set and column are joined, and ordered by set, then rule.
+    """
+    merged = {}
+    timings = dict.fromkeys(RULES, 0.0)
+
+    for report in reports:
+        for rule, seconds in report.timings.items():
+            timings[rule] += seconds
+
+        for violation in report.violations:
+            merged.setdefault((violation.set_name, violation.rule, violation.column), []).append(violation.rows)
+
+    set_order = {set_name: position for position, set_name in enumerate(index_set_fields)}
+    keys = sorted(merged, key=lambda key: (set_order.get(key[0], len(set_order)), RULES.index(key[1])))
+
+    violations = [Violation(rule, set_name, column, np.concatenate(merged[(set_name, rule, column)]))
+                  for set_name, rule, column in keys]
+
+    return ValidationReport(violations, timings)
@@ -0,0 +1,18 @@
+from PySide6.QtWidgets import QApplication
+
+
+class Application(QApplication):
+    """Main application class extending QApplication with custom initialization."""
+
+    def __init__(self, argv: list[str]) -> None:
+        """Initialize the application with custom settings.
+
+        Args:
+            argv: Command line arguments
+        """
+        super().__init__(argv)
+
+        self.setApplicationName("IndexTool")
+        self.setApplicationVersion("1.0.0")
+        self.setOrganizationName("Region Västerbotten")
+        self.setOrganizationDomain("regionvasterbotten.se")
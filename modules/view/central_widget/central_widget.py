@@ -1,15 +1,16 @@
 from logging import Logger
 from pathlib import Path
 
-from PySide6.QtWidgets import QWidget, QFileDialog, QHBoxLayout, QSpacerItem, QSizePolicy
+from PySide6.QtWidgets import QWidget, QFileDialog, QHBoxLayout, QInputDialog, QSpacerItem, QSizePolicy
 
 from modules.model.data_manager import DataManager
 from modules.view.draggable_labels.draggable_labels import DraggableLabelsContainer
-from modules.view.index_table.droppable_table import DroppableTableWidget
+from modules.view.index_table.droppable_table import DroppableTableView
 from modules.view.metadata.index_kit_settings.index_kit_settings_widget import IndexKitSettingsWidget
 from modules.view.metadata.resource_settings.resource_settings_widget import ResourceSettingsWidget
 from modules.view.metadata.user_settings.user_settings_widget import UserSettingsWidget
 from modules.view.ui.widget import Ui_Form
+from modules.view.validation.validation_widget import ValidationWidget
 
 
 class CentralWidget(QWidget, Ui_Form):
@@ -17,11 +18,12 @@ class CentralWidget(QWidget, Ui_Form):
                  data_manager: DataManager,
                  draggable_labels_container_widget: DraggableLabelsContainer,
                  resources_settings_widget: ResourceSettingsWidget,
-                 droppable_table_widget: DroppableTableWidget,
+                 droppable_table_widget: DroppableTableView,
                  user_settings_widget: UserSettingsWidget,
                  index_kit_settings_widget: IndexKitSettingsWidget,
                  index_metadata,
                  logger: Logger,
+                 validation_widget: ValidationWidget | None = None,
                  ) -> None:
 
         super().__init__()
@@ -43,6 +45,7 @@ class CentralWidget(QWidget, Ui_Form):
         self._user_settings_widget = user_settings_widget
         self._index_kit_settings_widget = index_kit_settings_widget
         self._index_metadata = index_metadata
+        self._validation_widget = validation_widget
 
 
         self.stackedWidget.setCurrentWidget(self.data_page_widget)
@@ -65,6 +68,8 @@ class CentralWidget(QWidget, Ui_Form):
         self._v_layout.addLayout(self._h_layout)
         self._v_layout.addWidget(self._draggable_labels_container_widget)
         self._v_layout.addWidget(self._droppable_table_widget)
+        if self._validation_widget is not None:
+            self._v_layout.addWidget(self._validation_widget)
 
         self._connect_signals()
     # #
@@ -78,6 +83,17 @@ class CentralWidget(QWidget, Ui_Form):
         self.export_pushButton.clicked.connect(self._export_data)
         self.help_pushButton.clicked.connect(self._toggle_help)
 
+        self._data_manager.task_started.connect(self._disable_task_buttons)
+        self._data_manager.task_finished.connect(self._enable_task_buttons)
+
+    def _disable_task_buttons(self):
+        self.load_pushButton.setEnabled(False)
+        self.export_pushButton.setEnabled(False)
+
+    def _enable_task_buttons(self):
+        self.load_pushButton.setEnabled(True)
+        self.export_pushButton.setEnabled(True)
+
     def _set_source_format(self):
         if self.xlsx_radioButton.isChecked():
             self._data_manager.set_input_format('xlsx')
@@ -93,11 +109,36 @@ class CentralWidget(QWidget, Ui_Form):
 
     def _load_data(self):
         file = self._open_file_dialog()
-        if file:
-            self._data_manager.set_index_data(file)
+        if not file:
+            return
+
+        sheet_name = None
+        if self._data_manager.index_source_format == "xlsx":
+            sheet_name = self._select_sheet(file)
+            if sheet_name is None:
+                return
+
+        self._data_manager.load_index_data(file, sheet_name)
+
+        # self._data_container_widget.user_settings.set_source_filepath(file)
+        # self._load_csv(file) if self.csv_radioButton.isChecked() else self._load_ikd(file)
 
-            # self._data_container_widget.user_settings.set_source_filepath(file)
-            # self._load_csv(file) if self.csv_radioButton.isChecked() else self._load_ikd(file)
+    def _select_sheet(self, file: Path) -> str | None:
+        """ Ask for the worksheet to load when the workbook has more than one. """
+        from modules.model.load.xlsx_index_data import list_sheet_names
+
+        try:
+            sheet_names = list_sheet_names(file)
+        except Exception as e:
+            self._logger.error(f"Could not read the sheets of {file.name}: {e}")
+            return None
+
+        if len(sheet_names) == 1:
+            return sheet_names[0]
+
+        sheet_name, ok = QInputDialog.getItem(self, "Select sheet", f"Sheet of {file.name} to load:",
+                                              sheet_names, 0, False)
+        return sheet_name if ok else None
 
     def _open_file_dialog(self) -> Path | None:
         self._logger.info(f"open file dialog clicked")
@@ -124,8 +165,7 @@ class CentralWidget(QWidget, Ui_Form):
     def _export_data(self):
         filepath = self._export_file_dialog()
         if filepath:
-
-            self._data_manager.save_json_data(filepath)
+            self._data_manager.export_json_data(filepath)
 
     def _export_file_dialog(self) -> str:
         source_file = Path(self._data_manager.import_filepath)
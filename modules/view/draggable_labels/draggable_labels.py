@@ -18,6 +18,7 @@ class DraggableLabelsContainer(QGroupBox):
 
         self._config_name_combobox = QComboBox()
 
+        # Label panels by config name, built the first time a config is shown
         self.kit_type_label_widgets = {}
 
         self._config_name_combobox.currentTextChanged.connect(self._set_selected_config_name)
@@ -31,19 +32,31 @@ class DraggableLabelsContainer(QGroupBox):
         self._config_name_combobox.addItems(self._data_manager.config_name_list)
         self.layout.addLayout(form_layout)
 
-        for kit_type_name, kit_object in self._data_manager.config_definition_data.items():
-            kit_fields_widget = self._create_kit_fields_widget(kit_object.all_index_fields)
-            self.kit_type_label_widgets[kit_type_name] = kit_fields_widget
-            self.layout.addWidget(kit_fields_widget)
-
         self._set_selected_config_name()
         self.show_labels()
 
     def show_labels(self):
         selected_config_name = self._data_manager.config_name
+        selected_widget = self._kit_fields_widget(selected_config_name)
+
+        for widget in self.kit_type_label_widgets.values():
+            widget.setVisible(widget is selected_widget)
+
+    def _kit_fields_widget(self, config_name: str) -> QWidget | None:
+        """ The label panel of a config, created and cached on first use. """
+        widget = self.kit_type_label_widgets.get(config_name)
+        if widget is not None:
+            return widget
 
-        for labels_kit_type_name, widget in self.kit_type_label_widgets.items():
-            widget.setVisible(labels_kit_type_name == selected_config_name)
+        kit_object = self._data_manager.config_definition_data.get(config_name)
+        if kit_object is None:
+            return None
+
+        widget = self._create_kit_fields_widget(kit_object.all_index_fields)
+        self.kit_type_label_widgets[config_name] = widget
+        self.layout.addWidget(widget)
+
+        return widget
 
     def _set_selected_config_name(self):
         current_config_name = self._config_name_combobox.currentText()
@@ -1,43 +1,49 @@
-from typing import Dict, List, Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Any
 
-import numpy as np
-import pandas as pd
 from PySide6.QtCore import Signal
 from PySide6.QtGui import QAction, Qt
-from PySide6.QtWidgets import QTableWidget, QHeaderView, QMenu, QTableWidgetItem
+from PySide6.QtWidgets import QTableView, QHeaderView, QMenu
 
 from modules.model.data_manager import DataManager
 from modules.model.config_object import ConfigObject
+from modules.view.index_table.index_table_model import IndexTableModel
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
-class DroppableTableWidget(QTableWidget):
-    def __init__(self, rows, columns, data_manager: DataManager, parent=None):
-        super().__init__(rows, columns, parent)
+class DroppableTableView(QTableView):
+    def __init__(self, data_manager: DataManager, parent=None):
+        super().__init__(parent)
 
         self._data_manager = data_manager
 
+        self._model = IndexTableModel(self)
+        self.setModel(self._model)
+
         self._droppable_header = DroppableHeader(Qt.Horizontal, self)
         self.setHorizontalHeader(self._droppable_header)
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
-        self._droppable_header.header_labels_changed.connect(self._save_index_table_widget_data)
+        # Fixed row heights so the view never measures rows it does not paint
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
-    def _save_index_table_widget_data(self):
+        self._droppable_header.header_labels_changed.connect(self._save_column_mapping)
+        self._model.cell_edited.connect(self._data_manager.set_index_value)
 
-        df = self.to_dataframe()
-        self._data_manager.set_index_df(df)
+    def _save_column_mapping(self):
+        self._data_manager.set_column_mapping(self._model.column_mapping())
 
     def set_index_table_widget_data(self):
-        df = self._data_manager.index_df
+        df = self._data_manager.source_index_df
 
         df = df.dropna(axis=1, how='all').loc[:, (df != '').any()]
-        self.setRowCount(df.shape[0])
-        self.setColumnCount(df.shape[1])
-        self.setHorizontalHeaderLabels(df.columns)
+        self._model.set_dataframe(df, self._data_manager.column_mapping)
 
-        for i in range(df.shape[0]):
-            for j in range(df.shape[1]):
-                self.setItem(i, j, QTableWidgetItem(str(df.iat[i, j])))
+    def set_column_mapping(self):
+        self._model.apply_column_mapping(self._data_manager.column_mapping)
 
     def contextMenuEvent(self, event):
         header_index = self.horizontalHeader().logicalIndexAt(event.pos())
@@ -56,27 +62,19 @@ class DroppableTableWidget(QTableWidget):
             super().contextMenuEvent(event)
 
     def show_all_columns(self):
-        for column in range(self.columnCount()):
+        for column in range(self._model.columnCount()):
             self.setColumnHidden(column, False)
 
     def to_dataframe(self) -> pd.DataFrame:
-        rows, columns = self.rowCount(), self.columnCount()
-        headers = [self.horizontalHeaderItem(col).text() for col in range(columns)]
-        data = {header: [] for header in headers}
-
-        for row in range(rows):
-            for col, header in enumerate(headers):
-                item = self.item(row, col)
-                data[header].append(item.text() if item else None)
-
-        return pd.DataFrame(data)
+        return self._model.dataframe()
 
     def index_sets_dict(self, index_kit_def_obj: ConfigObject) -> Dict[str, List[Dict[str, Any]]]:
+        import numpy as np
 
         fields = index_kit_def_obj.all_index_fields
 
         df = self.to_dataframe()
-        _df = df[fields].copy().replace(['nan', ''], np.nan).dropna(how='all')
+        _df = df[list(fields)].copy().replace(['nan', ''], np.nan).dropna(how='all')
         if _df.isnull().any().any():
             raise ValueError(f"Error: NaN values in the index table for {index_kit_def_obj.config_type_name}")
 
@@ -84,7 +82,7 @@ class DroppableTableWidget(QTableWidget):
 
         for index_set_name in index_kit_def_obj.index_set_names:
             index_set_fields = index_kit_def_obj.index_set_fields_by_name(index_set_name)
-            _df2 = _df[index_set_fields]
+            _df2 = _df[list(index_set_fields)]
             index_sets_dict[index_set_name] = _df2.to_dict(orient='records')
 
         return index_sets_dict
@@ -96,7 +94,6 @@ class DroppableHeader(QHeaderView):
     def __init__(self, orientation, parent=None):
         super().__init__(orientation, parent)
         self.setAcceptDrops(True)
-        self.original_labels = {}
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
@@ -112,32 +109,34 @@ class DroppableHeader(QHeaderView):
             new_label = event.mimeData().text()
             old_label = self.model().headerData(index, Qt.Horizontal)
 
-            set_labels = self.header_labels()
-            if new_label in set_labels:
-                other_label_index = set_labels.index(new_label)
-                self.restore_orig_header_for_index(other_label_index)
+            if old_label != new_label:
+                set_labels = self.header_labels()
+                if new_label in set_labels:
+                    other_label_index = set_labels.index(new_label)
+                    self._restore_label(other_label_index)
 
-            if index not in self.original_labels:
-                self.original_labels[index] = old_label
+                self.model().setHeaderData(index, Qt.Horizontal, new_label)
+                self.header_labels_changed.emit()
 
-            self.model().setHeaderData(index, Qt.Horizontal, new_label)
             event.acceptProposedAction()
 
-            if old_label != new_label:
-                self.header_labels_changed.emit()
-
     def header_labels(self) -> List[str]:
         return [self.model().headerData(section, self.orientation(), Qt.DisplayRole) for section in range(self.count())]
 
+    def _restore_label(self, index: int) -> bool:
+        source_label = self.model().source_label(index)
+        if source_label is None or source_label == self.model().headerData(index, Qt.Horizontal):
+            return False
+
+        return self.model().setHeaderData(index, Qt.Horizontal, source_label)
+
     def restore_orig_header(self):
-        for index, label in self.original_labels.items():
-            self.model().setHeaderData(index, Qt.Horizontal, label)
+        restored = [self._restore_label(index) for index in range(self.count())]
+        if any(restored):
             self.header_labels_changed.emit()
 
     def restore_orig_header_for_index(self, index: int):
-        old_label = self.original_labels.pop(index, None)
-        if old_label:
-            self.model().setHeaderData(index, Qt.Horizontal, old_label)
+        if self._restore_label(index):
             self.header_labels_changed.emit()
 
     def restore_orig_header_for_label(self, label: str):
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class IndexTableModel(QAbstractTableModel):
+    """ Editable table model over the column arrays of a DataFrame.
+
+    The view only asks for the cells it paints, so no per-cell items are
+    created. Horizontal header labels are a mapping over the source column
+    names and can be relabelled without touching the rows. Edited cells are
+    written to a copy of the DataFrame and announced with cell_edited.
+    """
+
+    # row, source column name, new value
+    cell_edited = Signal(int, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._df = None
+        self._columns = []
+        self._source_labels = []
+        self._labels = []
+        self._row_count = 0
+
+    def set_dataframe(self, df: pd.DataFrame, column_mapping: dict[str, str] | None = None):
+        column_mapping = column_mapping or {}
+        source_labels = [str(label) for label in df.columns]
+
+        # A table with the same shape, such as after an edit, only refreshes the cells
+        same_shape = source_labels == self._source_labels and df.shape[0] == self._row_count
+        if not same_shape:
+            self.beginResetModel()
+
+        self._df = df
+        self._columns = [df.iloc[:, i].to_numpy(dtype=object) for i in range(df.shape[1])]
+        self._source_labels = source_labels
+        self._labels = [column_mapping.get(label, label) for label in self._source_labels]
+        self._row_count = df.shape[0]
+
+        if not same_shape:
+            self.endResetModel()
+        elif self._row_count and self._columns:
+            self.dataChanged.emit(self.index(0, 0), self.index(self._row_count - 1, len(self._columns) - 1))
+            self.headerDataChanged.emit(Qt.Horizontal, 0, len(self._labels) - 1)
+
+    def dataframe(self) -> pd.DataFrame:
+        """ The table data with the current header labels as column names. """
+        if self._df is None:
+            import pandas as pd
+            return pd.DataFrame()
+        return self._df.set_axis(self._labels, axis=1)
+
+    def header_labels(self) -> list[str]:
+        return list(self._labels)
+
+    def source_label(self, section: int) -> str | None:
+        if 0 <= section < len(self._source_labels):
+            return self._source_labels[section]
+        return None
+
+    def column_mapping(self) -> dict[str, str]:
+        """ Source column name -> header label, for relabelled columns only. """
+        return {source: label for source, label in zip(self._source_labels, self._labels) if source != label}
+
+    def apply_column_mapping(self, column_mapping: dict[str, str]):
+        for section, source in enumerate(self._source_labels):
+            label = column_mapping.get(source, source)
+            if self._labels[section] != label:
+                self._labels[section] = label
+                self.headerDataChanged.emit(Qt.Horizontal, section, section)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole):
+            return None
+
+        value = self._columns[index.column()][index.row()]
+
+        # None and NaN are shown as empty cells
+        if value is None or value != value:
+            return ""
+
+        return str(value)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+
+        from modules.model.index_kit import with_cell_value
+
+        value = "" if value is None else str(value)
+        if value == self.data(index, Qt.EditRole):
+            return False
+
+        row, column = index.row(), index.column()
+        self._df = with_cell_value(self._df, row, column, value)
+        self._columns[column] = self._df.iloc[:, column].to_numpy(dtype=object)
+
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.cell_edited.emit(row, self._source_labels[column], value)
+
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+
+        if orientation == Qt.Horizontal:
+            if 0 <= section < len(self._labels):
+                return self._labels[section]
+            return None
+
+        return str(section + 1)
+
+    def setHeaderData(self, section, orientation, value, role=Qt.EditRole):
+        if orientation != Qt.Horizontal or role not in (Qt.DisplayRole, Qt.EditRole):
+            return False
+
+        if not 0 <= section < len(self._labels):
+            return False
+
+        self._labels[section] = str(value)
+        self.headerDataChanged.emit(orientation, section, section)
+
+        return True
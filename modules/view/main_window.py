@@ -4,7 +4,7 @@ from PySide6.QtWidgets import QMainWindow
 from modules.view.central_widget.central_widget import CentralWidget
 import qtawesome as qta
 
-from modules.view.logging.statusbar import StatusBar
+from modules.view.statusbar.statusbar import StatusBar
 
 
 class MainWindow(QMainWindow):
@@ -1,8 +1,10 @@
-from PySide6.QtWidgets import QLabel, QStatusBar, QWidget
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QLabel, QStatusBar, QWidget, QProgressBar, QPushButton
+from PySide6.QtCore import Qt, QTimer, Signal
 
 
 class StatusBar(QStatusBar):
+    cancel_requested = Signal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -26,6 +28,18 @@ class StatusBar(QStatusBar):
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.clear_message)
 
+        # Progress of a running background task, hidden while idle
+        self.task_label = QLabel()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedWidth(160)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_requested)
+
+        for widget in (self.task_label, self.progress_bar, self.cancel_button):
+            self.addPermanentWidget(widget)
+            widget.hide()
+
     def display_message(self, level: str, message: str, timeout: int = 5000):
         """Show a colored message for a given time (in milliseconds)."""
         color = self.color_map.get(level, "#000000")  # Default to black
@@ -38,3 +52,19 @@ class StatusBar(QStatusBar):
     def clear_message(self):
         """Clears the message when the timer expires."""
         self.label.clear()
+
+    def start_task(self, description: str):
+        self.task_label.setText(description)
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+
+        for widget in (self.task_label, self.progress_bar, self.cancel_button):
+            widget.show()
+
+    def set_task_progress(self, percent: int, message: str):
+        self.progress_bar.setValue(percent)
+        self.task_label.setText(message)
+
+    def finish_task(self):
+        for widget in (self.task_label, self.progress_bar, self.cancel_button):
+            widget.hide()
@@ -0,0 +1,48 @@
+from logging import Logger
+
+from PySide6.QtWidgets import QGroupBox, QLabel, QListWidget, QVBoxLayout
+
+from modules.model.data_manager import DataManager
+
+
+class ValidationWidget(QGroupBox):
+    """ Live list of the rules the mapped index table breaks for the selected config. """
+
+    def __init__(self, data_manager: DataManager, logger: Logger):
+        super().__init__()
+        self.setTitle("Validation")
+        self._data_manager = data_manager
+        self._logger = logger
+
+        self._summary = QLabel()
+        self._violations = QListWidget()
+        self._violations.setMaximumHeight(120)
+
+        self._setup_ui()
+        self.refresh()
+
+    def refresh(self):
+        report = None
+        if not self._data_manager.has_index_data:
+            self._summary.setText("Load an index file to validate it")
+        else:
+            report = self._data_manager.validation_report()
+
+            if report is None:
+                self._summary.setText("Select a kit config to validate the index table")
+            elif report.ok:
+                self._summary.setText("No problems found")
+            else:
+                self._summary.setText(f"{len(report.violations)} problems found")
+
+        self._violations.clear()
+        if report is not None and not report.ok:
+            self._violations.addItems([violation.describe() for violation in report.violations])
+
+        self._violations.setVisible(report is not None and not report.ok)
+
+    def _setup_ui(self):
+        layout = QVBoxLayout()
+        layout.addWidget(self._summary)
+        layout.addWidget(self._violations)
+        self.setLayout(layout)
@@ -11,6 +11,14 @@ def qapp():
         app = QApplication(sys.argv)
     yield app
 
+@pytest.fixture(autouse=True)
+def parse_cache_dir(tmp_path, monkeypatch):
+    """Keep the parse cache of each test in its own temporary directory."""
+    import modules.model.load.parse_cache as parse_cache
+    monkeypatch.setenv(parse_cache.CACHE_DIR_ENV, str(tmp_path / "parse_cache"))
+    monkeypatch.setattr(parse_cache, "_default_cache", None)
+    return tmp_path / "parse_cache"
+
 @pytest.fixture
 def logger():
     """Create a logger instance for testing."""
@@ -0,0 +1,69 @@
+import json
+import logging
+
+import pytest
+
+from index_tool import convert_main
+from modules.model.batch_convert import collect_source_files, convert_files
+
+GOOD = "Name,Seq\nA1,ACGTACGT\nA2,TTGGCCAA\n"
+BAD = "Name,Other\nA1,ACGTACGT\n"
+MAP = {"Name": "IndexI7Name", "Seq": "IndexI7"}
+
+
+def _sources(tmp_path):
+    source_dir = tmp_path / "in"
+    (source_dir / "nested").mkdir(parents=True)
+    (source_dir / "good.csv").write_text(GOOD)
+    (source_dir / "bad.csv").write_text(BAD)
+    (source_dir / "notes.txt").write_text("not an index file")
+    (source_dir / "nested" / "deep.CSV").write_text(GOOD)
+    return source_dir
+
+
+def test_collect_from_directory_and_glob(tmp_path):
+    """ Directories give their index files, globs match recursively, other suffixes are skipped. """
+    source_dir = _sources(tmp_path)
+
+    assert collect_source_files(str(source_dir)) == [source_dir / "bad.csv", source_dir / "good.csv"]
+    assert collect_source_files(str(source_dir / "**" / "*.[cC][sS][vV]")) == [
+        source_dir / "bad.csv", source_dir / "good.csv", source_dir / "nested" / "deep.CSV"]
+    assert collect_source_files(str(tmp_path / "missing" / "*.csv")) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_file_does_not_stop_the_batch(tmp_path, workers):
+    """ A failing file is reported with its error while the others are still converted. """
+    source_dir = _sources(tmp_path)
+    sources = collect_source_files(str(source_dir / "**" / "*.[cC][sS][vV]"))
+
+    report = convert_files(sources, "single", tmp_path / "out", MAP, workers=workers)
+
+    assert [result.source.name for result in report.results] == ["bad.csv", "good.csv", "deep.CSV"]
+    assert report.converted_count == 2
+    assert [failure.source.name for failure in report.failures] == ["bad.csv"]
+    assert "IndexI7" in report.failures[0].error
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == ["deep.json", "good.json"]
+
+
+def test_convert_main_maps_columns_and_exits_non_zero_on_failures(tmp_path, caplog):
+    """ The convert command writes to --output-dir with -m relabelling and returns 1 if any file failed. """
+    source_dir = _sources(tmp_path)
+    out = tmp_path / "out"
+    args = ["-c", "single", "-o", str(out), "-m", "Name=IndexI7Name", "-m", "Seq=IndexI7", "-j", "2"]
+
+    with caplog.at_level(logging.ERROR, logger="index_tool.convert"):
+        assert convert_main([str(source_dir)] + args) == 1
+    assert any(record.getMessage().startswith(f"FAILED {source_dir / 'bad.csv'}") for record in caplog.records)
+
+    exported = json.loads((out / "good.json").read_text())
+    assert exported["IndexSets"]["IndexI7"] == [
+        {"IndexI7Name": "A1", "IndexI7": "ACGTACGT"},
+        {"IndexI7Name": "A2", "IndexI7": "TTGGCCAA"},
+    ]
+    assert not (out / "bad.json").exists()
+    assert not (source_dir / "good.json").exists()
+
+    assert convert_main([str(source_dir / "good.csv")] + args) == 0
+    assert convert_main([str(source_dir / "good.csv"), "-c", "single", "-o", str(out)]) == 1
+    assert convert_main([str(tmp_path / "missing")] + args) == 1
@@ -0,0 +1,153 @@
+import csv
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from index_tool import cdi_main
+from modules.model.cdi_pairs import CdiCollisionStats, cdi_indexes, iter_cdi_blocks, write_cdi_pairs
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit
+
+CDI_WELL = ConfigObject({
+    "ConfigTypeName": "combinatorial_dual_indexes_well",
+    "Well": True,
+    "IndexStrategy": "cdi",
+    "IndexSets": {
+        "IndexI7": ["WellI7", "IndexI7Name", "IndexI7"],
+        "IndexI5": ["WellI5", "IndexI5Name", "IndexI5"],
+    },
+})
+
+UDI = ConfigObject({
+    "ConfigTypeName": "unique_dual_indexes",
+    "Well": False,
+    "IndexStrategy": "udi",
+    "IndexSets": {"IndexDual": ["IndexI7Name", "IndexI7", "IndexI5Name", "IndexI5"]},
+})
+
+
+def _random_sequences(rng, count, length=6):
+    return ["".join(rng.choice(list("ACGT"), length)) for _ in range(count)]
+
+
+def _kit(i7_count=12, i5_count=8, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = max(i7_count, i5_count)
+
+    def column(values):
+        return values + [""] * (rows - len(values))
+
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({
+        "WellI7": column([f"A{i:02}" for i in range(1, i7_count + 1)]),
+        "IndexI7Name": column([f"N7{i:02}" for i in range(i7_count)]),
+        "IndexI7": column(_random_sequences(rng, i7_count)),
+        "WellI5": column([f"B{i:02}" for i in range(1, i5_count + 1)]),
+        "IndexI5Name": column([f"S5.{i:02}" for i in range(i5_count)]),
+        "IndexI5": column(_random_sequences(rng, i5_count)),
+    }, dtype="str")
+    return kit
+
+
+def test_collision_stats_match_brute_force():
+    """ Streamed stats equal the closest other pair found by comparing every pair with every other. """
+    kit = _kit()
+    indexes = cdi_indexes(kit.index_df, CDI_WELL, max_distance=3)
+
+    stats = CdiCollisionStats(3)
+    pairs = [(i7, i5) for block in iter_cdi_blocks(indexes, block_pairs=20, stats=stats)
+             for i7, i5 in zip(block["IndexI7"], block["IndexI5"])]
+
+    def distance(a, b):
+        return sum(x != y for x, y in zip(a[0] + a[1], b[0] + b[1]))
+
+    nearest = [min(distance(pair, other) for other in pairs if other is not pair) for pair in pairs]
+    expected = np.bincount([d for d in nearest if d <= 3], minlength=4)
+
+    assert len(pairs) == stats.pair_count == 12 * 8
+    assert stats.histogram.tolist() == expected.tolist()
+    assert stats.min_distance == min(nearest)
+
+
+def test_json_and_csv_hold_every_pair_with_wells(tmp_path):
+    """ Both formats list each I7 x I5 pair once, I7 major, with wells and names. """
+    kit = _kit()
+    indexes = cdi_indexes(kit.index_df, CDI_WELL)
+
+    stats = write_cdi_pairs(indexes, kit, tmp_path / "pairs.json")
+    write_cdi_pairs(indexes, kit, tmp_path / "pairs.csv")
+
+    data = json.loads((tmp_path / "pairs.json").read_text())
+    with open(tmp_path / "pairs.csv", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+
+    assert data["Pairs"] == rows
+    assert data["CollisionStats"] == stats.to_dict()
+    assert len(rows) == 96
+    assert rows[9] == {
+        "WellI7": "A02", "IndexI7Name": "N701", "IndexI7": kit.index_df["IndexI7"][1],
+        "WellI5": "B02", "IndexI5Name": "S5.01", "IndexI5": kit.index_df["IndexI5"][1],
+    }
+    assert list(itertools.islice((row["IndexI7Name"] for row in rows), 7, 10)) == ["N700", "N701", "N701"]
+
+
+def test_json_escapes_quotes_and_backslashes(tmp_path):
+    """ Names that need escaping are read back unchanged from the JSON file. """
+    kit = _kit(i7_count=3, i5_count=2)
+    kit.index_df.loc[0, "IndexI7Name"] = 'N7 "a"'
+    kit.index_df.loc[1, "IndexI5Name"] = "S5\\b"
+    indexes = cdi_indexes(kit.index_df, CDI_WELL)
+
+    write_cdi_pairs(indexes, kit, tmp_path / "pairs.json")
+    pairs = json.loads((tmp_path / "pairs.json").read_text())["Pairs"]
+
+    assert len(pairs) == 6
+    assert pairs[0]["IndexI7Name"] == 'N7 "a"'
+    assert pairs[1]["IndexI5Name"] == "S5\\b"
+
+
+def test_sample_sheet_names_samples_after_the_pair(tmp_path):
+    """ Sample sheets get one sample per pair, UDI configs are rejected. """
+    kit = _kit(i7_count=3, i5_count=2)
+    indexes = cdi_indexes(kit.index_df, CDI_WELL)
+
+    write_cdi_pairs(indexes, kit, tmp_path / "SampleSheet.csv", barcode_mismatches=0)
+
+    lines = (tmp_path / "SampleSheet.csv").read_text().splitlines()
+    data = lines[lines.index("[BCLConvert_Data]") + 1:]
+    assert "BarcodeMismatchesIndex1,0" in lines
+    assert data[0] == "Sample_ID,Index,Index2"
+    assert [line.split(",")[0] for line in data[1:]] == [
+        "N700-S5_00", "N700-S5_01", "N701-S5_00", "N701-S5_01", "N702-S5_00", "N702-S5_01",
+    ]
+
+    with pytest.raises(ValueError, match="separate IndexI7 and IndexI5"):
+        cdi_indexes(kit.index_df, UDI)
+
+    with pytest.raises(ValueError, match="Unknown output format"):
+        write_cdi_pairs(indexes, kit, tmp_path / "pairs.txt")
+
+
+def test_cdi_command_picks_the_format_from_suffix_or_option(tmp_path):
+    """ .json, .csv and SampleSheet*.csv outputs follow the suffix, --format overrides it. """
+    kit_path = tmp_path / "kit.csv"
+    _kit(i7_count=3, i5_count=2).index_df.to_csv(kit_path, index=False)
+    args = [str(kit_path), "-c", "combinatorial_dual_indexes_well"]
+
+    assert cdi_main(args + ["-o", str(tmp_path / "pairs.json")]) == 0
+    assert len(json.loads((tmp_path / "pairs.json").read_text())["Pairs"]) == 6
+
+    assert cdi_main(args + ["-o", str(tmp_path / "pairs.csv")]) == 0
+    assert (tmp_path / "pairs.csv").read_text().startswith("WellI7,IndexI7Name,IndexI7,WellI5,")
+
+    assert cdi_main(args + ["-o", str(tmp_path / "SampleSheet_cdi.csv")]) == 0
+    assert "[BCLConvert_Data]" in (tmp_path / "SampleSheet_cdi.csv").read_text()
+
+    assert cdi_main(args + ["-o", str(tmp_path / "SampleSheet.json"), "--format", "csv"]) == 0
+    assert len((tmp_path / "SampleSheet.json").read_text().splitlines()) == 7
+
+    assert cdi_main(args + ["-o", str(tmp_path / "pairs.txt")]) == 1
+    assert not (tmp_path / "pairs.txt").exists()
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.model.color_balance import ColorBalanceAnalyzer, DARK_CYCLE, FOUR_CHANNEL, LOW_DIVERSITY
+
+
+def _random_sequences(rng, count, length):
+    return ["".join(rng.choice(list("ACGT"), length)) for _ in range(count)]
+
+
+def test_flags_dark_missing_channel_and_low_diversity():
+    """Test that each cycle problem is flagged at the right cycle for 2-channel chemistry."""
+    analyzer = ColorBalanceAnalyzer({"IndexI7": ["GGCA", "GGTA", "GCAA", "GTCC"]})
+
+    report = analyzer.analyse([0, 1])
+    flagged = {(issue.rule, issue.cycle) for issue in report.issues}
+
+    assert flagged == {(DARK_CYCLE, 1), (LOW_DIVERSITY, 1), (DARK_CYCLE, 2), (LOW_DIVERSITY, 2), (LOW_DIVERSITY, 4)}
+    assert report.score == 0.0
+    assert report.compositions["IndexI7"][2].tolist() == [0.0, 0.5, 0.0, 0.5]
+
+    report = analyzer.analyse([1, 3])
+    assert [issue.describe() for issue in report.issues] == ["IndexI7 cycle 1: no signal in any channel",
+                                                             "IndexI7 cycle 1: low diversity, 100% G",
+                                                             "IndexI7 cycle 2: no signal in red channel"]
+    assert [issue.rule for issue in analyzer.analyse([2, 3]).issues] == [DARK_CYCLE, LOW_DIVERSITY]
+
+
+def test_four_channel_reads_g_as_signal():
+    """Test that G and C balance on 4-channel instruments but not on 2-channel ones."""
+    reads = {"IndexI7": ["GC", "CG"]}
+
+    assert ColorBalanceAnalyzer(reads, FOUR_CHANNEL).analyse([0, 1]).ok
+    assert not ColorBalanceAnalyzer(reads).analyse([0, 1]).ok
+
+
+def test_pool_scores_match_single_pool_reports():
+    """Test that batch scores agree with the report of each pool across both reads."""
+    rng = np.random.default_rng(7)
+    analyzer = ColorBalanceAnalyzer({"IndexI7": _random_sequences(rng, 48, 8),
+                                     "IndexI5": _random_sequences(rng, 48, 10)})
+    pools = np.array([rng.choice(48, 4, replace=False) for _ in range(200)])
+
+    scores, flagged = analyzer.score_pools(pools)
+
+    for pool, score, count in zip(pools, scores, flagged):
+        report = analyzer.analyse(pool)
+        assert score == pytest.approx(report.score)
+        assert count == len({(issue.read, issue.cycle) for issue in report.issues})
+
+
+def test_candidates_from_index_table():
+    """Test that table rows without sequences are no candidates."""
+    df = pd.DataFrame({"IndexI7": ["ACGT", None, "TTGA", "CAGC"], "IndexI5": ["GGTA", "AAAA", "", "TCAG"]})
+
+    analyzer = ColorBalanceAnalyzer.from_index_df(df)
+
+    assert analyzer.rows.tolist() == [0, 3]
+    assert analyzer.analyse(analyzer.candidates([0, 3])).rows.tolist() == [0, 3]
+    with pytest.raises(ValueError, match="rows 2"):
+        analyzer.candidates([1])
+
+
+def test_scores_thousands_of_pools_per_second():
+    """Test that 10000 pools of 8 from a 384 index plate are scored well within a second."""
+    rng = np.random.default_rng(3)
+    analyzer = ColorBalanceAnalyzer({"IndexI7": _random_sequences(rng, 384, 10),
+                                     "IndexI5": _random_sequences(rng, 384, 10)})
+    pools = np.array([rng.choice(384, 8, replace=False) for _ in range(10_000)])
+
+    start = time.perf_counter()
+    scores, _ = analyzer.score_pools(pools)
+
+    assert time.perf_counter() - start < 1.0
+    assert len(scores) == 10_000
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from modules.model import column_stats
+from modules.model.index_kit import IndexKit
+
+
+def test_fingerprint_ignores_name_and_index():
+    """Test that equal column contents give equal fingerprints."""
+    first = pd.Series(['ACGT', 'GGCC'], name='a')
+    second = pd.Series(['ACGT', 'GGCC'], name='b', index=[5, 6])
+
+    assert column_stats.column_fingerprint(first) == column_stats.column_fingerprint(second)
+    assert column_stats.column_fingerprint(first) != column_stats.column_fingerprint(first[::-1])
+
+
+def test_fingerprint_tells_apart_values_holding_separators():
+    """Test that moving a unit separator between values changes the fingerprint of an object column."""
+    first = pd.Series(['AC\x1fGT', 'GG'], dtype=object)
+    second = pd.Series(['AC', 'GT\x1fGG'], dtype=object)
+
+    assert column_stats.column_fingerprint(first) != column_stats.column_fingerprint(second)
+
+
+def test_stats_only_recomputed_for_changed_columns(monkeypatch):
+    """Test that a new table version reuses the statistics of unchanged columns."""
+    computed = []
+    count_nonempty = column_stats.count_nonempty
+    monkeypatch.setattr("modules.model.index_kit.count_nonempty",
+                        lambda series: computed.append(series.name) or count_nonempty(series))
+    column_stats.clear_stats()
+
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({'IndexI7': ['ACGTACGT', 'GGCCAATT'], 'IndexI5': ['TTTTAAAA', ' ']})
+    first_version = kit.table_version
+
+    assert (kit.index_count('IndexI7'), kit.index_count('IndexI5')) == (2, 1)
+
+    kit.index_df = kit.source_df.assign(IndexI5=['TTTTAAAA', 'CCCCGGGG'])
+
+    assert kit.table_version > first_version
+    assert (kit.index_count('IndexI7'), kit.index_count('IndexI5')) == (2, 2)
+    assert kit.index_lengths('IndexI7') == (8,)
+    assert computed == ['IndexI7', 'IndexI5', 'IndexI5']
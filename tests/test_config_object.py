@@ -0,0 +1,81 @@
+import pickle
+from pathlib import Path
+
+import pytest
+import yaml
+
+from modules.model.config_object import ConfigObject, load_config_objects
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SINGLE = """
+- ConfigTypeName: 'single'
+  Well: False
+  IndexStrategy: 'single'
+  IndexSets:
+    IndexI7: [ 'IndexI7Name', 'IndexI7' ]
+"""
+
+
+def test_bundled_configs_are_immutable_and_precomputed():
+    """Test that the bundled configs load as immutable objects with field tuples."""
+    configs = load_config_objects()
+    config = configs["combinatorial_dual_indexes_well"]
+
+    assert configs.keys() == load_config_objects(ROOT / "config" / "config_objects.yaml").keys()
+    assert config.all_index_fields == ('WellI7', 'IndexI7Name', 'IndexI7', 'WellI5', 'IndexI5Name', 'IndexI5')
+    assert config.index_set_fields_by_name("IndexI5") == ('WellI5', 'IndexI5Name', 'IndexI5')
+    assert "IndexI5" in config.index_field_set
+
+    with pytest.raises(AttributeError):
+        config.well = False
+    with pytest.raises(TypeError):
+        config.index_sets["IndexI7"] = ()
+
+    assert pickle.loads(pickle.dumps(config)).definition() == config.definition()
+
+
+def test_compiled_configs_are_cached_by_content(tmp_path, monkeypatch):
+    """Test that unchanged YAML is not parsed again and changed YAML is."""
+    path = tmp_path / "configs.yaml"
+    path.write_text(SINGLE)
+    load_config_objects(path)
+
+    monkeypatch.setattr(yaml, "safe_load", lambda source: pytest.fail("parsed a cached config"))
+    assert list(load_config_objects(path)) == ["single"]
+
+    monkeypatch.undo()
+    path.write_text(SINGLE + SINGLE.replace("'single'", "'single_copy'", 1))
+    assert list(load_config_objects(path)) == ["single", "single_copy"]
+
+
+def test_custom_config_keeps_bundled_cache_entry(tmp_path, parse_cache_dir):
+    """Test that caching another YAML file leaves the bundled config's entry in place."""
+    load_config_objects()
+    bundled = sorted(parse_cache_dir.glob("config_objects-*.marshal"))
+
+    path = tmp_path / "configs.yaml"
+    path.write_text(SINGLE)
+    load_config_objects(path)
+    path.write_text(SINGLE.replace("'single'", "'renamed'", 1))
+    load_config_objects(path)
+
+    entries = sorted(parse_cache_dir.glob("config_objects-*.marshal"))
+    assert len(bundled) == 1
+    assert len(entries) == 2 and bundled[0] in entries
+
+
+@pytest.mark.parametrize("text, message", [
+    (SINGLE.replace("  Well: False\n", ""), "single: missing Well"),
+    (SINGLE.replace("False", "'no'"), "single: Well must be a bool"),
+    (SINGLE.replace("'IndexI7Name'", "'IndexI7'"), "index set IndexI7 repeats a field"),
+    (SINGLE + "  Extra: 1\n", "single: unknown keys Extra"),
+    (SINGLE + SINGLE, "config names defined more than once: single"),
+])
+def test_invalid_definitions_are_rejected(tmp_path, text, message):
+    """Test that definitions breaking the schema raise ValueError."""
+    path = tmp_path / "configs.yaml"
+    path.write_text(text)
+
+    with pytest.raises(ValueError, match=message):
+        load_config_objects(path)
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from modules.model.load import csv_index_data
+from modules.model.load.csv_index_data import CsvIndexData, iter_delimited_chunks, sniff_csv, SNIFF_SAMPLE_BYTES
+
+
+def test_utf16_tab_separated(tmp_path):
+    """Test that a BOM marked UTF-16 file with tabs is detected and read."""
+    path = tmp_path / "indexes.csv"
+    path.write_text("Name\tIndexI7\nIndex1\tACGTACGT\nIndex2\tGGCCAATT\n", encoding="utf-16")
+
+    data = CsvIndexData(path, None)
+
+    assert (data.encoding, data.delimiter) == ("utf-16", "\t")
+    assert data.indexes["IndexI7"].tolist() == ["ACGTACGT", "GGCCAATT"]
+
+
+def test_values_are_read_as_strings(tmp_path):
+    """Test that numeric looking cells keep their text and blank headers get names."""
+    path = tmp_path / "indexes.csv"
+    path.write_bytes("Well;Nr;;\nA01;007;x;y\nB01;010;;\n".encode("latin-1"))
+
+    data = CsvIndexData(path, None)
+
+    assert data.delimiter == ";"
+    assert list(data.indexes.columns) == ["Well", "Nr", "Unnamed: 2", "Unnamed: 3"]
+    assert data.indexes["Nr"].tolist() == ["007", "010"]
+
+
+def test_sniffing_reads_a_bounded_sample(tmp_path):
+    """Test that sniffing a large file ignores what lies beyond the sample."""
+    path = tmp_path / "large.csv"
+    line = "Name,IndexI7\n" + "Index,ACGTACGT\n" * (SNIFF_SAMPLE_BYTES // 10)
+    path.write_text(line + "\xe9;\xe9;\xe9\n", encoding="latin-1")
+
+    assert sniff_csv(path) == ("utf-8", ",")
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+def test_chunks_keep_only_requested_columns(tmp_path, monkeypatch, engine):
+    """Test that chunked reading returns the requested columns in chunks of the given size."""
+    monkeypatch.setattr(csv_index_data, "CSV_ENGINE", engine)
+    path = tmp_path / "indexes.csv"
+    path.write_text("Name,IndexI7,\n" + "".join(f"Index{i},00{i},x\n" for i in range(7)))
+
+    chunks = list(iter_delimited_chunks(path, "utf-8", ",", ["IndexI7", "Unnamed: 2"], chunk_rows=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert list(chunks[0].columns) == ["IndexI7", "Unnamed: 2"]
+    assert pd.concat(chunks)["IndexI7"].tolist() == [f"00{i}" for i in range(7)]
@@ -10,8 +10,8 @@ def test_data_manager_initialization(data_manager):
     """Test that DataManager initializes with default values."""
     assert data_manager is not None
     assert hasattr(data_manager, '_user')
-    assert hasattr(data_manager, '_import_filepath')
-    assert isinstance(data_manager._index_df, pd.DataFrame)
+    assert data_manager.import_filepath is None
+    assert isinstance(data_manager.index_df, pd.DataFrame)
 
 def test_dna_sequence_validation(data_manager):
     """Test DNA sequence validation using the internal regex."""
@@ -35,22 +35,66 @@ def test_index_data_handling(data_manager):
     })
     
     # Set the index data
-    data_manager._index_df = test_df
+    data_manager.set_index_df(test_df)
     
     # Verify the data was set
-    assert len(data_manager._index_df) == 2
-    assert all(col in data_manager._index_df.columns for col in ['i7_name', 'i7', 'i5_name', 'i5'])
+    assert len(data_manager.index_df) == 2
+    assert all(col in data_manager.index_df.columns for col in ['i7_name', 'i7', 'i5_name', 'i5'])
+    assert data_manager.kit.index_df is test_df
 
 def test_kit_settings(data_manager):
     """Test kit settings properties."""
     # Test kit name
-    data_manager._index_kit_name = "Test Kit"
-    assert data_manager._index_kit_name == "Test Kit"
+    data_manager.set_index_kit_name("Test Kit")
+    assert data_manager.index_kit_name == "Test Kit"
     
     # Test version
-    data_manager._version = "1.0"
-    assert data_manager._version == "1.0"
+    data_manager.set_version("1.0")
+    assert data_manager.version == "1.0"
     
     # Test description
-    data_manager._description = "Test Description"
-    assert data_manager._description == "Test Description"
+    data_manager.set_description("Test Description")
+    assert data_manager.description == "Test Description"
+
+def test_column_mapping(data_manager):
+    """Test that relabelling columns maps labels without replacing the table."""
+    test_df = pd.DataFrame({
+        'name': ['Index1', 'Index2'],
+        'seq': ['ACGTACGT', 'GCTAGCTA'],
+    })
+    data_manager.set_index_df(test_df)
+
+    table_changes = []
+    data_manager.index_df_changed.connect(lambda: table_changes.append(True))
+
+    data_manager.set_column_mapping({'seq': 'IndexI7'})
+
+    assert not table_changes
+    assert data_manager.source_index_df is test_df
+    assert list(data_manager.index_df.columns) == ['name', 'IndexI7']
+    assert data_manager.index_i7_count == 2
+
+def test_batched_updates_notify_once(data_manager):
+    """Test that a batch of changes is committed as one change set."""
+    change_sets = []
+    table_changes = []
+    data_manager.changes_committed.connect(change_sets.append)
+    data_manager.index_df_changed.connect(lambda: table_changes.append(True))
+
+    test_df = pd.DataFrame({'IndexI7': ['ACGTACGT', 'GCTAGCTA']})
+
+    with data_manager.batch_update():
+        data_manager.set_index_kit_name("Kit")
+        data_manager.set_index_df(test_df)
+        with data_manager.batch_update():
+            data_manager.set_version("1.0")
+        data_manager.set_version("2.0")
+        data_manager.set_description("")
+
+        assert not change_sets
+
+    assert len(change_sets) == 1
+    assert list(change_sets[0]) == ['index_kit_name', 'index_df', 'version', 'index_i7_count']
+    assert change_sets[0]['version'] == ("", "2.0")
+    assert change_sets[0]['index_i7_count'] == (0, 2)
+    assert len(table_changes) == 1
@@ -0,0 +1,127 @@
+import json
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from modules.model.config_object import load_config_objects
+from modules.model.index_kit import IndexKit, load_index_kit, map_index_columns, validate_index_kit, \
+    export_index_kit, index_kit_validation, load_index_kit_chunked
+
+ROOT = Path(__file__).resolve().parent.parent
+DEMO_TSV = ROOT / "demo" / "ILMN_DNA_RNA_UD_IndexesSetA_Tagmentation.tsv"
+
+
+@pytest.fixture
+def configs():
+    return load_config_objects(ROOT / "config" / "config_objects.yaml")
+
+
+def test_load_illumina_kit():
+    """Test that an Illumina TSV loads into a plain IndexKit."""
+    kit = load_index_kit(DEMO_TSV, "tsv_ilmn")
+
+    assert kit.index_kit_name == "Ilmn DNA-RNA UD Indexes SetA Tagmentation"
+    assert kit.adapter_read_1 == "CTGTCTCTTATACACATCT"
+    assert kit.index_i7_count == 96
+    assert kit.index_i5_count == 96
+    assert not hasattr(kit, "__dict__")
+
+
+def test_load_illumina_kit_without_fixed_layout():
+    """Test that a kit without fixed positions loads its i7 and i5 indexes side by side."""
+    kit = load_index_kit(ROOT / "demo" / "ILMN_DNA_RNA_UD_IndexesSetD_Tag_NoFix.tsv", "tsv_ilmn")
+
+    assert kit.ilmn_fixed_layout == ""
+    assert list(kit.index_df.columns) == ['IndexI7Name', 'IndexI7', 'IndexI5Name', 'IndexI5']
+    assert kit.index_i7_count == 96
+    assert kit.index_df["IndexI5"].notna().all()
+
+
+def test_index_kit_pickles():
+    """Test that a kit survives a round trip to a worker process."""
+    kit = load_index_kit(DEMO_TSV, "tsv_ilmn")
+    restored = pickle.loads(pickle.dumps(kit))
+
+    assert restored.index_kit_name == kit.index_kit_name
+    assert restored.index_df.equals(kit.index_df)
+
+
+def test_map_validate_export(configs, tmp_path):
+    """Test the load, map, validate and export pipeline."""
+    config = configs["unique_dual_indexes_well"]
+    kit = load_index_kit(DEMO_TSV, "tsv_ilmn")
+
+    with pytest.raises(ValueError, match="all fields not set"):
+        validate_index_kit(kit, config)
+
+    mapped = map_index_columns(kit, {"Well": "WellDual"})
+    assert "Well" in kit.index_df.columns
+
+    target = tmp_path / "kit.json"
+    export_index_kit(mapped, config, target)
+
+    data = json.loads(target.read_text())
+    assert data["IndexI7Len"] == 10
+    assert len(data["IndexSets"]["IndexDual"]) == 96
+
+
+def test_collisions_are_returned_not_exported(configs, tmp_path):
+    """Test that near-collisions are reported to the caller and kept out of the kit document."""
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({
+        'IndexI7Name': ['Index1', 'Index2', 'Index3'],
+        'IndexI7': ['ACGTACGT', 'ACGTACGA', 'TTTTGGGG'],
+    })
+
+    target = tmp_path / "kit.json"
+    reports = export_index_kit(kit, configs["single"], target)
+
+    assert [report.collision_count for report in reports] == [1]
+    assert "IndexCollisions" not in json.loads(target.read_text())
+
+
+def test_duplicate_index_is_rejected(configs):
+    """Test that duplicate index sequences fail validation."""
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({
+        'IndexI7Name': ['Index1', 'Index2'],
+        'IndexI7': ['ACGTACGT', 'ACGTACGT'],
+    })
+
+    with pytest.raises(ValueError, match="duplicate values in IndexI7"):
+        validate_index_kit(kit, configs["single"])
+
+
+def test_chunked_load_matches_full_load(configs, tmp_path):
+    """Test that a chunked load keeps only the config columns and finds the same violations."""
+    config = configs["single"]
+    path = tmp_path / "large.csv"
+    sequences = ["AACC", "AAGG", "AATT", "CCAA", "CCGG", "CCTT", "GGAA", "GGNN", "GGTT", "AAGG"]
+    path.write_text("Name,Seq,Notes\n" + "".join(f"I{i},{seq},note{i}\n" for i, seq in enumerate(sequences)))
+    column_map = {"Name": "IndexI7Name", "Seq": "IndexI7"}
+
+    reports = []
+    kit, report, stats = load_index_kit_chunked(path, config, column_map, chunk_rows=3,
+                                                progress=lambda percent, message: reports.append(percent))
+    full = map_index_columns(load_index_kit(path, "csv", use_cache=False), column_map)
+
+    assert list(kit.source_df.columns) == ["Name", "Seq"]
+    assert (stats.rows, stats.chunks) == (10, 4)
+    assert stats.peak_bytes > 0
+    assert reports == sorted(reports) and len(set(reports[1:5])) == 4 and max(reports[:5]) < 80
+    assert kit.index_i7_count == 10
+    assert [violation.to_dict() for violation in report.violations] == \
+           [violation.to_dict() for violation in index_kit_validation(full, config).violations]
+    assert {violation.rule for violation in report.violations} == {"invalid_sequence", "duplicate_value"}
+
+
+def test_core_does_not_import_qt():
+    """Test that the kit pipeline can be used without PySide6."""
+    code = "import sys, modules.model.index_kit, modules.model.batch_convert; print('PySide6' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "False"
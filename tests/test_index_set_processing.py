@@ -0,0 +1,70 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from modules.model.index_set_processing import hamming_pairs, index_set_collisions, edit_distance_pairs, LEVENSHTEIN
+from modules.model.sequence_store import PackedSequences
+
+
+def test_hamming_pairs_match_brute_force():
+    """Test pigeonhole candidates find exactly the pairs a full comparison finds."""
+    rng = np.random.default_rng(7)
+    sequences = [''.join(rng.choice(list("ACGT"), size=8)) for _ in range(400)]
+
+    pairs, distances = hamming_pairs(PackedSequences.from_strings(sequences), 2)
+
+    expected = {(i, j): sum(a != b for a, b in zip(sequences[i], sequences[j]))
+                for i, j in combinations(range(len(sequences)), 2)}
+    expected = {pair: distance for pair, distance in expected.items() if distance <= 2}
+
+    assert dict(zip(map(tuple, pairs.tolist()), distances.tolist())) == expected
+
+
+def _levenshtein(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, base in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, other in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (base != other))
+    return row[-1]
+
+
+def test_edit_distance_pairs_match_brute_force():
+    """Test banded edit distances across mixed lengths against a plain dynamic programme."""
+    rng = np.random.default_rng(11)
+    base = [''.join(rng.choice(list("ACGT"), size=10)) for _ in range(60)]
+    sequences = base + [seq[:8] for seq in base[:30]] + [seq[1:] for seq in base[30:]] + ['', 'AC']
+
+    pairs, distances = edit_distance_pairs(PackedSequences.from_strings(sequences), 2, chunk_size=500)
+
+    expected = {(i, j): _levenshtein(sequences[i], sequences[j]) for i, j in combinations(range(len(sequences)), 2)}
+    expected = {pair: distance for pair, distance in expected.items() if distance <= 2}
+
+    assert dict(zip(map(tuple, pairs.tolist()), distances.tolist())) == expected
+
+
+def test_mixed_length_set_uses_edit_distance():
+    """Test that a set mixing 8 and 10 bp indexes reports trimmed indexes as collisions."""
+    df = pd.DataFrame({'IndexI7': ['ACGTACGTAC', 'ACGTACGT', 'TTTTGGGGCC']})
+
+    report, = index_set_collisions(df, {'IndexSingle': ['IndexI7']})
+
+    assert report.metric == LEVENSHTEIN
+    assert report.to_dict()['Pairs'] == [{'Index1': 'ACGTACGTAC', 'Index2': 'ACGTACGT', 'Distance': 2}]
+
+
+def test_dual_index_collisions():
+    """Test i7, i5 and combined reports for a unique dual index set."""
+    df = pd.DataFrame({
+        'IndexI7': ['AAAAAAAA', 'AAAAAAAT', 'CCCCCCCC'],
+        'IndexI5': ['GGGGGGGG', 'TTTTTTTT', 'GGGGGGGA'],
+    })
+
+    reports = index_set_collisions(df, {'IndexDual': ['IndexI7', 'IndexI5']}, max_distance=2)
+    by_label = {report.label: report for report in reports}
+
+    assert by_label['IndexI7'].min_distance == 1
+    assert by_label['IndexI5'].min_distance == 1
+    assert by_label['IndexI7+IndexI5'].min_distance is None
+    assert by_label['IndexI7'].to_dict()['Pairs'] == [{'Index1': 'AAAAAAAA', 'Index2': 'AAAAAAAT', 'Distance': 1}]
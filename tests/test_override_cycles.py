@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit, export_index_kit
+from modules.model.override_cycles import compile_override_cycles, kit_override_cycles, parse_run_cycles
+from modules.model.samplesheet import compile_sample_sheet
+
+UDI = ConfigObject({
+    "ConfigTypeName": "unique_dual_indexes",
+    "Well": False,
+    "IndexStrategy": "udi",
+    "IndexSets": {"IndexDual": ["IndexI7Name", "IndexI7", "IndexI5Name", "IndexI5"]},
+})
+
+
+def _mixed_length_kit():
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({
+        "IndexI7Name": ["A", "B", "C"],
+        "IndexI7": ["ACGTACGT", "CATGCATGCA", "GTCAGTCAGT"],
+        "IndexI5Name": ["A", "B", "C"],
+        "IndexI5": ["TTGGCCAA", "AACCGGTTAC", "GGTTAACCTT"],
+    }, dtype="str")
+    return kit
+
+
+def test_sample_override_cycles_mask_short_indexes_and_keep_umis():
+    """ Each length combination gets its own string, shorter indexes are padded with N. """
+    pattern = compile_override_cycles("U8Y{r}", "I{i}U9", "I{i}", "Y{r}")
+
+    cycles = pattern.sample_override_cycles((151, 19, 10, 151), {
+        "IndexI7": np.array([8, 10, 8]),
+        "IndexI5": np.array([8, 10, 0]),
+    })
+
+    assert cycles.tolist() == [
+        "U8Y143;I8U9N2;I8N2;Y151",
+        "U8Y143;I10U9;I10;Y151",
+        "U8Y143;I8U9N2;N10;Y151",
+    ]
+    assert compile_override_cycles("U8Y{r}", "I{i}U9", "I{i}", "Y{r}") is pattern
+
+
+@pytest.mark.parametrize("patterns, message", [
+    (("Y{i}", "I{i}", "I{i}", "Y{r}"), "use {r}"),
+    (("Y{r}", "I{i}I{i}", "I{i}", "Y{r}"), "only be used once"),
+    (("Y{r}", "Y8", "I{i}", "Y{r}"), "Y is not one of"),
+    (("Y151 ", "I{i}", "I{i}", "Y{r}"), "Invalid read override cycles"),
+])
+def test_invalid_patterns_are_rejected(patterns, message):
+    """ Patterns outside the grammar raise ValueError when compiled. """
+    with pytest.raises(ValueError, match=message):
+        compile_override_cycles(*patterns)
+
+
+def test_indexes_longer_than_the_run_are_rejected():
+    """ An index needing more cycles than the run has cannot be demultiplexed. """
+    pattern = compile_override_cycles("Y{r}", "I{i}", "I{i}", "Y{r}")
+
+    with pytest.raises(ValueError, match="need 10 cycles, the read has 8"):
+        pattern.sample_override_cycles((151, 8, 8, 151), {"IndexI7": np.array([10]), "IndexI5": np.array([8])})
+
+    with pytest.raises(ValueError, match="Invalid run cycles"):
+        parse_run_cycles("151,10,151")
+
+
+def test_mixed_length_kit_exports_and_compiles(tmp_path):
+    """ Kits mixing 8 and 10 bp indexes export, and their samples get per-sample OverrideCycles. """
+    kit = _mixed_length_kit()
+    export_index_kit(kit, UDI, tmp_path / "kit.json")
+
+    data = json.loads((tmp_path / "kit.json").read_text())
+    assert (data["IndexI7Len"], data["IndexI5Len"]) == (10, 10)
+    assert data["OverrideCyclesPattern"] == kit_override_cycles(kit).text == "Y{r}-I{i}-I{i}-Y{r}"
+
+    sheet = compile_sample_sheet(kit, UDI, pd.DataFrame({"Sample_ID": ["S1", "S2"]}), run_cycles=(151, 10, 10, 151))
+
+    assert sheet.data["OverrideCycles"].tolist() == ["Y151;I8N2;I8N2;Y151", "Y151;I10;I10;Y151"]
+    assert sheet.reads == {"Read1Cycles": 151, "Index1Cycles": 10, "Index2Cycles": 10, "Read2Cycles": 151}
+    assert sheet.lane_checks[0].mixed_lengths == ["IndexI7", "IndexI5"]
@@ -0,0 +1,74 @@
+import logging
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from modules.model.index_kit import IndexKit, load_index_kit
+from modules.model.load.parse_cache import ParseCache, file_content_key, default_parse_cache
+
+ROOT = Path(__file__).resolve().parent.parent
+DEMO_TSV = ROOT / "demo" / "ILMN_DNA_RNA_UD_IndexesSetA_Tagmentation.tsv"
+
+
+def test_repeat_load_hits_cache(tmp_path):
+    """Test that a copy of an already loaded file comes from the cache under its own path."""
+    kit = load_index_kit(DEMO_TSV, "tsv_ilmn")
+
+    copied = tmp_path / "copy.tsv"
+    shutil.copy(DEMO_TSV, copied)
+    cached = load_index_kit(copied, "tsv_ilmn")
+
+    assert cached.import_filepath == str(copied)
+    assert cached.index_kit_name == kit.index_kit_name
+    assert cached.index_df.equals(kit.index_df)
+    assert len(list(default_parse_cache().cache_dir.glob("*.parquet"))) == 1
+
+
+def test_disk_cache_is_shared(parse_cache_dir):
+    """Test that a fresh cache, as in another process, reads the kit back from Parquet."""
+    kit = load_index_kit(DEMO_TSV, "tsv_ilmn")
+    key = file_content_key(DEMO_TSV, "tsv_ilmn")
+
+    restored = ParseCache(parse_cache_dir).get(key)
+
+    assert restored.checksum == kit.checksum
+    assert restored.index_i7_count == 96
+    assert restored.index_df.equals(kit.index_df)
+
+
+def test_disk_cache_evicts_oldest(tmp_path):
+    """Test that the oldest entries are dropped once the cache outgrows its size limit."""
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({'IndexI7': ['ACGTACGT']})
+
+    ParseCache(tmp_path / "probe").put("probe", kit)
+    entry_size = (tmp_path / "probe" / "probe.parquet").stat().st_size
+
+    cache = ParseCache(tmp_path / "cache", max_disk_bytes=entry_size + entry_size // 2)
+    cache.put("first", kit)
+    cache.put("second", kit)
+
+    assert [path.name for path in (tmp_path / "cache").glob("*.parquet")] == ["second.parquet"]
+    assert cache.get("first").index_df.equals(kit.index_df)
+
+
+def test_parse_messages_are_replayed_from_cache(tmp_path, parse_cache_dir, caplog):
+    """Test that header fixes found on the first parse are logged again when the kit comes from the cache."""
+    path = tmp_path / "indexes.csv"
+    path.write_text("Name,IndexI7,,IndexI7\nIndex1,ACGTACGT,x,ACGTACGT\n")
+    logger = logging.getLogger("test_parse_messages")
+
+    with caplog.at_level(logging.WARNING, logger="test_parse_messages"):
+        kit = load_index_kit(path, "csv", logger)
+        first = [record.getMessage() for record in caplog.records]
+        caplog.clear()
+
+        load_index_kit(path, "csv", logger)
+        replayed = [record.getMessage() for record in caplog.records]
+
+    assert first == replayed == [
+        "indexes.csv: Blank header named 'Unnamed: 2'",
+        "indexes.csv: Repeated header 'IndexI7' renamed 'IndexI7.1'",
+    ]
+    assert ParseCache(parse_cache_dir).get(file_content_key(path, "csv")).parse_messages == kit.parse_messages
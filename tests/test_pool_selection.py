@@ -0,0 +1,98 @@
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.model.config_object import ConfigObject
+from modules.model.pool_selection import _PoolSearch, pool_candidates, select_index_pool
+
+UDI_WELL = ConfigObject({
+    "ConfigTypeName": "unique_dual_indexes_well",
+    "Well": True,
+    "IndexStrategy": "DualOnly",
+    "IndexSets": {"IndexDual": ["WellDual", "IndexI7Name", "IndexI7", "IndexI5Name", "IndexI5"]},
+})
+
+CDI = ConfigObject({
+    "ConfigTypeName": "combinatorial_dual_indexes",
+    "Well": False,
+    "IndexStrategy": "Combinatorial",
+    "IndexSets": {"IndexI7": ["IndexI7Name", "IndexI7"], "IndexI5": ["IndexI5Name", "IndexI5"]},
+})
+
+
+def _udi_df(count=10, seed=3):
+    rng = np.random.default_rng(seed)
+    sequences = ["".join(rng.choice(list("ACGT"), 8)) for _ in range(2 * count)]
+    return pd.DataFrame({
+        "WellDual": [f"{row}01" for row in "ABCDEFGHIJKLMNOP"[:count]],
+        "IndexI7Name": [f"D7{i:02}" for i in range(count)],
+        "IndexI7": sequences[:count],
+        "IndexI5Name": [f"D5{i:02}" for i in range(count)],
+        "IndexI5": sequences[count:],
+    }, dtype="str")
+
+
+def test_search_finds_best_pool_of_small_kit():
+    """ Local search reaches the optimum found by trying every pool. """
+    candidates = pool_candidates(_udi_df(), UDI_WELL)
+    search = _PoolSearch(candidates, 4, "two_channel", 0.8)
+
+    best = max(search.objective(np.array(pool)) for pool in itertools.combinations(range(candidates.size), 4))
+
+    selection = select_index_pool(_udi_df(), UDI_WELL, 4, time_budget=0.3, workers=1)
+    assert selection.balance.ok == (best[0] == 0)
+    assert selection.min_distance == best[1]
+    assert selection.balance.score == pytest.approx(best[2])
+
+
+def test_selection_keeps_to_wells():
+    """ Only indexes in the given wells are picked, with their table rows. """
+    df = _udi_df()
+    selection = select_index_pool(df, UDI_WELL, 3, time_budget=0.1, workers=1, wells=["A01", "C01", "E01", "G01"])
+
+    assert set(selection.wells["IndexI7"]) <= {"A01", "C01", "E01", "G01"}
+    for row, sequence in zip(selection.rows["IndexI7"], selection.sequences["IndexI7"]):
+        assert df["IndexI7"][row] == sequence
+
+    with pytest.raises(ValueError, match="Cannot select 5"):
+        select_index_pool(df, UDI_WELL, 5, time_budget=0.1, workers=1, wells=["A01", "C01", "E01", "G01"])
+
+    with pytest.raises(ValueError, match="no wells"):
+        select_index_pool(df, CDI, 2, time_budget=0.1, workers=1, wells=["A01"])
+
+
+def test_combinatorial_pools_pair_every_i7_with_every_i5():
+    """ CDI candidates are all I7 and I5 combinations, and parallel search returns distinct pairs. """
+    df = _udi_df(6)
+    df.loc[4:, "IndexI5"] = ""
+
+    candidates = pool_candidates(df, CDI)
+    assert candidates.size == 6 * 4
+
+    selection = select_index_pool(df, CDI, 8, time_budget=0.5, workers=2)
+    pairs = set(zip(selection.sequences["IndexI7"], selection.sequences["IndexI5"]))
+    assert len(pairs) == 8
+    assert selection.to_dict()["MinHammingDistance"] == selection.min_distance
+
+
+def test_selecting_nearly_every_candidate():
+    """ Kicks out of a local optimum never draw more candidates than are left outside the pool. """
+    candidates = pool_candidates(_udi_df(16), UDI_WELL)
+    search = _PoolSearch(candidates, 15, "two_channel", 0.8)
+
+    pool, _, _ = search.search(seed=0, deadline=time.time() + 0.3)
+    assert len(set(pool.tolist())) == 15
+
+    selection = select_index_pool(_udi_df(16), UDI_WELL, 15, time_budget=0.1, workers=1)
+    assert len(set(selection.rows["IndexI7"])) == 15
+
+
+def test_greedy_seeding_stops_at_deadline():
+    """ A pool is still filled with distinct candidates when the deadline passes during seeding. """
+    search = _PoolSearch(pool_candidates(_udi_df(16), UDI_WELL), 12, "two_channel", 0.8)
+
+    pool = search.greedy(np.random.default_rng(0), deadline=time.time() - 1)
+    assert len(set(pool.tolist())) == 12
@@ -0,0 +1,130 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from index_tool import samplesheet_main
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit, export_index_kit
+from modules.model.samplesheet import check_lane, compile_sample_sheet, load_kit
+
+UDI_WELL = ConfigObject({
+    "ConfigTypeName": "unique_dual_indexes_well",
+    "Well": True,
+    "IndexStrategy": "udi",
+    "IndexSets": {"IndexDual": ["WellDual", "IndexI7Name", "IndexI7", "IndexI5Name", "IndexI5"]},
+})
+
+
+def _kit(count=4):
+    kit = IndexKit()
+    kit.adapter_read_1 = "CTGTCTCTTATACACATCT"
+    kit.index_df = pd.DataFrame({
+        "WellDual": ["A01", "B01", "C01", "D01", "E01", "F01"][:count],
+        "IndexI7Name": [f"UDP{i:04}" for i in range(1, count + 1)],
+        "IndexI7": ["AAAAAAAA", "CCCCCCCC", "GGGGGGGG", "TTTTTTTT", "ACACACAC", "GTGTGTGT"][:count],
+        "IndexI5Name": [f"UDP{i:04}" for i in range(1, count + 1)],
+        "IndexI5": ["ACGTACGT", "CATGCATG", "GTCAGTCA", "TGACTGAC", "AACCGGTT", "TTGGCCAA"][:count],
+    }, dtype="str")
+    return kit
+
+
+def test_samples_get_named_and_free_indexes_per_lane():
+    """ Samples named by well keep their index, the others get the first index free in all their lanes. """
+    manifest = pd.DataFrame({
+        "Sample_ID": ["S1", "S2", "S3", "S4"],
+        "Lane": ["1", "1+2", "2", "2"],
+        "WellDual": ["C01", "", "", "A01"],
+    })
+
+    sheet = compile_sample_sheet(_kit(), UDI_WELL, manifest)
+
+    assert sheet.ok
+    assert sheet.data.to_dict(orient="list") == {
+        "Lane": [1, 1, 2, 2, 2],
+        "Sample_ID": ["S1", "S2", "S2", "S3", "S4"],
+        "Index": ["GGGGGGGG", "CCCCCCCC", "CCCCCCCC", "GGGGGGGG", "AAAAAAAA"],
+        "Index2": ["GTCAGTCA", "CATGCATG", "CATGCATG", "GTCAGTCA", "ACGTACGT"],
+    }
+    assert sheet.to_csv().splitlines()[3:8] == [
+        "[BCLConvert_Settings]",
+        "AdapterRead1,CTGTCTCTTATACACATCT",
+        "BarcodeMismatchesIndex1,1",
+        "BarcodeMismatchesIndex2,1",
+        "",
+    ]
+
+
+@pytest.mark.parametrize("barcode_mismatches", [0, 1, 2])
+def test_lane_check_matches_brute_force(barcode_mismatches):
+    """ Pairs within twice the tolerance on both reads are found, repeated indexes included. """
+    rng = np.random.default_rng(barcode_mismatches)
+    i7 = ["".join(rng.choice(list("ACG"), 5)) for _ in range(150)]
+    i5 = ["".join(rng.choice(list("AC"), 5)) for _ in range(150)]
+    i7[10] = i7[20] = i7[30]
+
+    check = check_lane(1, [f"S{i}" for i in range(150)], {"IndexI7": i7, "IndexI5": i5}, barcode_mismatches)
+
+    def distance(first, second):
+        return sum(a != b for a, b in zip(first, second))
+
+    expected = {(a, b) for a, b in itertools.combinations(range(150), 2)
+                if distance(i7[a], i7[b]) <= 2 * barcode_mismatches and distance(i5[a], i5[b]) <= 2 * barcode_mismatches}
+
+    assert set(map(tuple, check.pairs.tolist())) == expected
+    if expected:
+        worst = min(max((distance(i7[a], i7[b]) + 1) // 2, (distance(i5[a], i5[b]) + 1) // 2) for a, b in expected)
+        assert check.max_mismatches == worst - 1
+
+
+def test_manifest_errors():
+    """ Unknown wells, partly named samples and too many samples are reported. """
+    kit = _kit(2)
+
+    with pytest.raises(ValueError, match="no index with WellDual=H12"):
+        compile_sample_sheet(kit, UDI_WELL, pd.DataFrame({"Sample_ID": ["S1"], "WellDual": ["H12"]}))
+
+    with pytest.raises(ValueError, match="give all of"):
+        compile_sample_sheet(kit, UDI_WELL, pd.DataFrame({"Sample_ID": ["S1"], "WellDual": ["A01"],
+                                                          "IndexI7Name": [""]}))
+
+    with pytest.raises(ValueError, match="Not enough indexes"):
+        compile_sample_sheet(kit, UDI_WELL, pd.DataFrame({"Sample_ID": ["S1", "S2", "S3"]}))
+
+    with pytest.raises(ValueError, match="listed twice in lane 1"):
+        compile_sample_sheet(kit, UDI_WELL, pd.DataFrame({"Sample_ID": ["S1", "S1"], "Lane": ["1", "1+2"]}))
+
+
+def test_exported_kit_json_loads_back(tmp_path):
+    """ A kit exported to JSON compiles the same sheet as the kit itself. """
+    kit = _kit()
+    export_index_kit(kit, UDI_WELL, tmp_path / "kit.json")
+
+    manifest = pd.DataFrame({"Sample_ID": ["S1", "S2"], "WellDual": ["", "D01"]})
+    loaded = load_kit(tmp_path / "kit.json")
+
+    assert loaded.adapter_read_1 == kit.adapter_read_1
+    assert (compile_sample_sheet(loaded, UDI_WELL, manifest).to_csv()
+            == compile_sample_sheet(kit, UDI_WELL, manifest).to_csv())
+
+
+def test_samplesheet_command_refuses_collisions_unless_forced(tmp_path):
+    """ Colliding lanes exit non-zero and write nothing, --force writes the sheet but still exits non-zero. """
+    kit_path = tmp_path / "kit.csv"
+    kit_path.write_text("WellDual,IndexI7Name,IndexI7,IndexI5Name,IndexI5\n"
+                        "A01,U1,AAAAAAAA,U1,ACGTACGT\nB01,U2,AAAAAAAC,U2,ACGTACGA\nC01,U3,GGGGGGGG,U3,TGCATGCA\n")
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("Sample_ID,WellDual\nS1,A01\nS2,B01\n")
+    output = tmp_path / "SampleSheet.csv"
+    args = [str(kit_path), str(manifest), "-c", "unique_dual_indexes_well", "-o", str(output)]
+
+    assert samplesheet_main(args) == 1
+    assert not output.exists()
+
+    assert samplesheet_main(args + ["--force"]) == 1
+    assert "S1,AAAAAAAA,ACGTACGT" in output.read_text()
+
+    output.unlink()
+    assert samplesheet_main(args + ["--barcode-mismatches", "0"]) == 0
+    assert "S2,AAAAAAAC,ACGTACGA" in output.read_text()
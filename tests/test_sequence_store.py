@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.model.index_set_processing import packed_index_column
+from modules.model.sequence_store import PackedSequences
+
+
+def test_round_trip_mixed_lengths():
+    """Test that packing and unpacking keeps sequences of any length."""
+    sequences = ["ACGTACGT", "GGTTAACCGA", "T" * 40, "acgt"]
+    packed = PackedSequences.from_strings(sequences)
+
+    assert packed.to_strings() == ["ACGTACGT", "GGTTAACCGA", "T" * 40, "ACGT"]
+    assert packed.lengths.tolist() == [8, 10, 40, 4]
+    assert packed.words.shape == (4, 2)
+
+
+def test_reverse_complement():
+    """Test the vectorized reverse complement against the definition."""
+    packed = PackedSequences.from_strings(["AACGTT", "ACCGT", "GATTACA"])
+
+    assert packed.reverse_complement().to_strings() == ["AACGTT", "ACGGT", "TGTAATC"]
+
+
+def test_hashes_follow_sequence_equality():
+    """Test that equal sequences hash equal and a length change alters the hash."""
+    hashes = PackedSequences.from_strings(["ACGTACGT", "ACGTACGT", "ACGTACGTA", "ACGTACGA"]).hashes()
+
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[1]
+    assert len(set(hashes.tolist())) == 3
+
+
+def test_invalid_base_is_rejected():
+    """Test that non ACGT characters are refused."""
+    with pytest.raises(ValueError, match="ACGN"):
+        PackedSequences.from_strings(["ACGT", "ACGN"])
+
+
+def test_packed_index_column_skips_empty_cells():
+    """Test packing a DataFrame index column with blank cells."""
+    df = pd.DataFrame({"IndexI7": ["ACGTACGT", " ", None, "GGTTAACC"]})
+
+    assert packed_index_column(df, "IndexI7").to_strings() == ["ACGTACGT", "GGTTAACC"]
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Generous budgets that still catch pandas or a loader creeping back into startup,
+# which roughly doubles both times
+IMPORT_BUDGET_SECONDS = 1.5
+FIRST_PAINT_BUDGET_SECONDS = 3.0
+
+# Imported on first use only, never before the window is painted
+DEFERRED_MODULES = (
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "openpyxl",
+    "python_calamine",
+    "modules.model.load.csv_index_data",
+    "modules.model.load.xlsx_index_data",
+    "modules.model.load.tsv_illumina_index_data",
+    "modules.model.index_set_processing",
+    "modules.model.validation",
+)
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+
+from PySide6.QtCore import QEvent, QObject, QTimer
+from modules.controller.controller import MainController
+from modules.view.application import Application
+
+imported = time.perf_counter() - start
+app = Application([])
+timings = {"import": imported}
+deferred = sys.argv[1:]
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and "first_paint" not in timings:
+            timings["first_paint"] = time.perf_counter() - start
+            timings["loaded"] = [name for name in deferred if name in sys.modules]
+            QTimer.singleShot(0, app.quit)
+        return False
+
+
+controller = MainController()
+first_paint = FirstPaint()
+controller.main_window.installEventFilter(first_paint)
+controller.main_window.show()
+
+QTimer.singleShot(30000, app.quit)
+app.exec()
+print(json.dumps(timings))
+"""
+
+
+def test_startup_budget():
+    """Test that the window paints within budget without importing pandas or the loaders."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, *DEFERRED_MODULES], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert timings["loaded"] == []
+    assert timings["import"] < IMPORT_BUDGET_SECONDS
+    assert timings["first_paint"] < FIRST_PAINT_BUDGET_SECONDS
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PySide6.QtCore import QThreadPool
+
+from modules.model.index_kit import load_index_kit
+from modules.model.load import csv_index_data, tsv_illumina_index_data
+from modules.model.task_worker import TaskWorker
+
+ROOT = Path(__file__).resolve().parent.parent
+DEMO_TSV = ROOT / "demo" / "ILMN_DNA_RNA_UD_IndexesSetA_Tagmentation.tsv"
+
+
+def _wait(qapp, predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+    assert predicate()
+
+
+def _run(qapp, worker: TaskWorker) -> dict:
+    events = {"progress": []}
+    worker.signals.progress.connect(lambda percent, message: events["progress"].append(percent))
+    worker.signals.result.connect(lambda result: events.update(result=result))
+    worker.signals.error.connect(lambda message: events.update(error=message))
+    worker.signals.cancelled.connect(lambda: events.update(cancelled=True))
+    worker.signals.finished.connect(lambda: events.update(finished=True))
+
+    worker.setAutoDelete(False)
+    QThreadPool.globalInstance().start(worker)
+    _wait(qapp, lambda: "finished" in events)
+
+    return events
+
+
+def test_worker_reports_progress_and_result(qapp):
+    """Test that a task's progress and result reach the GUI thread."""
+    def task(progress):
+        progress(50, "halfway")
+        return 42
+
+    events = _run(qapp, TaskWorker(task))
+
+    assert events["progress"] == [50]
+    assert events["result"] == 42
+
+
+def test_worker_reports_errors(qapp):
+    """Test that a failing task emits its error message instead of a result."""
+    def task(progress):
+        raise ValueError("invalid index for IndexI7")
+
+    events = _run(qapp, TaskWorker(task))
+
+    assert events["error"] == "invalid index for IndexI7"
+    assert "result" not in events
+
+
+def test_worker_cancels_at_next_progress_report(qapp):
+    """Test that cancel stops a task at its next progress report."""
+    steps = []
+
+    def task(progress):
+        for step in range(3):
+            progress(step * 50, f"step {step}")
+            steps.append(step)
+        return steps
+
+    worker = TaskWorker(task)
+    worker.cancel()
+    events = _run(qapp, worker)
+
+    assert events.get("cancelled")
+    assert steps == []
+
+
+def test_data_manager_loads_in_background(qapp, data_manager):
+    """Test that a background load is taken over by the data manager."""
+    data_manager.set_input_format("tsv_ilmn")
+
+    assert data_manager.load_index_data(DEMO_TSV)
+    assert not data_manager.load_index_data(DEMO_TSV)
+
+    _wait(qapp, lambda: not data_manager.task_running)
+
+    assert data_manager.kit_name == "Ilmn DNA-RNA UD Indexes SetA Tagmentation"
+    assert data_manager.index_i7_count == 96
+
+
+def test_parse_messages_are_logged_on_the_gui_thread(qapp, tmp_path, data_manager, logger):
+    """Test that warnings found by a background load are logged from the GUI thread, not the worker."""
+    path = tmp_path / "indexes.csv"
+    path.write_text("Name,IndexI7,\nIndex1,ACGTACGT,x\n")
+
+    threads = []
+
+    class ThreadHandler(logging.Handler):
+        def emit(self, record):
+            threads.append((record.getMessage(), threading.current_thread()))
+
+    handler = ThreadHandler(logging.WARNING)
+    logger.addHandler(handler)
+    try:
+        data_manager.set_input_format("csv")
+        assert data_manager.load_index_data(path)
+        _wait(qapp, lambda: not data_manager.task_running)
+    finally:
+        logger.removeHandler(handler)
+
+    assert threads == [("indexes.csv: Blank header named 'Unnamed: 2'", threading.main_thread())]
+
+
+@pytest.mark.parametrize("source_format", ["csv", "tsv_ilmn"])
+def test_cancel_stops_a_load_while_parsing(qapp, tmp_path, monkeypatch, parse_cache_dir, source_format):
+    """Test that cancelling a load stops the parser at its next chunk instead of after the whole file."""
+    monkeypatch.setattr(csv_index_data, "DEFAULT_CHUNK_ROWS", 10)
+    monkeypatch.setattr(tsv_illumina_index_data, "PROGRESS_LINES", 50)
+
+    if source_format == "csv":
+        path = tmp_path / "indexes.csv"
+        path.write_text("Name,IndexI7\n" + "".join(f"Index{i},ACGTACGT\n" for i in range(100)))
+    else:
+        path = DEMO_TSV
+
+    reads = []
+
+    def load(progress):
+        def cancel_while_reading(percent, message):
+            if message.startswith("Read"):
+                reads.append(message)
+                worker.cancel()
+            progress(percent, message)
+
+        return load_index_kit(path, source_format, progress=cancel_while_reading)
+
+    worker = TaskWorker(load)
+    events = _run(qapp, worker)
+
+    assert events.get("cancelled")
+    assert "result" not in events
+    assert len(reads) == 1
+    assert not list(parse_cache_dir.glob("*.parquet"))
@@ -0,0 +1,23 @@
+from modules.model.load.tsv_illumina_index_data import IlluminaIndexData
+
+
+def test_empty_and_missing_fields_are_both_missing(tmp_path):
+    """Test that an empty middle field and a missing trailing field read as the same missing value."""
+    path = tmp_path / "kit.tsv"
+    path.write_text(
+        "[IndexKit]\nName\tKit\n\n"
+        "[Resources]\nName\tType\tFormat\tValue\n"
+        "Adapter\tAdapter\tstring\tCTGTCTCTTATACACATCT\n"
+        "FixedLayout\t\tbool\tfalse\n"
+        "UMICompatible\tbool\n\n"
+        "[Indices]\nName\tSequence\tIndexReadNumber\n"
+        "D701\tATTACTCG\t1\nD702\t\t1\nD501\tTATAGCCT\t2\n",
+        encoding="utf-8",
+    )
+
+    data = IlluminaIndexData(path, None)
+
+    assert data.i7_indexes["IndexI7"].isna().tolist() == [False, True]
+    assert data.ilmn_umi_compatible is None
+    assert not data.ilmn_fixed_layout
+    assert data.adapter_read_1 == "CTGTCTCTTATACACATCT"
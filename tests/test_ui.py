@@ -45,3 +45,55 @@ def test_filepath_handling(data_manager, tmp_path):
     # Set the import filepath using the internal attribute
     data_manager._import_filepath = str(test_file)
     assert data_manager._import_filepath == str(test_file)
+
+
+def test_label_panels_are_built_on_first_selection(qapp, data_manager, logger):
+    """Test that only selected configs get a label panel, which is reused on the next selection."""
+    from modules.view.draggable_labels.draggable_labels import DraggableLabelsContainer
+
+    container = DraggableLabelsContainer(data_manager, logger)
+    first, second = data_manager.config_name_list[:2]
+
+    assert list(container.kit_type_label_widgets) == [first]
+    first_panel = container.kit_type_label_widgets[first]
+
+    for config_name in (second, first):
+        data_manager.set_config_name(config_name)
+        container.show_labels()
+
+    assert list(container.kit_type_label_widgets) == [first, second]
+    assert container.kit_type_label_widgets[first] is first_panel
+    assert not first_panel.isHidden()
+    assert container.kit_type_label_widgets[second].isHidden()
+
+
+def test_edited_cells_reach_the_kit(qapp, data_manager):
+    """Test that editing a table cell replaces the kit table and keeps the column mapping."""
+    from modules.view.index_table.droppable_table import DroppableTableView
+
+    source_df = pd.DataFrame({'name': ['Index1', 'Index2'], 'seq': ['ACGTACGT', 'GCTAGCTA']})
+    data_manager.set_index_df(source_df)
+    data_manager.set_column_mapping({'seq': 'IndexI7'})
+
+    view = DroppableTableView(data_manager)
+    view.set_index_table_widget_data()
+    model = view.model()
+
+    table_changes = []
+    data_manager.index_df_changed.connect(lambda: table_changes.append(True))
+
+    assert model.flags(model.index(1, 1)) & Qt.ItemIsEditable
+    assert model.setData(model.index(1, 1), "TTTTGGGG")
+    assert not model.setData(model.index(1, 1), "TTTTGGGG")
+    assert model.setData(model.index(0, 1), "")
+
+    assert len(table_changes) == 2
+    assert source_df['seq'].tolist() == ['ACGTACGT', 'GCTAGCTA']
+    assert data_manager.index_df['IndexI7'].tolist()[1] == 'TTTTGGGG'
+    assert data_manager.index_df['IndexI7'].isna().tolist() == [True, False]
+    assert data_manager.column_mapping == {'seq': 'IndexI7'}
+    assert data_manager.index_i7_count == 1
+
+    view.set_index_table_widget_data()
+    assert model.data(model.index(1, 1)) == "TTTTGGGG"
+    assert view.to_dataframe()['IndexI7'].tolist()[1] == 'TTTTGGGG'
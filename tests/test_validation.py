@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from modules.model import column_stats, validation
+from modules.model.config_object import ConfigObject
+from modules.model.index_kit import IndexKit, index_kit_validation
+from modules.model.validation import validate_index_sets, MISSING_FIELD, INVALID_SEQUENCE, EMPTY_VALUE, \
+    DUPLICATE_VALUE, RULES
+from modules.view.validation.validation_widget import ValidationWidget
+
+
+def test_all_violations_are_collected():
+    """Test that one run reports every broken rule with its rows."""
+    df = pd.DataFrame({
+        'IndexI7Name': ['A1', 'A2', 'A3', None, 'A5'],
+        'IndexI7': ['ACGTACGT', 'acgtacgt', 'ACGTACGT', None, ' '],
+    })
+
+    report = validate_index_sets(df, {
+        'IndexI7': ['IndexI7Name', 'IndexI7'],
+        'IndexDual': ['IndexI7', 'IndexI5'],
+    })
+
+    found = {(v.rule, v.set_name, v.column): v.rows.tolist() for v in report.violations}
+
+    assert found == {
+        (INVALID_SEQUENCE, 'IndexI7', 'IndexI7'): [1],
+        (EMPTY_VALUE, 'IndexI7', 'IndexI7'): [4],
+        (DUPLICATE_VALUE, 'IndexI7', 'IndexI7'): [0, 2],
+        (MISSING_FIELD, 'IndexDual', 'IndexI5'): [],
+        (INVALID_SEQUENCE, 'IndexDual', 'IndexI7'): [1],
+        (DUPLICATE_VALUE, 'IndexDual', 'IndexI7'): [0, 2],
+    }
+    assert set(report.timings) == set(RULES)
+    assert "IndexDual: duplicate values in IndexI7 (rows 1, 3)" in report.error_message(limit=10)
+
+
+def test_blank_rows_are_outside_the_set():
+    """Test that rows with every set field blank are ignored."""
+    df = pd.DataFrame({
+        'IndexI7': ['ACGTACGT', np.nan, 'GGCCAATT'],
+        'IndexI5': ['TTTTAAAA', '  ', 'CCCCGGGG'],
+    })
+
+    assert validate_index_sets(df, {'IndexDual': ['IndexI7', 'IndexI5']}).ok
+
+
+def test_missing_values_in_object_columns_are_blank():
+    """Test that None and NaN in object columns are blank, never the text 'None' or 'nan'."""
+    df = pd.DataFrame({
+        'IndexI7Name': pd.Series(['A1', None, 'A3'], dtype=object),
+        'IndexI7': pd.Series(['ACGTACGT', None, np.nan], dtype=object),
+    })
+
+    report = validate_index_sets(df, {'IndexI7': ['IndexI7Name', 'IndexI7']})
+    found = {(v.rule, v.column): v.rows.tolist() for v in report.violations}
+
+    assert found == {(EMPTY_VALUE, 'IndexI7'): [2]}
+
+
+def test_only_sets_with_changed_columns_are_revalidated(monkeypatch):
+    """Test that relabelling a column revalidates only the index sets using it."""
+    validated = []
+    validate_set = validation._validate_set
+    monkeypatch.setattr(validation, "_validate_set",
+                        lambda columns, set_name, *args: validated.append(set_name) or
+                        validate_set(columns, set_name, *args))
+    column_stats.clear_stats()
+
+    config = ConfigObject({'IndexSets': {'IndexI7': ['IndexI7'], 'IndexI5': ['IndexI5']}})
+
+    kit = IndexKit()
+    kit.index_df = pd.DataFrame({'a': ['ACGTACGT', 'GGCCAATT'], 'b': ['TTTTAAAA', 'TTTTAAAA'],
+                                 'c': ['CCCCGGGG', 'AAAACCCC']})
+    kit.column_mapping = {'a': 'IndexI7', 'b': 'IndexI5'}
+    report = index_kit_validation(kit, config)
+
+    assert [v.rule for v in report.violations] == [DUPLICATE_VALUE]
+
+    kit.column_mapping = {'a': 'IndexI7', 'c': 'IndexI5'}
+    assert index_kit_validation(kit, config).ok
+    assert validated == ['IndexI7', 'IndexI5', 'IndexI5']
+
+
+def test_validation_widget_follows_mapping(qapp, data_manager, logger):
+    """Test that the validation widget updates as columns are mapped."""
+    data_manager.set_config_name("single")
+    data_manager.set_index_df(pd.DataFrame({'name': ['Index1', 'Index2'], 'seq': ['ACGTACGT', 'GCTAGCTA']}))
+    widget = ValidationWidget(data_manager, logger)
+
+    assert widget._summary.text() == "1 problems found"
+
+    data_manager.set_column_mapping({'name': 'IndexI7Name', 'seq': 'IndexI7'})
+    widget.refresh()
+
+    assert widget._summary.text() == "No problems found"
+
+
+def test_cell_edit_revalidates_only_the_edited_column(qapp, data_manager, logger, monkeypatch):
+    """Test that editing a cell rehashes and rescans only its column before the validation widget updates."""
+    from modules.model import index_kit
+    from modules.view.index_table.droppable_table import DroppableTableView
+
+    data_manager.set_config_name("single")
+    data_manager.set_index_df(pd.DataFrame({'name': ['Edit1', 'Edit2', 'Edit3'],
+                                            'seq': ['ACGTACGT', 'GCTAGCTA', 'TTGGCCAA']}))
+    data_manager.set_column_mapping({'name': 'IndexI7Name', 'seq': 'IndexI7'})
+
+    view = DroppableTableView(data_manager)
+    view.set_index_table_widget_data()
+    widget = ValidationWidget(data_manager, logger)
+    # As wired by the controller for index_df changes
+    data_manager.index_df_changed.connect(widget.refresh)
+    assert widget._summary.text() == "No problems found"
+
+    hashed, scanned = [], []
+    fingerprint = index_kit.column_fingerprint
+    monkeypatch.setattr(index_kit, "column_fingerprint", lambda series: hashed.append(series.name) or
+                        fingerprint(series))
+    for name in ("blank_mask", "invalid_sequence_mask", "duplicate_mask"):
+        monkeypatch.setattr(validation, name, lambda text, *args, mask=getattr(validation, name), name=name:
+                            scanned.append((name, text.name)) or mask(text, *args))
+
+    model = view.model()
+    assert model.setData(model.index(2, 1), "ACGTACGT")
+
+    assert widget._summary.text() == "1 problems found"
+    assert hashed == ['seq']
+    assert scanned == [('blank_mask', 'IndexI7'), ('invalid_sequence_mask', 'IndexI7'),
+                       ('duplicate_mask', 'IndexI7')]
@@ -0,0 +1,74 @@
+import pytest
+from openpyxl import Workbook
+
+from modules.model.index_kit import load_index_kit
+from modules.model.load import xlsx_index_data
+from modules.model.load.xlsx_index_data import XlsxIndexData, list_sheet_names, read_sheet, read_sheets
+
+ENGINES = ["openpyxl"]
+if xlsx_index_data.XLSX_ENGINE == "calamine":
+    ENGINES.append("calamine")
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    notes = workbook.active
+    notes.title = "Notes"
+    notes.append(["Formatted cover sheet"])
+
+    plate = workbook.create_sheet("Plate A")
+    plate.append(["Well", "IndexI7", "Nr", None])
+    plate.append(["A01", "ACGTACGT", 7, None])
+    plate.append(["B01", "GGCCAATT", 10.0, "x"])
+    # Formatted but empty rows at the end of the sheet
+    plate.cell(row=20, column=1).number_format = "0.00"
+
+    workbook.create_sheet("Plate B").append(["Well", "IndexI7"])
+
+    path = tmp_path / "indexes.xlsx"
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_read_selected_sheet_as_strings(workbook_path, monkeypatch, engine):
+    """Test that a chosen sheet is read as text, with trailing empty rows dropped."""
+    monkeypatch.setattr(xlsx_index_data, "XLSX_ENGINE", engine)
+
+    assert list_sheet_names(workbook_path) == ["Notes", "Plate A", "Plate B"]
+
+    df = XlsxIndexData(workbook_path, None, "Plate A").indexes
+
+    assert list(df.columns) == ["Well", "IndexI7", "Nr", "Unnamed: 3"]
+    assert df["Nr"].tolist() == ["7", "10"]
+    assert df["Unnamed: 3"].isna().tolist() == [True, False]
+
+
+def test_first_sheet_by_default_and_unknown_sheet(workbook_path):
+    """Test that the first sheet is the default and an unknown sheet raises ValueError."""
+    data = XlsxIndexData(workbook_path, None)
+
+    assert data.sheet_name == "Notes"
+    assert list(data.indexes.columns) == ["Formatted cover sheet"]
+
+    with pytest.raises(ValueError, match="no sheet named 'Plate C'"):
+        read_sheet(workbook_path, "Plate C")
+
+
+def test_read_sheets_in_parallel(workbook_path):
+    """Test that several sheets load across processes into the same tables as one by one."""
+    sheets = read_sheets(workbook_path, ["Plate A", "Plate B"], workers=2)
+
+    assert list(sheets) == ["Plate A", "Plate B"]
+    assert sheets["Plate A"].equals(read_sheet(workbook_path, "Plate A"))
+    assert sheets["Plate B"].empty and list(sheets["Plate B"].columns) == ["Well", "IndexI7"]
+
+
+def test_default_sheet_shares_the_cache_entry_of_its_name(workbook_path, parse_cache_dir):
+    """Test that loading the first sheet by default and by name parses and caches the file once."""
+    kit = load_index_kit(workbook_path, "xlsx")
+    named = load_index_kit(workbook_path, "xlsx", sheet_name="Notes")
+
+    assert named.index_df.equals(kit.index_df)
+    assert len(list(parse_cache_dir.glob("*.parquet"))) == 1